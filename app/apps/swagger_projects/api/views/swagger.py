@@ -119,8 +119,8 @@ class SwaggerFileChangesListAPIView(generics.ListAPIView):
             SwaggerFileChange.objects.filter(
                 swagger_project_id=swagger_project_id,
                 swagger_project__company_id=self.request.user.company_id,
+                status=SwaggerFileChange.PROCESSED
             )
-            .exclude(swagger_file_changes={})
             .order_by('changes_added_at')
         )
         
@@ -141,8 +141,8 @@ class SwaggerFileChangeRetrieveAPIView(generics.RetrieveAPIView):
             SwaggerFileChange.objects.filter(
                 swagger_project_id=swagger_project_id,
                 swagger_project__company_id=self.request.user.company_id,
+                status=SwaggerFileChange.PROCESSED
             )
-            .exclude(swagger_file_changes={})
             .order_by('changes_added_at')
         )
         
@@ -176,7 +176,7 @@ class SwaggerFileChangeCommentCreateAPIView(generics.CreateAPIView):
         
         if (
             self.request.user.company_id != swagger_file_change_company_id
-            or not swagger_file_change.swagger_file_changes
+            or swagger_file_change.status != SwaggerFileChange.PROCESSED
         ):
             raise Http404
         
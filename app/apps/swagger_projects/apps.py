@@ -1,12 +1,13 @@
 import enum
 import requests
 from functools import partial
-from requests.packages.urllib3.util.retry import Retry
 from typing import Union
 
 from django.apps import AppConfig
+from django.conf import settings
 
 from shared.custom_http_adapter import CustomHTTPAdapter
+from shared.jittered_retry import JitteredRetry
 from utils.metaclasses import Singleton
 
 
@@ -35,14 +36,22 @@ class SwaggerProjectsConfig(AppConfig):
             self.vcs_types
         )
         
-        # prepare custom "requests" adapter
-        retry_strategy = Retry(
+        # prepare custom "requests" adapter,
+        # retries are spaced out by jittered exponential backoff
+        # (or as requested by "Retry-After" headers)
+        retry_strategy = JitteredRetry(
             total=3,
+            backoff_factor=settings.REQUESTS_RETRY_BACKOFF_FACTOR,
             status_forcelist=[429, 500, 502, 503, 504],
             method_whitelist=['HEAD', 'GET', 'POST', 'PUT',
                               'DELETE', 'OPTIONS', 'TRACE']
         )
-        adapter = CustomHTTPAdapter(max_retries=retry_strategy)
+        # keep as many connections per host
+        # as there can be concurrent downloads from a single host
+        adapter = CustomHTTPAdapter(
+            max_retries=retry_strategy,
+            pool_maxsize=settings.SWAGGER_FILE_FETCH_PER_HOST_CONCURRENCY
+        )
         self.http = requests.Session()
         self.http.mount('https://', adapter)
         self.http.mount('http://', adapter)
@@ -0,0 +1,277 @@
+import hmac
+import logging
+import math
+import threading
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
+
+# imported by the models (via fetchers), so import the metrics model directly
+from apps.swagger_projects.models.metrics import PipelineMetric, SampleKey
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = 'swagger_whats_new'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+
+# histogram buckets (in seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+RUN_DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+Metric = namedtuple('Metric', ['name', 'type', 'description', 'buckets'],
+                    defaults=(None,))
+
+# swagger file changes sweeps
+SWEEP_DURATION = Metric(
+    'swagger_file_sweep_duration_seconds', HISTOGRAM,
+    'Duration of swagger file changes sweeps (all shards).',
+    RUN_DURATION_BUCKETS)
+SWEEP_SHARD_DURATION = Metric(
+    'swagger_file_sweep_shard_duration_seconds', HISTOGRAM,
+    'Duration of swagger file changes sweep shards.',
+    RUN_DURATION_BUCKETS)
+SWAGGER_PROJECTS_PROCESSED = Metric(
+    'swagger_projects_processed_total', COUNTER,
+    'Swagger projects checked for swagger file changes '
+    'by outcome (changed, unchanged, skipped, failed).')
+SWAGGER_FILE_FETCH_DURATION = Metric(
+    'swagger_file_fetch_duration_seconds', HISTOGRAM,
+    'Swagger file download latency '
+    'by outcome (downloaded, not_modified, failed).',
+    LATENCY_BUCKETS)
+SWAGGER_FILE_FETCH_BYTES = Metric(
+    'swagger_file_fetch_bytes_total', COUNTER,
+    'Bytes of downloaded swagger files.')
+SWAGGER_FILE_DIFF_DURATION = Metric(
+    'swagger_file_diff_duration_seconds', HISTOGRAM,
+    'Time spent calculating differences of changed swagger files.',
+    LATENCY_BUCKETS)
+SWAGGER_FILE_RESULTS_FLUSH_DURATION = Metric(
+    'swagger_file_results_flush_duration_seconds', HISTOGRAM,
+    'Time spent persisting batches of swagger file results '
+    'by outcome (committed, failed).',
+    LATENCY_BUCKETS)
+# remote VCS webhooks
+WEBHOOKS_RECEIVED = Metric(
+    'swagger_project_webhooks_total', COUNTER,
+    'Repository commit webhooks by remote VCS '
+    'and outcome (registered, debounced, ignored).')
+# OAuth access token refreshes
+ACCESS_TOKEN_REFRESH_DURATION = Metric(
+    'vcs_access_token_refresh_duration_seconds', HISTOGRAM,
+    'Duration of remote VCS account access token refresh runs.',
+    RUN_DURATION_BUCKETS)
+ACCESS_TOKEN_REFRESHES = Metric(
+    'vcs_access_token_refreshes_total', COUNTER,
+    'Remote VCS account access token refreshes '
+    'by outcome (refreshed, failed).')
+
+METRICS = (
+    SWEEP_DURATION,
+    SWEEP_SHARD_DURATION,
+    SWAGGER_PROJECTS_PROCESSED,
+    SWAGGER_FILE_FETCH_DURATION,
+    SWAGGER_FILE_FETCH_BYTES,
+    SWAGGER_FILE_DIFF_DURATION,
+    SWAGGER_FILE_RESULTS_FLUSH_DURATION,
+    WEBHOOKS_RECEIVED,
+    ACCESS_TOKEN_REFRESH_DURATION,
+    ACCESS_TOKEN_REFRESHES,
+)
+
+HISTOGRAM_SUFFIXES = ('_bucket', '_sum', '_count')
+
+# outcome label values
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+DOWNLOADED = 'downloaded'
+NOT_MODIFIED = 'not_modified'
+COMMITTED = 'committed'
+REGISTERED = 'registered'
+DEBOUNCED = 'debounced'
+IGNORED = 'ignored'
+REFRESHED = 'refreshed'
+
+
+class MetricsRegistry:
+    """
+    In-memory buffer of metric samples recorded by a single process.
+    
+    All the metrics are cumulative (counters and histograms),
+    so buffered samples are simply added to the samples stored in DB
+    when flushed (see PipelineMetricManager.increment)
+    and the buffer starts over.
+    Pipelines flush the registry when they finish a run
+    (a sweep shard, a token refresh run, a webhook).
+    
+    Thread safe.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(float)
+    
+    def inc(self, metric: Metric, value: float = 1, **labels: str) -> None:
+        key = (metric.name, _label_pairs(labels))
+        with self.lock:
+            self.samples[key] += value
+    
+    def observe(self, metric: Metric, value: float, **labels: str) -> None:
+        """
+        Record a single observation of a histogram
+        """
+        label_pairs = _label_pairs(labels)
+        bucket_keys = [
+            (f'{metric.name}_bucket',
+             _label_pairs(dict(labels, le=_format_value(bound))))
+            for bound in (*metric.buckets, math.inf)
+            if value <= bound
+        ]
+        
+        with self.lock:
+            for key in bucket_keys:
+                self.samples[key] += 1
+            self.samples[(f'{metric.name}_sum', label_pairs)] += value
+            self.samples[(f'{metric.name}_count', label_pairs)] += 1
+    
+    @contextmanager
+    def timer(self, metric: Metric, **labels: str) -> Iterator[None]:
+        started_at = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(metric, perf_counter() - started_at, **labels)
+    
+    def collect(self) -> Dict[SampleKey, float]:
+        """
+        Return buffered samples and empty the buffer
+        """
+        with self.lock:
+            samples, self.samples = self.samples, defaultdict(float)
+        return dict(samples)
+    
+    def flush(self) -> None:
+        """
+        Add buffered samples to the samples stored in DB,
+        samples are kept buffered until the next flush if DB is unavailable
+        """
+        samples = self.collect()
+        try:
+            PipelineMetric.objects.increment(samples)
+        except DatabaseError as e:
+            logger.exception(e)
+            with self.lock:
+                for key, value in samples.items():
+                    self.samples[key] += value
+
+
+metrics = MetricsRegistry()
+
+
+def render_metrics(samples: Iterable[Tuple[str, dict, float]],
+                   namespace: Optional[str] = NAMESPACE) -> str:
+    """
+    Render (name, labels, value) samples
+    in Prometheus text exposition format.
+    
+    Every known metric is described (HELP, TYPE) even before
+    its first sample is recorded, samples of unknown metrics are skipped.
+    """
+    prefix = f'{namespace}_' if namespace else ''
+    samples_by_name = defaultdict(list)
+    for name, labels, value in samples:
+        samples_by_name[name].append((labels, value))
+    
+    lines = []
+    for metric in METRICS:
+        name = f'{prefix}{metric.name}'
+        lines.append(f'# HELP {name} {metric.description}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        
+        suffixes = HISTOGRAM_SUFFIXES if metric.type == HISTOGRAM else ('',)
+        for suffix in suffixes:
+            for labels, value in sorted(samples_by_name[metric.name + suffix],
+                                        key=_sample_sort_key):
+                lines.append(f'{name}{suffix}{_format_labels(labels)} '
+                             f'{_format_value(value)}')
+    
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Expose metric samples recorded by all the processes
+    for Prometheus to scrape.
+    
+    Only scrapers allowed by METRICS_BEARER_TOKEN and METRICS_ALLOWED_IPS
+    settings are served (see scrape_allowed).
+    """
+    if not scrape_allowed(request):
+        return HttpResponseForbidden()
+    
+    samples = PipelineMetric.objects.values_list('name', 'labels', 'value')
+    return HttpResponse(render_metrics(samples), content_type=CONTENT_TYPE)
+
+
+def scrape_allowed(request: HttpRequest) -> bool:
+    """
+    Scrapers must present the configured bearer token
+    and connect from one of the allowed IP addresses
+    (each only if configured), nobody is allowed if neither is configured.
+    """
+    token = settings.METRICS_BEARER_TOKEN
+    allowed_ips = settings.METRICS_ALLOWED_IPS
+    if not token and not allowed_ips:
+        return False
+    
+    if token:
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        if not hmac.compare_digest(authorization.encode(),
+                                   f'Bearer {token}'.encode()):
+            return False
+    
+    return not allowed_ips or request.META.get('REMOTE_ADDR') in allowed_ips
+
+
+def _label_pairs(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _sample_sort_key(sample: Tuple[dict, float]) -> Tuple[List[tuple], float]:
+    # histogram buckets are ordered by their upper bounds
+    labels, _ = sample
+    other_labels = sorted((k, v) for k, v in labels.items() if k != 'le')
+    return other_labels, float(labels.get('le', 0))
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    
+    # histogram bucket bounds go last
+    label_pairs = sorted(labels.items(), key=lambda pair: (pair[0] == 'le',
+                                                           pair[0]))
+    return '{' + ','.join(f'{name}="{_escape_label_value(value)}"'
+                          for name, value in label_pairs) + '}'
+
+
+def _escape_label_value(value: str) -> str:
+    return (str(value).replace('\\', r'\\')
+            .replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
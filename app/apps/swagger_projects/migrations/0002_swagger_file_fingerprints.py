@@ -0,0 +1,66 @@
+# Generated by Django 3.0.5 on 2026-10-17 00:59
+
+import hashlib
+
+import django.contrib.postgres.fields.jsonb
+import orjson
+from django.db import migrations
+
+FINGERPRINTED_SECTIONS = ('paths', 'definitions')
+
+
+# frozen copies of utils.functions.canonical_json_digest
+# and apps.swagger_projects.workers.helpers.create_swagger_file_fingerprints,
+# so that the migration doesn't change along with the application code
+def canonical_json_digest(value):
+    canonical_value = orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(canonical_value, digest_size=16).hexdigest()
+
+
+def create_swagger_file_fingerprints(swagger_file):
+    fingerprints = dict()
+    
+    for section in FINGERPRINTED_SECTIONS:
+        entries = swagger_file.get(section)
+        if not isinstance(entries, dict):
+            continue
+        
+        fingerprints[section] = {k: canonical_json_digest(v)
+                                 for k, v in entries.items()}
+    
+    return fingerprints
+
+
+def fingerprint_stored_swagger_files(apps, schema_editor):
+    SwaggerFile = apps.get_model('swagger_projects', 'SwaggerFile')
+    
+    for swagger_file_obj in SwaggerFile.objects.iterator():
+        try:
+            swagger_file_fingerprints = \
+                create_swagger_file_fingerprints(swagger_file_obj.swagger_file)
+        except orjson.JSONEncodeError:
+            # too deeply nested to be encoded, without fingerprints
+            # the whole swagger file is compared when it changes next time
+            continue
+        
+        swagger_file_obj.swagger_file_fingerprints = swagger_file_fingerprints
+        swagger_file_obj.save(update_fields=['swagger_file_fingerprints'])
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('swagger_projects', '0001_initial'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='swaggerfile',
+            name='swagger_file_fingerprints',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=dict, verbose_name='Swagger File Endpoint and Contract Fingerprints'),
+        ),
+        migrations.RunPython(
+            fingerprint_stored_swagger_files,
+            migrations.RunPython.noop
+        ),
+    ]
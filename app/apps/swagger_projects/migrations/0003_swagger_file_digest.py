@@ -0,0 +1,48 @@
+# Generated by Django 3.0.5 on 2026-10-17 00:59
+
+import hashlib
+
+import orjson
+from django.db import migrations, models
+
+
+# frozen copy of utils.functions.canonical_json_digest,
+# so that the migration doesn't change along with the application code
+def canonical_json_digest(value):
+    canonical_value = orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(canonical_value, digest_size=16).hexdigest()
+
+
+def digest_stored_swagger_files(apps, schema_editor):
+    SwaggerFile = apps.get_model('swagger_projects', 'SwaggerFile')
+    
+    for swagger_file_obj in SwaggerFile.objects.iterator():
+        try:
+            swagger_file_digest = \
+                canonical_json_digest(swagger_file_obj.swagger_file)
+        except orjson.JSONEncodeError:
+            # too deeply nested to be encoded, without a digest
+            # the swagger file is considered changed when it's checked next time
+            continue
+        
+        swagger_file_obj.swagger_file_digest = swagger_file_digest
+        swagger_file_obj.save(update_fields=['swagger_file_digest'])
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('swagger_projects', '0002_swagger_file_fingerprints'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='swaggerfile',
+            name='swagger_file_digest',
+            field=models.CharField(default=None, max_length=32, null=True, verbose_name='Swagger File Canonical Digest'),
+        ),
+        migrations.RunPython(
+            digest_stored_swagger_files,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.0.5 on 2026-10-17 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('swagger_projects', '0003_swagger_file_digest'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='swaggerfile',
+            name='swagger_file_etag',
+            field=models.CharField(default=None, max_length=300, null=True, verbose_name='Swagger File ETag Response Header'),
+        ),
+        migrations.AddField(
+            model_name='swaggerfile',
+            name='swagger_file_last_modified',
+            field=models.CharField(default=None, max_length=100, null=True, verbose_name='Swagger File Last-Modified Response Header'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.0.5 on 2026-10-17 01:14
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('swagger_projects', '0004_swagger_file_response_validators'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='SwaggerFileSweep',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shards_total', models.PositiveIntegerField(verbose_name='Number of Shards')),
+                ('shards_done', models.PositiveIntegerField(default=0, verbose_name='Number of Finished Shards')),
+                ('summary', django.contrib.postgres.fields.jsonb.JSONField(default=dict, verbose_name='Aggregated Summary of Finished Shards')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Started At')),
+                ('finished_at', models.DateTimeField(default=None, null=True, verbose_name='Finished At')),
+            ],
+            options={
+                'db_table': 'swagger_file_sweeps',
+            },
+        ),
+    ]
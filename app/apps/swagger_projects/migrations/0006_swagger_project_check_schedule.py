@@ -0,0 +1,28 @@
+# Generated by Django 3.0.5 on 2026-10-17 01:16
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('swagger_projects', '0005_swagger_file_sweeps'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='swaggerproject',
+            name='check_interval',
+            field=models.PositiveIntegerField(default=0, verbose_name='Swagger File Check Interval In Seconds'),
+        ),
+        migrations.AddField(
+            model_name='swaggerproject',
+            name='next_check_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Next Swagger File Check At'),
+        ),
+        migrations.AddIndex(
+            model_name='swaggerproject',
+            index=models.Index(fields=['next_check_at'], name='idx_swg_prj_next_check_at'),
+        ),
+    ]
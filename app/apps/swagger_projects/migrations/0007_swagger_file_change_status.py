@@ -0,0 +1,38 @@
+# Generated by Django 3.0.5 on 2026-10-17 01:17
+
+from django.db import migrations, models
+
+
+def mark_processed_swagger_file_changes(apps, schema_editor):
+    SwaggerFileChange = apps.get_model('swagger_projects', 'SwaggerFileChange')
+    
+    SwaggerFileChange.objects.exclude(
+        swagger_file_changes={}
+    ).update(status='D')
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('swagger_projects', '0006_swagger_project_check_schedule'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='swaggerfilechange',
+            name='status',
+            field=models.CharField(choices=[('P', 'Pending'), ('D', 'Processed')], default='P', max_length=1, verbose_name='Swagger File Change Processing Status'),
+        ),
+        migrations.RunPython(
+            mark_processed_swagger_file_changes,
+            migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='swaggerfilechange',
+            index=models.Index(condition=models.Q(status='P'), fields=['swagger_project'], name='idx_swg_file_chg_pending'),
+        ),
+        migrations.AddIndex(
+            model_name='swaggerfilechange',
+            index=models.Index(condition=models.Q(status='D'), fields=['swagger_project', 'changes_added_at'], name='idx_swg_file_chg_processed'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.0.5 on 2026-10-17 01:19
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('swagger_projects', '0007_swagger_file_change_status'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='swaggerfilesweep',
+            name='heartbeat_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Last Heartbeat At'),
+        ),
+    ]
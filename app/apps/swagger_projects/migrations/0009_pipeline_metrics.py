@@ -0,0 +1,30 @@
+# Generated by Django 3.0.5 on 2026-10-17 01:28
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('swagger_projects', '0008_swagger_file_sweep_lease'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='PipelineMetric',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Metric Name')),
+                ('labels', django.contrib.postgres.fields.jsonb.JSONField(default=dict, verbose_name='Metric Labels')),
+                ('value', models.FloatField(default=0, verbose_name='Cumulative Value')),
+            ],
+            options={
+                'db_table': 'pipeline_metrics',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pipelinemetric',
+            constraint=models.UniqueConstraint(fields=('name', 'labels'), name='uniq_pipeline_metric_sample'),
+        ),
+    ]
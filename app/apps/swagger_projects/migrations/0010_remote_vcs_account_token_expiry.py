@@ -0,0 +1,27 @@
+# Generated by Django 3.0.5 on 2026-10-17 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('swagger_projects', '0009_pipeline_metrics'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='remotevcsaccount',
+            name='access_token_expires_at',
+            field=models.DateTimeField(default=None, null=True, verbose_name='OAuth Access Token Expires At'),
+        ),
+        migrations.AddField(
+            model_name='remotevcsaccount',
+            name='access_token_refresh_at',
+            field=models.DateTimeField(default=None, null=True, verbose_name='OAuth Access Token Refresh Scheduled At'),
+        ),
+        migrations.AddIndex(
+            model_name='remotevcsaccount',
+            index=models.Index(condition=models.Q(refresh_token__isnull=False), fields=['access_token_refresh_at'], name='idx_vcs_accs_token_refresh_at'),
+        ),
+    ]
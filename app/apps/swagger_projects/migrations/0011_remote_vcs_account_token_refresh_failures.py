@@ -0,0 +1,18 @@
+# Generated by Django 3.0.5 on 2026-10-17 01:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('swagger_projects', '0010_remote_vcs_account_token_expiry'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='remotevcsaccount',
+            name='access_token_refresh_failures',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Consecutive OAuth Access Token Refresh Failures'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.5 on 2026-10-17 01:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('swagger_projects', '0011_remote_vcs_account_token_refresh_failures'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='swaggerfilechange',
+            name='processing_started_at',
+            field=models.DateTimeField(default=None, null=True, verbose_name='Swagger File Change Processing Started At'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.0.5 on 2026-10-17 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('swagger_projects', '0012_swagger_file_change_processing_started_at'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='TaskLease',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Lease Name')),
+                ('holder', models.UUIDField(verbose_name='Lease Holder Token')),
+                ('acquired_at', models.DateTimeField(verbose_name='Acquired At')),
+                ('expires_at', models.DateTimeField(verbose_name='Expires At')),
+            ],
+            options={
+                'db_table': 'task_leases',
+            },
+        ),
+    ]
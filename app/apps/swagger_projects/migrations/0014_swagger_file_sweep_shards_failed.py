@@ -0,0 +1,18 @@
+# Generated by Django 3.0.5 on 2026-10-17 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('swagger_projects', '0013_task_leases'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='swaggerfilesweep',
+            name='shards_failed',
+            field=models.PositiveIntegerField(default=0, verbose_name='Number of Failed Shards'),
+        ),
+    ]
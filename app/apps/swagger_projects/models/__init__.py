@@ -5,3 +5,6 @@ from .swagger import (
     SwaggerFileChange,
     SwaggerFileChangeComment,
 )
+from .sweeps import SwaggerFileSweep
+from .metrics import PipelineMetric
+from .leases import TaskLease
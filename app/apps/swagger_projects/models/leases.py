@@ -0,0 +1,79 @@
+import logging
+import uuid
+from datetime import timedelta
+from typing import Optional
+
+from django.db import models, connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class TaskLeaseManager(models.Manager):
+    
+    def acquire(self, name: str, timeout: int) -> Optional[uuid.UUID]:
+        """
+        Acquire the lease named "name" for "timeout" seconds
+        unless it's held by someone else and hasn't expired yet.
+        
+        Acquired (or taken over) in a single query, so that only one
+        of concurrently acquiring processes succeeds.
+        Return the holder token required to release the lease
+        or None if the lease wasn't acquired.
+        """
+        holder = uuid.uuid4()
+        now = timezone.now()
+        
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (name, holder, acquired_at, expires_at) '
+                f'VALUES (%s, %s, %s, %s) '
+                f'ON CONFLICT (name) DO UPDATE SET '
+                f'holder = EXCLUDED.holder, '
+                f'acquired_at = EXCLUDED.acquired_at, '
+                f'expires_at = EXCLUDED.expires_at '
+                f'WHERE {table}.expires_at <= EXCLUDED.acquired_at '
+                f'RETURNING holder',
+                [name, holder, now, now + timedelta(seconds=timeout)]
+            )
+            acquired = cursor.fetchone() is not None
+        
+        return holder if acquired else None
+    
+    def release(self, name: str, holder: uuid.UUID) -> None:
+        """
+        Release the lease unless it has expired
+        and was taken over by another holder in the meantime.
+        """
+        released, _ = self.filter(name=name, holder=holder).delete()
+        if not released:
+            logger.warning(f'"{name}" lease expired before it was released')
+
+
+class TaskLease(models.Model):
+    """
+    This model represents a lease that grants exclusive right
+    to run a periodic task (see apps.swagger_projects.tasks.run_exclusively).
+    
+    A lease expires after the timeout it was acquired with,
+    so a run that hangs or whose process dies
+    doesn't block the following runs forever.
+    """
+    
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Lease Name'
+    )
+    holder = models.UUIDField(verbose_name='Lease Holder Token')
+    acquired_at = models.DateTimeField(verbose_name='Acquired At')
+    expires_at = models.DateTimeField(verbose_name='Expires At')
+    
+    objects = TaskLeaseManager()
+    
+    class Meta:
+        db_table = 'task_leases'
+    
+    def __str__(self):
+        return f'task_lease_{self.name}'
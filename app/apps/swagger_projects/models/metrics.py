@@ -0,0 +1,68 @@
+import json
+from typing import Dict, Tuple
+
+from django.db import connection, models
+from django.contrib.postgres.fields import JSONField
+
+# metric name and its labels (sorted (name, value) pairs)
+SampleKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class PipelineMetricManager(models.Manager):
+    
+    def increment(self, samples: Dict[SampleKey, float]) -> None:
+        """
+        Add values of samples to the corresponding stored samples
+        (creating the missing ones) in a single query.
+        
+        Samples are written in a stable order, so that concurrent increments
+        of the same samples don't deadlock.
+        """
+        if not samples:
+            return
+        
+        rows = sorted(samples.items())
+        values = ', '.join(['(%s, %s::jsonb, %s)'] * len(rows))
+        params = []
+        for (name, labels), value in rows:
+            params.extend((name, json.dumps(dict(labels), sort_keys=True),
+                           value))
+        
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (name, labels, value) VALUES {values} '
+                f'ON CONFLICT (name, labels) '
+                f'DO UPDATE SET value = {table}.value + EXCLUDED.value',
+                params
+            )
+
+
+class PipelineMetric(models.Model):
+    """
+    This model represents a single cumulative sample of a metric
+    (a counter or a histogram bucket, sum or count)
+    recorded by the background pipelines - swagger file changes sweeps,
+    webhook callbacks and OAuth access token refreshes.
+    
+    Pipelines run in different processes (celery workers, server threads),
+    so samples are buffered in memory by each process
+    and periodically added to the stored samples
+    (see apps.swagger_projects.metrics).
+    """
+    
+    name = models.CharField(max_length=100, verbose_name='Metric Name')
+    labels = JSONField(default=dict, verbose_name='Metric Labels')
+    value = models.FloatField(default=0, verbose_name='Cumulative Value')
+    
+    objects = PipelineMetricManager()
+    
+    class Meta:
+        db_table = 'pipeline_metrics'
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'labels'],
+                                    name='uniq_pipeline_metric_sample'),
+        ]
+    
+    def __str__(self):
+        return f'{self.name}{self.labels}'
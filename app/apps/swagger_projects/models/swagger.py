@@ -1,25 +1,29 @@
 import logging
-from json import JSONDecodeError
-from requests.exceptions import ConnectionError
+from datetime import timedelta
+from requests.exceptions import RequestException
 from typing import Union
 
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.conf import settings
-from django.apps import apps
+from django.utils import timezone
 from django.contrib.postgres.fields import JSONField
 from django.contrib.postgres.indexes import GinIndex
 
 from apps.accounts.models import Company
 from .vcs import RemoteVCSAccount
+from utils.functions import canonical_json_digest
+from apps.swagger_projects.workers.helpers import create_swagger_file_fingerprints
+from apps.swagger_projects.workers.fetchers import (
+    fetch_swagger_file,
+    SwaggerFileFetchError
+)
 from apps.swagger_projects.vcs_utility import (
     vcs_webhook_util_factory,
     VCSWebhookUtiltity,
     RepositoryDoesNotExistError
 )
 
-APP = apps.get_app_config('swagger_projects')
-http = APP.http
 logger = logging.getLogger(__name__)
 
 
@@ -36,21 +40,22 @@ class SwaggerFileManager(models.Manager):
         it deletes its associated Swagger Project and returns abroptly.
         """
         try:
-            swagger_file_response = http.get(
+            swagger_file_response = fetch_swagger_file(
                 swagger_project_instance.swagger_file_url)
-        except ConnectionError as e:
+        # connection errors and error responses (4xx, 5xx)
+        except RequestException as e:
             logger.exception(e)
             swagger_project_instance.delete()
             return
-        
-        # if the response body is not json encoded return abroptly
+        # if the response body is not json encoded
+        # or the swagger file is too large, return abroptly
         # and delete the associated Swagger Project instance.
-        try:
-            swagger_file = swagger_file_response.json()
-        except JSONDecodeError:
+        except SwaggerFileFetchError:
             swagger_project_instance.delete()
             return
         
+        swagger_file = swagger_file_response.swagger_file
+        
         # if the parsed json body doesn't adhere to
         # the expected swagger file format, return abroptly
         # and delete the associated Swagger Project instance
@@ -67,6 +72,11 @@ class SwaggerFileManager(models.Manager):
         
         swagger_file_instance = self.create(
             swagger_file=swagger_file,
+            swagger_file_etag=swagger_file_response.etag,
+            swagger_file_last_modified=swagger_file_response.last_modified,
+            swagger_file_digest=canonical_json_digest(swagger_file),
+            swagger_file_fingerprints=create_swagger_file_fingerprints(
+                swagger_file),
             swagger_project=swagger_project_instance
         )
         
@@ -79,6 +89,12 @@ class SwaggerProject(models.Model):
     
     Swagger Projects can be integrated with Remote VCS Accounts
     to keep track of commits that triggered particular swagger file changes.
+    
+    Swagger Projects are checked for swagger file changes
+    no earlier than "next_check_at". The check interval backs off
+    while the swagger file stays unchanged
+    and is reset when a change is detected or a commit is registered
+    (see schedule_next_check).
     """
     
     project_name = models.CharField(
@@ -121,6 +137,14 @@ class SwaggerProject(models.Model):
         auto_now=True,
         verbose_name='Updated At'
     )
+    next_check_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Next Swagger File Check At'
+    )
+    check_interval = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Swagger File Check Interval In Seconds'
+    )
     remote_vcs_account = models.ForeignKey(
         RemoteVCSAccount,
         on_delete=models.CASCADE,
@@ -159,6 +183,11 @@ class SwaggerProject(models.Model):
             GinIndex(
                 fields=['remote_repo_branch', 'company'],
                 name='idx_swg_prj_remote_repo_branch',
+            ),
+            # for selecting swagger projects due to be checked
+            models.Index(
+                fields=['next_check_at'],
+                name='idx_swg_prj_next_check_at'
             )
         ]
         constraints = [
@@ -216,6 +245,27 @@ class SwaggerProject(models.Model):
         except RepositoryDoesNotExistError as e:
             raise ValidationError(e.message)
     
+    def schedule_next_check(self, changed: bool) -> None:
+        """
+        Schedule the next swagger file check.
+        
+        If the swagger file has changed, check it again
+        after the minimum interval, otherwise multiply the interval
+        by the backoff factor (up to the maximum interval).
+        """
+        if changed:
+            self.check_interval = \
+                settings.SWAGGER_PROJECT_MIN_CHECK_INTERVAL_IN_SECONDS
+        else:
+            self.check_interval = min(
+                max(int(self.check_interval *
+                        settings.SWAGGER_PROJECT_CHECK_INTERVAL_BACKOFF_FACTOR),
+                    settings.SWAGGER_PROJECT_MIN_CHECK_INTERVAL_IN_SECONDS),
+                settings.SWAGGER_PROJECT_MAX_CHECK_INTERVAL_IN_SECONDS
+            )
+        self.next_check_at = timezone.now() + timedelta(
+            seconds=self.check_interval)
+    
     def delete_repo_webhook(self) -> None:
         # if a particular Swagger Project instance
         # is not integrated with a VCS Account, return abroptly.
@@ -249,9 +299,48 @@ class SwaggerFile(models.Model):
     
     Swagger files are stored directly in the database
     in jsonb format (field "swagger_file").
+    
+    The whole stored swagger file is hashed in its canonical form
+    (field "swagger_file_digest"), so that unchanged swagger file versions
+    are detected without being compared.
+    The digest is calculated over the parsed swagger file
+    (compactly encoded with sorted keys), not over the raw downloaded bytes -
+    raw bytes are not stored (jsonb keeps neither formatting nor key order),
+    so a new version is parsed before its digest can be compared.
+    Versions differing only in formatting or key order are unchanged.
+    
+    Each endpoint (path item) and contract of the stored swagger file
+    is fingerprinted with a content hash (field "swagger_file_fingerprints"),
+    so that only changed subtrees are compared against a new swagger file version.
+    
+    HTTP response validators of the stored swagger file
+    (fields "swagger_file_etag" and "swagger_file_last_modified")
+    are used to make conditional requests for new swagger file versions.
     """
     
     swagger_file = JSONField(null=False, verbose_name='Swagger File')
+    swagger_file_digest = models.CharField(
+        max_length=32,
+        null=True,
+        default=None,
+        verbose_name='Swagger File Canonical Digest'
+    )
+    swagger_file_etag = models.CharField(
+        max_length=300,
+        null=True,
+        default=None,
+        verbose_name='Swagger File ETag Response Header'
+    )
+    swagger_file_last_modified = models.CharField(
+        max_length=100,
+        null=True,
+        default=None,
+        verbose_name='Swagger File Last-Modified Response Header'
+    )
+    swagger_file_fingerprints = JSONField(
+        default=dict,
+        verbose_name='Swagger File Endpoint and Contract Fingerprints'
+    )
     swagger_project = models.OneToOneField(
         SwaggerProject,
         on_delete=models.CASCADE,
@@ -293,8 +382,26 @@ class SwaggerFileChange(models.Model):
     If this is going to change sometime in the future,
     it will be easy to use postgres' jsonb aggregation functionality
     instead of normalization.
+    
+    Swagger file changes of swagger projects integrated
+    with remote VCS accounts are first registered with only
+    related commit details provided (status "pending")
+    and become "processed" when swagger file changes are discovered.
+    Both statuses are covered by partial indexes.
+    
+    A pending swagger file change claimed by
+    process_swagger_project_changes task is marked with
+    "processing_started_at", commits registered afterwards
+    are added to a new pending swagger file change instead.
     """
     
+    PENDING = 'P'
+    PROCESSED = 'D'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (PROCESSED, 'Processed')
+    )
+    
     related_commit_details = JSONField(
         null=False,
         default=list,
@@ -310,6 +417,17 @@ class SwaggerFileChange(models.Model):
         default=None,
         verbose_name='Swagger File Changes Added At'
     )
+    status = models.CharField(
+        max_length=1,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name='Swagger File Change Processing Status'
+    )
+    processing_started_at = models.DateTimeField(
+        null=True,
+        default=None,
+        verbose_name='Swagger File Change Processing Started At'
+    )
     swagger_project = models.ForeignKey(
         SwaggerProject,
         on_delete=models.CASCADE,
@@ -319,6 +437,20 @@ class SwaggerFileChange(models.Model):
     
     class Meta:
         db_table = 'swagger_file_changes'
+        indexes = [
+            # for swagger file changes worker and webhook callback efficiency
+            models.Index(
+                fields=['swagger_project'],
+                condition=models.Q(status='P'),
+                name='idx_swg_file_chg_pending'
+            ),
+            # for Rest API listing efficiency
+            models.Index(
+                fields=['swagger_project', 'changes_added_at'],
+                condition=models.Q(status='D'),
+                name='idx_swg_file_chg_processed'
+            )
+        ]
     
     def __str__(self):
         return f'{self.swagger_project.project_name}_' \
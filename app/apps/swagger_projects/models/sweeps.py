@@ -0,0 +1,129 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.contrib.postgres.fields import JSONField
+from django.utils import timezone
+
+from utils.functions import merge_counters
+
+logger = logging.getLogger(__name__)
+
+
+class SwaggerFileSweepManager(models.Manager):
+    
+    def active(self) -> models.QuerySet:
+        """
+        Sweeps that are still being processed - not finished
+        and holding a lease (a shard reported within
+        SWAGGER_FILE_SWEEP_LEASE_TIMEOUT_IN_SECONDS).
+        
+        Sweeps whose lease has expired (e.g. their shards were lost
+        because of a worker crash) are no longer considered active.
+        """
+        lease_expired_at = timezone.now() - timedelta(
+            seconds=settings.SWAGGER_FILE_SWEEP_LEASE_TIMEOUT_IN_SECONDS)
+        return self.filter(finished_at__isnull=True,
+                           heartbeat_at__gte=lease_expired_at)
+    
+    def heartbeat(self, sweep_id: int) -> None:
+        """
+        Renew the lease of a sweep.
+        """
+        self.filter(id=sweep_id).update(heartbeat_at=timezone.now())
+    
+    def record_shard_summary(self, sweep_id: int, summary: dict) -> 'SwaggerFileSweep':
+        """
+        Add summary of a single finished shard to its sweep.
+        
+        Should be called within a transaction -
+        the sweep is locked for update, so that concurrently finished shards
+        don't overwrite each other's summaries.
+        Renews the sweep's lease,
+        the last finished shard marks the whole sweep as finished.
+        """
+        sweep = self.select_for_update().get(id=sweep_id)
+        merge_counters(sweep.summary, summary)
+        return self._record_shard_done(sweep)
+    
+    def record_shard_failure(self, sweep_id: int) -> 'SwaggerFileSweep':
+        """
+        Count a shard that failed permanently (after all its retries)
+        as done, so that the sweep still finishes
+        instead of blocking new sweeps until its lease expires.
+        
+        Should be called within a transaction (see record_shard_summary).
+        """
+        sweep = self.select_for_update().get(id=sweep_id)
+        sweep.shards_failed += 1
+        return self._record_shard_done(sweep)
+    
+    @staticmethod
+    def _record_shard_done(sweep: 'SwaggerFileSweep') -> 'SwaggerFileSweep':
+        sweep.shards_done += 1
+        sweep.heartbeat_at = timezone.now()
+        
+        if sweep.shards_done == sweep.shards_total:
+            sweep.finished_at = timezone.now()
+            logger.info(f'Swagger file changes sweep {sweep.id} finished '
+                        f'({sweep.shards_total} shards, '
+                        f'{sweep.shards_failed} failed): {sweep.summary}')
+        
+        sweep.save(update_fields=['summary', 'shards_done', 'shards_failed',
+                                  'heartbeat_at', 'finished_at'])
+        return sweep
+
+
+class SwaggerFileSweep(models.Model):
+    """
+    This model represents a single run of swagger file changes processing
+    (a sweep over all the swagger files).
+    
+    A sweep is split into shards (swagger file id ranges)
+    which are processed by separate celery tasks,
+    possibly on different nodes.
+    Each shard persists its own results and adds its summary
+    (see pull_and_process_swagger_file_changes) to the sweep's summary.
+    Shards that fail permanently are counted as done (and failed)
+    without a summary, so that the sweep still finishes.
+    
+    Until it is finished, a sweep holds a lease which is renewed
+    by its shards ("heartbeat_at"), new sweeps are not started
+    while an active sweep exists (see SwaggerFileSweepManager.active).
+    """
+    
+    shards_total = models.PositiveIntegerField(verbose_name='Number of Shards')
+    shards_done = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Number of Finished Shards'
+    )
+    shards_failed = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Number of Failed Shards'
+    )
+    summary = JSONField(
+        default=dict,
+        verbose_name='Aggregated Summary of Finished Shards'
+    )
+    started_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Started At'
+    )
+    heartbeat_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Last Heartbeat At'
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        default=None,
+        verbose_name='Finished At'
+    )
+    
+    objects = SwaggerFileSweepManager()
+    
+    class Meta:
+        db_table = 'swagger_file_sweeps'
+    
+    def __str__(self):
+        return f'swagger_file_sweep_{self.started_at}'
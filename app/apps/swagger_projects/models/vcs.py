@@ -1,6 +1,12 @@
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+
+from django.conf import settings
 from django.core import signing
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 
 from apps.accounts.models import Company
 from apps.swagger_projects.vcs_utility import (
@@ -10,12 +16,41 @@ from apps.swagger_projects.vcs_utility import (
 )
 
 
+class RemoteVCSAccountManager(models.Manager):
+    
+    def due_for_access_token_refresh(self) -> models.QuerySet:
+        """
+        Remote VCS accounts with a refresh token
+        whose access token refresh is due (soonest first).
+        
+        Accounts whose access token expiry is unknown
+        (e.g. registered before expiries were recorded) are refreshed
+        on every run until the provider reports an expiry.
+        Accounts whose access tokens don't expire are never due
+        (see RemoteVCSAccount.NEVER_REFRESH_AT).
+        """
+        return (
+            self.filter(refresh_token__isnull=False)
+            .filter(models.Q(access_token_refresh_at__isnull=True) |
+                    models.Q(access_token_refresh_at__lte=timezone.now()))
+            .order_by(models.F('access_token_refresh_at').asc(nulls_first=True))
+        )
+
+
 class RemoteVCSAccount(models.Model):
     """
     This Model represents a Remote Version Control System Account
     registered in "our" system via OAuth.
+    
+    Access token expiry reported by the VCS provider is recorded,
+    the access token is refreshed when it's about to expire
+    (see schedule_access_token_refresh).
     """
     
+    # refresh "scheduled at" of access tokens that don't expire
+    # (no refresh scheduled at all means the expiry is unknown)
+    NEVER_REFRESH_AT = datetime.max.replace(tzinfo=timezone.utc)
+    
     GITHUB = 'GH'
     BITBUCKET = 'BB'
     REMOTE_VCS_SERVICE_CHOICES = (
@@ -46,6 +81,20 @@ class RemoteVCSAccount(models.Model):
         default=None,
         verbose_name='Remote VCS Account OAuth Refresh Token'
     )
+    access_token_expires_at = models.DateTimeField(
+        null=True,
+        default=None,
+        verbose_name='OAuth Access Token Expires At'
+    )
+    access_token_refresh_at = models.DateTimeField(
+        null=True,
+        default=None,
+        verbose_name='OAuth Access Token Refresh Scheduled At'
+    )
+    access_token_refresh_failures = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Consecutive OAuth Access Token Refresh Failures'
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Created At'
@@ -73,6 +122,8 @@ class RemoteVCSAccount(models.Model):
         verbose_name='Owned by Company'
     )
     
+    objects = RemoteVCSAccountManager()
+    
     class Meta:
         db_table = 'remote_vcs_accounts'
         indexes = [
@@ -80,6 +131,12 @@ class RemoteVCSAccount(models.Model):
             models.Index(
                 fields=['created_at', 'company'],
                 name='idx_vcs_accs_created_at'
+            ),
+            # for selecting remote VCS accounts due for access token refresh
+            models.Index(
+                fields=['access_token_refresh_at'],
+                condition=models.Q(refresh_token__isnull=False),
+                name='idx_vcs_accs_token_refresh_at'
             )
         ]
         constraints = [
@@ -116,13 +173,14 @@ class RemoteVCSAccount(models.Model):
     
     def set_and_validate_access_token(self, temp_token: str) -> None:
         try:
-            access_token, refresh_token = \
+            access_token, refresh_token, expires_in = \
                 self.vcs_auth_util.get_access_token(temp_token)
         except InvalidOrExpiredTemporaryOAuthTokenError as e:
             raise ValidationError(e.message)
         
         self._set_access_token(access_token)
         self._set_refresh_token(refresh_token)
+        self.schedule_access_token_refresh(expires_in)
     
     def refresh_access_token(self) -> None:
         # if a particular model instance doesn't have a refresh token,
@@ -130,11 +188,60 @@ class RemoteVCSAccount(models.Model):
         if not self.refresh_token:
             return
         
-        access_token, refresh_token = \
-            self.vcs_auth_util.refresh_access_token(self.refresh_token)
+        access_token, refresh_token, expires_in = \
+            self.vcs_auth_util.refresh_access_token(
+                self.unencrypted_refresh_token)
         
         self._set_access_token(access_token)
         self._set_refresh_token(refresh_token)
+        self.schedule_access_token_refresh(expires_in)
+    
+    def schedule_access_token_refresh(self, expires_in: Optional[int]) -> None:
+        """
+        Record access token expiry (lifetime in seconds reported
+        by the VCS provider, None if the access token doesn't expire)
+        and schedule its refresh
+        VCS_ACCESS_TOKEN_EXPIRY_WINDOW_IN_SECONDS before it expires.
+        
+        Refreshes are scheduled up to VCS_ACCESS_TOKEN_REFRESH_SPREAD_IN_SECONDS
+        earlier at random, so that access tokens issued at the same time
+        are not all refreshed by the same run.
+        """
+        self.access_token_refresh_failures = 0
+        if expires_in is None:
+            self.access_token_expires_at = None
+            self.access_token_refresh_at = self.NEVER_REFRESH_AT
+            return
+        
+        now = timezone.now()
+        refresh_in = max(
+            expires_in -
+            settings.VCS_ACCESS_TOKEN_EXPIRY_WINDOW_IN_SECONDS -
+            random.uniform(0, settings.VCS_ACCESS_TOKEN_REFRESH_SPREAD_IN_SECONDS),
+            0
+        )
+        self.access_token_expires_at = now + timedelta(seconds=expires_in)
+        self.access_token_refresh_at = now + timedelta(seconds=refresh_in)
+    
+    def postpone_access_token_refresh(self) -> None:
+        """
+        Postpone the refresh of an access token that failed to be refreshed
+        (so that it doesn't hold up refreshes of the other access tokens).
+        
+        The retry delay (VCS_ACCESS_TOKEN_REFRESH_RETRY_DELAY_IN_SECONDS)
+        doubles with each consecutive failure
+        up to VCS_ACCESS_TOKEN_REFRESH_MAX_RETRY_DELAY_IN_SECONDS,
+        up to half of it is subtracted at random, so that refreshes
+        that failed together are not retried together.
+        """
+        self.access_token_refresh_failures += 1
+        delay = min(
+            settings.VCS_ACCESS_TOKEN_REFRESH_RETRY_DELAY_IN_SECONDS *
+            2 ** (self.access_token_refresh_failures - 1),
+            settings.VCS_ACCESS_TOKEN_REFRESH_MAX_RETRY_DELAY_IN_SECONDS
+        )
+        self.access_token_refresh_at = timezone.now() + timedelta(
+            seconds=random.uniform(delay / 2, delay))
     
     def revoke_access_token(self) -> None:
         self.vcs_auth_util.revoke_access_token(self.unencrypted_access_token)
@@ -1,8 +1,20 @@
+from datetime import timedelta
+
 from django.apps import apps
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from django.utils import timezone
 
-from apps.swagger_projects.models import SwaggerFileChange
+from apps.swagger_projects.metrics import (
+    metrics,
+    WEBHOOKS_RECEIVED,
+    REGISTERED,
+    DEBOUNCED,
+    IGNORED
+)
+from apps.swagger_projects.models import SwaggerFileChange, SwaggerProject
+from apps.swagger_projects.tasks import process_swagger_project_changes
 from .single_dispatch_classes import (
     RemoteVcsAccountIdFactory,
     SwaggerProjectInstanceIdFactory,
@@ -26,6 +38,19 @@ class RepositoryCommitsWebhookCallback:
     by parsing and interpreting the request body
     and saving the parsed result into a DB persisted
     SwaggerFileChange model instance.
+    
+    If webhook processing is enabled in settings,
+    swagger file changes of the swagger project are processed
+    by a separate debounced task (process_swagger_project_changes)
+    instead of waiting for the next sweep.
+    Commits are not added to a pending swagger file change
+    already claimed by the task (its swagger file may have been
+    downloaded before the commits), a new pending swagger file change
+    with a task of its own is registered instead.
+    
+    The outcome of each webhook (a commit registered
+    with a new or an existing pending swagger file change, or ignored)
+    is recorded in metrics.
     """
     
     def __init__(self, remote_vcs_service_header: str, data: dict):
@@ -101,15 +126,48 @@ class RepositoryCommitsWebhookCallback:
                 'Callback not initialized. Call initialize_callback()')
         
         if self.ignore_webhook or not self.related_commit_details:
+            metrics.inc(WEBHOOKS_RECEIVED, vcs=self.remote_vcs_service,
+                        outcome=IGNORED)
             return
         
         # persist parsed and interprated webhook request body to DB
         # update or create a new SwaggerFileChange instance
-        swagger_file_change, created = SwaggerFileChange.objects.get_or_create(
-            swagger_project_id=self.swagger_project_id,
-            swagger_file_changes={}
+        # (row lock orders it against claiming by the processing task)
+        with transaction.atomic():
+            swagger_file_change, created = (
+                SwaggerFileChange.objects.select_for_update().get_or_create(
+                    swagger_project_id=self.swagger_project_id,
+                    status=SwaggerFileChange.PENDING,
+                    processing_started_at=None
+                )
+            )
+            swagger_file_change.related_commit_details.append(
+                self.related_commit_details)
+            
+            swagger_file_change.save(update_fields=['related_commit_details'])
+        metrics.inc(WEBHOOKS_RECEIVED, vcs=self.remote_vcs_service,
+                    outcome=REGISTERED if created else DEBOUNCED)
+        
+        if settings.SWAGGER_PROJECT_WEBHOOK_PROCESSING:
+            # the sweep picks the swagger project up
+            # only if the processing task was lost
+            next_check_at = timezone.now() + timedelta(
+                seconds=settings.SWAGGER_PROJECT_WEBHOOK_DEBOUNCE_IN_SECONDS +
+                settings.SWAGGER_PROJECT_MIN_CHECK_INTERVAL_IN_SECONDS)
+        else:
+            next_check_at = timezone.now()
+        
+        # a commit may have changed the swagger file,
+        # reset the swagger project's check interval backoff
+        SwaggerProject.objects.filter(id=self.swagger_project_id).update(
+            next_check_at=next_check_at,
+            check_interval=0
         )
-        swagger_file_change.related_commit_details.append(
-            self.related_commit_details)
         
-        swagger_file_change.save()
+        # debounce - commits registered before the task runs
+        # are added to the same pending swagger file change
+        if settings.SWAGGER_PROJECT_WEBHOOK_PROCESSING and created:
+            process_swagger_project_changes.apply_async(
+                (self.swagger_project_id,),
+                countdown=settings.SWAGGER_PROJECT_WEBHOOK_DEBOUNCE_IN_SECONDS
+            )
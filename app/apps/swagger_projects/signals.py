@@ -4,6 +4,7 @@ from django.dispatch import Signal, receiver
 from django.db.models.signals import post_save, post_delete
 
 from utils.decorators import close_db_connections_when_finished
+from apps.swagger_projects.metrics import metrics
 from apps.swagger_projects.repo_commits_webhook_callback import RepositoryCommitsWebhookCallback
 from apps.swagger_projects.models import (
     SwaggerProject,
@@ -28,7 +29,10 @@ def webhook_callback_task(remote_vcs_service_header: str,
         data=request_data
     )
     webhook_callback.initialize_callback()
-    webhook_callback()
+    try:
+        webhook_callback()
+    finally:
+        metrics.flush()
 
 
 @receiver(post_save, sender=SwaggerProject)
@@ -1,31 +1,144 @@
+import logging
 import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from queue import Queue
 from threading import Event
-from collections import namedtuple, defaultdict
+from time import perf_counter
+from functools import wraps
+from typing import Callable, Dict, Union
 
 import celery
 
+from django.conf import settings
 from django.db import transaction, DatabaseError
-from django.db.models import Q, Prefetch
+from django.db.models import Q, Prefetch, Min, Max, Count, Exists, OuterRef
+from django.utils import timezone
 
 from config.celery import app
 from utils.decorators import close_db_connections_when_finished
+from utils.functions import split_range
+from apps.swagger_projects.metrics import (
+    metrics,
+    SWEEP_DURATION,
+    SWEEP_SHARD_DURATION,
+    ACCESS_TOKEN_REFRESH_DURATION
+)
 from apps.swagger_projects.workers import workers
+from apps.swagger_projects.workers.instrumentation import SweepStatsCollector
+from apps.swagger_projects.workers.concurrency import AdaptiveConcurrencyController
+from apps.swagger_projects.workers.circuit_breaker import HostCircuitBreaker
+from apps.swagger_projects.workers.shared import SharedSwaggerFiles
 from apps.swagger_projects.models import (
     SwaggerFile,
     RemoteVCSAccount,
-    SwaggerFileChange
+    SwaggerFileChange,
+    SwaggerFileSweep,
+    TaskLease
 )
 
+logger = logging.getLogger(__name__)
+
 
 class TaskWithRetryOnDBError(celery.Task):
     autoretry_for = (DatabaseError,)
     retry_kwargs = {'max_retries': 3, 'countdown': 3}
 
 
+class SwaggerFileSweepShardTask(TaskWithRetryOnDBError):
+    
+    def on_failure(self, exc, task_id, args, kwargs, einfo) -> None:
+        """
+        Record a shard that failed permanently (after all its retries)
+        with its sweep, otherwise the sweep would never finish.
+        """
+        sweep_id = kwargs['sweep_id'] if 'sweep_id' in kwargs else args[0]
+        try:
+            with transaction.atomic():
+                sweep = SwaggerFileSweep.objects.record_shard_failure(sweep_id)
+        except DatabaseError as e:
+            # the sweep's lease expires eventually
+            logger.exception(e)
+            return
+        
+        logger.error(f'Swagger file changes sweep {sweep_id} '
+                     f'shard {task_id} failed: {exc!r}')
+        if sweep.finished_at is not None:
+            metrics.observe(
+                SWEEP_DURATION,
+                (sweep.finished_at - sweep.started_at).total_seconds()
+            )
+        metrics.flush()
+
+
+def run_exclusively(lease_name: str) -> Callable:
+    """
+    Primary usage: prevent overlapping runs of periodic celery tasks.
+    
+    Runs the decorated function only if it isn't already running
+    in some other process (on any node), otherwise skips it and returns None.
+    Exclusivity is ensured by a lease (see TaskLease) which is released
+    when the function returns. The lease expires
+    after TASK_LEASE_TIMEOUT_IN_SECONDS, so a run that hangs
+    (or whose process dies) doesn't block the following runs forever.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            holder = TaskLease.objects.acquire(
+                lease_name, settings.TASK_LEASE_TIMEOUT_IN_SECONDS)
+            if holder is None:
+                logger.info(f'"{lease_name}" is already running, skipped')
+                return None
+            
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                TaskLease.objects.release(lease_name, holder)
+        
+        return wrapper
+    
+    return decorator
+
+
+def pending_swagger_file_changes_prefetch() -> Prefetch:
+    # prefetch swagger file changes that have not yet been processed
+    # but registered some remote VCS account commits
+    # via provided webhook callback.
+    return Prefetch(
+        'swagger_project__swagger_file_changes',
+        queryset=SwaggerFileChange.objects.filter(
+            status=SwaggerFileChange.PENDING).order_by('id'),
+        to_attr='swagger_file_changes_queryset'
+    )
+
+
+def create_swagger_file_diffs_task(swagger_file_obj: SwaggerFile) -> workers.Task:
+    """
+    Package swagger file instance with its related swagger project
+    and prefetched pending swagger file change (if any) into a task
+    for ProcessSwaggerFileDiffsWorker
+    """
+    swagger_file_changes = \
+        swagger_file_obj.swagger_project.swagger_file_changes_queryset
+    swagger_file_change_instance = (swagger_file_changes[0]
+                                    if swagger_file_changes
+                                    else None)
+    return workers.Task(
+        swagger_file_obj,
+        swagger_file_obj.swagger_project,
+        swagger_file_change_instance
+    )
+
+
 @close_db_connections_when_finished
-def pull_and_process_swagger_file_changes_producer(task_queue: Queue,
-                                                   event: Event) -> None:
+def pull_and_process_swagger_file_changes_producer(
+    task_queue: Queue,
+    event: Event,
+    first_swagger_file_id: int,
+    last_swagger_file_id: int,
+    shared_swagger_files: SharedSwaggerFiles
+) -> None:
     """
     Query specific swagger file DB entities
     together with their related swagger projects
@@ -36,132 +149,413 @@ def pull_and_process_swagger_file_changes_producer(task_queue: Queue,
     and swagger file changes into a task
     and pass it on to ProcessSwaggerFileDiffsWorker
     via a queue for further processing.
-    """
     
-    # prefetch swagger file changes that have not yet been processed
-    # but registered some remote VCS account commits
-    # via provided webhook callback.
-    prefetch = Prefetch(
-        'swagger_project__swagger_file_changes',
-        queryset=SwaggerFileChange.objects.filter(swagger_file_changes={}),
-        to_attr='swagger_file_changes_queryset'
-    )
+    Only swagger files within the provided id range (shard) are queried.
+    
+    Swagger files are queried in keyset-ordered chunks (by id),
+    only a single chunk of swagger files is held in memory at a time.
+    The queue is bounded, so the producer blocks
+    while consumers are busy processing previously produced tasks.
+    
+    Swagger file URLs shared by several swagger projects of the shard
+    are registered in SharedSwaggerFiles before any tasks are produced,
+    so that each of these swagger files is downloaded only once.
+    """
     
     # query swagger files related to swagger projects
-    # which are not integrated with a remote VCS account
-    # as well as swagger files related to swagger projects
-    # integrated with remote VCS accounts that had recent commits
-    # and may have triggered swagger file changes.
+    # which are due to be checked (their check interval has passed):
+    # swagger projects not integrated with a remote VCS account
+    # as well as swagger projects integrated with remote VCS accounts
+    # that had recent commits and may have triggered swagger file changes
+    # (usually these are processed by process_swagger_project_changes,
+    # see RepositoryCommitsWebhookCallback).
     
     # Prefetch related swagger projects and swagger file changes
     # for swagger projects integrated with VCS accounts
     # (swagger file change entities only with related commit details provided) -
     # prefetched entities will be used by ProcessSwaggerFileDiffsWorker.
+    
+    # Stored swagger files and their fingerprints are deferred -
+    # ProcessSwaggerFileDiffsWorker loads them
+    # only if swagger file changes are detected.
+    
+    # Pending swagger file changes are looked up with a subquery
+    # (covered by a partial index) instead of a join,
+    # so swagger files don't have to be deduplicated.
+    pending_swagger_file_changes = SwaggerFileChange.objects.filter(
+        swagger_project_id=OuterRef('swagger_project_id'),
+        status=SwaggerFileChange.PENDING
+    )
     swagger_file_queryset = (
         SwaggerFile.objects.select_related(
             'swagger_project'
         )
-        .prefetch_related(prefetch)
+        .defer('swagger_file', 'swagger_file_fingerprints')
+        .prefetch_related(pending_swagger_file_changes_prefetch())
+        .annotate(has_pending_changes=Exists(pending_swagger_file_changes))
         .filter(
-            Q(swagger_project__use_vcs=False) |
-            Q(swagger_project__swagger_file_changes__swagger_file_changes={})
+            Q(swagger_project__use_vcs=False) | Q(has_pending_changes=True),
+            swagger_project__next_check_at__lte=timezone.now(),
+            id__gte=first_swagger_file_id,
+            id__lte=last_swagger_file_id
         )
-        .distinct('id')
     )
     
-    # package each swagger file instance from the previous queryset into a task
-    # and pass it on to ProcessSwaggerFileDiffsWorker
-    # via a thread safe queue for further processing
-    for swagger_file_obj in swagger_file_queryset:
-        Task = namedtuple(
-            'Task',
-            ['swagger_file_instance',
-             'swagger_project_instance',
-             'swagger_file_change_instance']
+    shared_swagger_file_urls = (
+        swagger_file_queryset.order_by()
+        .values('swagger_project__swagger_file_url')
+        .annotate(swagger_projects=Count('id'))
+        .filter(swagger_projects__gt=1)
+        .values_list('swagger_project__swagger_file_url', 'swagger_projects')
+    )
+    for swagger_file_url, swagger_projects in shared_swagger_file_urls:
+        shared_swagger_files.register(swagger_file_url, swagger_projects)
+    
+    chunk_size = settings.SWAGGER_FILE_DIFFS_CHUNK_SIZE
+    last_seen_swagger_file_id = first_swagger_file_id - 1
+    
+    while True:
+        # next chunk of swagger files after the last seen id,
+        # related entities are prefetched per chunk
+        swagger_files_chunk = list(
+            swagger_file_queryset.filter(id__gt=last_seen_swagger_file_id)
+            .order_by('id')[:chunk_size]
         )
+        if not swagger_files_chunk:
+            break
         
-        swagger_file_changes = \
-            swagger_file_obj.swagger_project.swagger_file_changes_queryset
-        swagger_file_change_instance = (swagger_file_changes[0]
-                                        if swagger_file_changes
-                                        else None)
-        task = Task(
-            swagger_file_obj,
-            swagger_file_obj.swagger_project,
-            swagger_file_change_instance
-        )
-        task_queue.put(task)
+        last_seen_swagger_file_id = swagger_files_chunk[-1].id
+        
+        # package each swagger file instance from the chunk into a task
+        # and pass it on to ProcessSwaggerFileDiffsWorker
+        # via a thread safe queue for further processing
+        for swagger_file_obj in swagger_files_chunk:
+            # blocks if the queue is full
+            task_queue.put(create_swagger_file_diffs_task(swagger_file_obj))
+        
+        # release the processed chunk before querying the next one
+        del swagger_files_chunk
     
     # signal that no more tasks will be produced after this
     event.set()
 
 
 @app.task(bind=True, base=TaskWithRetryOnDBError)
-def pull_and_process_swagger_file_changes() -> None:
+@run_exclusively('pull_and_process_swagger_file_changes')
+def pull_and_process_swagger_file_changes(self) -> Dict[str, int]:
     """
-    Launch producer and consumers in separate threads,
-    delegate swagger file changes processing to consumer workers,
-    collect results and persist them to DB.
+    Coordinate a sweep over all the swagger files.
+    
+    If the previous sweep is still being processed (holds a lease),
+    skip this run - swagger files would be fetched and processed
+    twice and results of both sweeps would race for the same DB rows.
+    The coordinator itself never runs concurrently on different nodes.
+    
+    Split swagger files into shards (id ranges
+    of SWAGGER_FILE_SWEEP_SHARD_SIZE ids) and dispatch a separate task
+    for each shard, so that shards are processed
+    by all the available celery workers.
+    
+    Shards persist their own results and aggregate their summaries
+    in a SwaggerFileSweep entity, the last finished shard
+    marks the sweep as finished.
     """
     
-    task_queue = Queue()
-    # 10 is the optimal number of workers,
-    # if exceeded, performance begins to stagnate and then degrade
-    num_consumers = 10
-    event = threading.Event()
-    # delegate the responsibility of defining required locks
-    # to ProcessSwaggerFileDiffsWorker
-    # these locks protect the "results_mapping" shared resource
-    locks = defaultdict(threading.Lock)
-    # delegate the responsibility of defining required result entities
-    # to ProcessSwaggerFileDiffsWorker
-    results_mapping = defaultdict(list)
-    
-    # start producing tasks
-    producer = threading.Thread(
-        target=pull_and_process_swagger_file_changes_producer,
-        args=(task_queue, event)
+    active_sweep_id = SwaggerFileSweep.objects.active().values_list(
+        'id', flat=True).first()
+    if active_sweep_id is not None:
+        logger.info(f'Swagger file changes sweep {active_sweep_id} '
+                    f'is still running, skipped')
+        return {'shards': 0, 'active_sweep_id': active_sweep_id}
+    
+    swagger_file_ids = SwaggerFile.objects.aggregate(
+        first_id=Min('id'),
+        last_id=Max('id')
     )
-    producer.start()
+    if swagger_file_ids['first_id'] is None:
+        return {'shards': 0}
     
-    # start consuming tasks
-    for _ in range(num_consumers):
-        consumer = workers.ProcessSwaggerFileDiffsWorker(
-            task_queue=task_queue,
-            event=event,
-            locks=locks,
-            results_mapping=results_mapping
+    shards = split_range(
+        swagger_file_ids['first_id'],
+        swagger_file_ids['last_id'],
+        settings.SWAGGER_FILE_SWEEP_SHARD_SIZE
+    )
+    sweep = SwaggerFileSweep.objects.create(shards_total=len(shards))
+    
+    for first_swagger_file_id, last_swagger_file_id in shards:
+        process_swagger_file_changes_shard.delay(
+            sweep.id,
+            first_swagger_file_id,
+            last_swagger_file_id
         )
-        consumer.start()
     
-    # wait for producer and all the consumers to be finished
-    producer.join()
-    task_queue.join()
+    logger.info(f'Swagger file changes sweep {sweep.id} '
+                f'dispatched in {len(shards)} shards')
     
-    # collect results and save them to DB
-    # do it within a transaction to avoid data inconsistency -
-    # updated swagger files without registered swagger file changes
-    with transaction.atomic():
-        SwaggerFileChange.objects.bulk_update(
-            results_mapping[workers.SWAGGER_FILE_CHANGES_TO_UPDATE],
-            ['changes_added_at', 'swagger_file_changes'],
-            batch_size=100
+    return {'sweep_id': sweep.id, 'shards': len(shards)}
+
+
+@app.task(bind=True, base=SwaggerFileSweepShardTask)
+def process_swagger_file_changes_shard(
+    self,
+    sweep_id: int,
+    first_swagger_file_id: int,
+    last_swagger_file_id: int
+) -> Dict[str, Union[int, dict]]:
+    """
+    Launch producer, consumers and writer in separate threads,
+    delegate swagger file changes processing to consumer workers,
+    persist results to DB in batches while the shard is being processed
+    (see PersistSwaggerFileResultsWorker).
+    
+    Only swagger files within the provided id range (shard) are processed.
+    
+    Return a summary of the shard -
+    number of entities per result type
+    (including swagger files short-circuited due to an unchanged digest).
+    The summary is added to the summary of the sweep
+    when all the shard's results are persisted.
+    A shard that fails permanently is recorded as failed
+    with its sweep instead (see SwaggerFileSweepShardTask).
+    
+    If swagger file diffs process pool is enabled in settings,
+    consumer workers only download swagger files
+    and delegate CPU-bound processing to a pool of processes
+    (GIL-bound threads can only use a single core).
+    
+    If asynchronous swagger file fetching is enabled in settings,
+    tasks are passed from the producer to FetchSwaggerFilesWorker,
+    which downloads swagger files concurrently
+    and passes them on to consumer workers.
+    
+    If swagger file diffs instrumentation is enabled in settings,
+    the summary also includes per-stage counters and timings
+    aggregated across all the processed swagger files.
+    
+    The number of consumer workers is adjusted at runtime
+    by AdaptiveConcurrencyController (within configured bounds),
+    the shard's summary reports the chosen concurrency
+    and the reasons for each adjustment.
+    
+    Swagger files are not downloaded from hosts that keep failing
+    for a cool-down period (see HostCircuitBreaker),
+    the summary reports failed and skipped downloads and opened circuits.
+    
+    Metrics recorded while processing the shard are flushed
+    when it's finished, the last finished shard records
+    the duration of the whole sweep.
+    """
+    
+    started_at = perf_counter()
+    
+    # renew the sweep's lease before processing the shard
+    SwaggerFileSweep.objects.heartbeat(sweep_id)
+    
+    # bounded queue - applies backpressure to the producer
+    task_queue = Queue(maxsize=settings.SWAGGER_FILE_DIFFS_QUEUE_SIZE)
+    event = threading.Event()
+    # swagger files shared by several swagger projects of the shard
+    # (registered by the producer) are downloaded and processed once
+    shared_swagger_files = SharedSwaggerFiles()
+    # skips downloads from hosts that keep failing
+    circuit_breaker = HostCircuitBreaker(
+        failure_threshold=settings.SWAGGER_FILE_FETCH_CIRCUIT_FAILURE_THRESHOLD,
+        cool_down=settings.SWAGGER_FILE_FETCH_CIRCUIT_COOL_DOWN_IN_SECONDS
+    )
+    # results of processed swagger files waiting to be persisted,
+    # bounded - applies backpressure to consumer workers
+    results_queue = Queue(maxsize=settings.SWAGGER_FILE_RESULTS_BATCH_SIZE)
+    # aggregates per-stage timings and counters reported by consumer workers
+    stats_collector = (SweepStatsCollector()
+                       if settings.SWAGGER_FILE_DIFFS_INSTRUMENTATION
+                       else None)
+    # spawned (not forked) processes don't inherit threads,
+    # DB connections and open sockets of this process
+    executor = (ProcessPoolExecutor(
+                    max_workers=settings.SWAGGER_FILE_DIFFS_PROCESS_POOL_SIZE,
+                    mp_context=multiprocessing.get_context('spawn'))
+                if settings.SWAGGER_FILE_DIFFS_PROCESS_POOL
+                else None)
+    
+    try:
+        # swagger files are downloaded by a separate stage
+        # between the producer and consumer workers
+        fetch_queue = (Queue(maxsize=settings.SWAGGER_FILE_DIFFS_QUEUE_SIZE)
+                       if settings.SWAGGER_FILE_ASYNC_FETCH
+                       else None)
+        
+        # start producing tasks
+        # (if swagger files are fetched by a separate stage,
+        # the fetcher signals consumers that all the tasks are passed on)
+        producer = threading.Thread(
+            target=pull_and_process_swagger_file_changes_producer,
+            args=((task_queue, event) if fetch_queue is None
+                  else (fetch_queue, threading.Event()),
+                  first_swagger_file_id, last_swagger_file_id,
+                  shared_swagger_files)
         )
+        producer.start()
         
-        SwaggerFileChange.objects.bulk_create(
-            results_mapping[workers.SWAGGER_FILE_CHANGES_TO_CREATE],
-            batch_size=100
+        # start fetching swagger files
+        if fetch_queue is not None:
+            fetcher = workers.FetchSwaggerFilesWorker(
+                input_queue=fetch_queue,
+                output_queue=task_queue,
+                output_event=event,
+                concurrency=settings.SWAGGER_FILE_FETCH_CONCURRENCY,
+                per_host_concurrency=settings.SWAGGER_FILE_FETCH_PER_HOST_CONCURRENCY,
+                parse=executor is None,
+                shared_swagger_files=shared_swagger_files,
+                circuit_breaker=circuit_breaker
+            )
+            fetcher.start()
+        
+        # start persisting results
+        writer = workers.PersistSwaggerFileResultsWorker(
+            results_queue=results_queue,
+            batch_size=settings.SWAGGER_FILE_RESULTS_BATCH_SIZE
         )
+        writer.start()
+        
+        # start consuming tasks,
+        # consumers are spawned and retired by the concurrency controller
+        def spawn_consumer() -> None:
+            workers.ProcessSwaggerFileDiffsWorker(
+                task_queue=task_queue,
+                event=event,
+                results_queue=results_queue,
+                stats_collector=stats_collector,
+                executor=executor,
+                shared_swagger_files=shared_swagger_files,
+                concurrency_controller=concurrency_controller,
+                circuit_breaker=circuit_breaker
+            ).start()
         
-        SwaggerFileChange.objects.filter(
-            id__in=results_mapping[workers.SWAGGER_FILE_CHANGES_TO_DELETE]
-        ).delete()
+        concurrency_controller = AdaptiveConcurrencyController(
+            spawn_worker=spawn_consumer,
+            initial_workers=settings.SWAGGER_FILE_DIFFS_CONSUMERS,
+            min_workers=settings.SWAGGER_FILE_DIFFS_MIN_CONSUMERS,
+            max_workers=settings.SWAGGER_FILE_DIFFS_MAX_CONSUMERS
+        )
+        concurrency_controller.start()
         
-        SwaggerFile.objects.bulk_update(
-            results_mapping[workers.SWAGGER_FILES_TO_UPDATE],
-            ['swagger_file'],
-            batch_size=100
+        # wait for producer, fetcher, all the consumers and writer to be finished
+        producer.join()
+        if fetch_queue is not None:
+            # signal the fetcher that no more tasks will be produced
+            fetch_queue.put(None)
+            fetcher.join()
+        task_queue.join()
+        # signal the writer that no more results will be produced
+        results_queue.put(None)
+        writer.join()
+    finally:
+        # worker processes are shut down even if the shard fails
+        if executor:
+            executor.shutdown()
+    
+    summary = dict(writer.summary)
+    summary['circuit_breaker'] = circuit_breaker.summary()
+    if stats_collector:
+        summary['pipeline_stats'] = stats_collector.summary()
+    
+    with transaction.atomic():
+        sweep = SwaggerFileSweep.objects.record_shard_summary(sweep_id, summary)
+    
+    metrics.observe(SWEEP_SHARD_DURATION, perf_counter() - started_at)
+    if sweep.finished_at is not None:
+        metrics.observe(
+            SWEEP_DURATION,
+            (sweep.finished_at - sweep.started_at).total_seconds()
         )
+    metrics.flush()
+    
+    # concurrency and hosts with open circuits are reported per shard,
+    # they're not aggregated by the sweep
+    summary['concurrency'] = concurrency_controller.summary()
+    summary['open_circuit_hosts'] = circuit_breaker.open_hosts()
+    
+    logger.info(f'Swagger file changes sweep {sweep_id} shard '
+                f'[{first_swagger_file_id}, {last_swagger_file_id}] '
+                f'finished: {summary}')
+    
+    return summary
+
+
+@app.task(bind=True, base=TaskWithRetryOnDBError)
+def process_swagger_project_changes(self, swagger_project_id: int) -> Dict[str, int]:
+    """
+    Process swagger file changes of a single swagger project
+    right after commits to its remote VCS repository were registered
+    (enqueued by RepositoryCommitsWebhookCallback).
+    
+    The task is debounced - it's enqueued with a countdown
+    by the first registered commit only, commits registered
+    in the meantime are added to the same pending swagger file change.
+    
+    The pending swagger file change is claimed before the swagger file
+    is downloaded (see SwaggerFileChange.processing_started_at),
+    commits registered afterwards are added to a new pending
+    swagger file change, which enqueues a task of its own.
+    
+    Reuses ProcessSwaggerFileDiffsWorker and
+    PersistSwaggerFileResultsWorker (run in the current thread,
+    its DB connection is left open).
+    Return a summary - number of entities per result type.
+    """
+    
+    # row lock orders claiming against commits being registered
+    # by RepositoryCommitsWebhookCallback
+    with transaction.atomic():
+        swagger_file_change_obj = (
+            SwaggerFileChange.objects.select_for_update()
+            .filter(swagger_project_id=swagger_project_id,
+                    status=SwaggerFileChange.PENDING)
+            .order_by('id')
+            .first()
+        )
+        if swagger_file_change_obj is not None:
+            swagger_file_change_obj.processing_started_at = timezone.now()
+            swagger_file_change_obj.save(
+                update_fields=['processing_started_at'])
+    
+    swagger_file_obj = (
+        SwaggerFile.objects.select_related(
+            'swagger_project'
+        )
+        .filter(swagger_project_id=swagger_project_id)
+        .first()
+    )
+    # swagger project was deleted in the meantime
+    # or its swagger file wasn't downloaded yet
+    if swagger_file_obj is None:
+        return {}
+    
+    task_queue = Queue()
+    task_queue.put(workers.Task(
+        swagger_file_obj,
+        swagger_file_obj.swagger_project,
+        swagger_file_change_obj
+    ))
+    event = threading.Event()
+    event.set()
+    results_queue = Queue()
+    
+    workers.ProcessSwaggerFileDiffsWorker(
+        task_queue=task_queue,
+        event=event,
+        results_queue=results_queue
+    ).process_tasks()
+    
+    results_queue.put(None)
+    writer = workers.PersistSwaggerFileResultsWorker(
+        results_queue=results_queue,
+        batch_size=1
+    )
+    writer.persist_results()
+    metrics.flush()
+    
+    return writer.summary
 
 
 @close_db_connections_when_finished
@@ -172,11 +566,21 @@ def refresh_remote_vcs_account_access_token_producer(task_queue: Queue,
     that require OAuth access token resfresh,
     delegate token refreshing to RefreshRemoteVCSAccountAccessTokenWorker
     via a thread safe queue.
+    
+    Only accounts whose access tokens are about to expire
+    or whose postponed refresh is due are refreshed
+    (see RemoteVCSAccount.schedule_access_token_refresh
+    and RemoteVCSAccount.postpone_access_token_refresh),
+    at most VCS_ACCESS_TOKEN_REFRESH_BATCH_SIZE per run (soonest first),
+    the rest are left to the following runs.
     """
     
     # Filter out remote VCS accounts that do not require OAuth token refresh
-    remote_vcs_account_queryset_gen = RemoteVCSAccount.objects.all().exclude(
-        refresh_token__isnull=True).iterator()
+    remote_vcs_account_queryset_gen = (
+        RemoteVCSAccount.objects.due_for_access_token_refresh()
+        [:settings.VCS_ACCESS_TOKEN_REFRESH_BATCH_SIZE]
+        .iterator()
+    )
     
     # Delegate token refresh to RefreshRemoteVCSAccountAccessTokenWorker
     # via a thread safe queue
@@ -188,17 +592,24 @@ def refresh_remote_vcs_account_access_token_producer(task_queue: Queue,
 
 
 @app.task(bind=True, base=TaskWithRetryOnDBError)
-def refresh_remote_vcs_account_access_token() -> None:
+@run_exclusively('refresh_remote_vcs_account_access_token')
+def refresh_remote_vcs_account_access_token(self) -> None:
     """
     Launch producer and consumers in separate threads,
     delegate OAuth access token refresh to consumer workers,
     collect results and persist them to DB.
+    
+    Skipped if the previous run is still in progress (on any node),
+    otherwise both runs would refresh the same OAuth tokens.
+    
+    The number of consumer workers is adjusted at runtime
+    by AdaptiveConcurrencyController (within configured bounds).
+    
+    Metrics recorded during the run are flushed when it's finished.
     """
     
+    started_at = perf_counter()
     task_queue = Queue()
-    # 10 is the optimal number of workers,
-    # if exceeded, performance begins to stagnate and then degrade
-    num_consumers = 10
     event = threading.Event()
     # lock that protects the "vcs_accounts_to_update" shared resource
     vcs_accounts_to_update_lock = threading.Lock()
@@ -211,15 +622,24 @@ def refresh_remote_vcs_account_access_token() -> None:
     )
     producer.start()
     
-    # start consuming
-    for _ in range(num_consumers):
-        worker = workers.RefreshRemoteVCSAccountAccessTokenWorker(
+    # start consuming,
+    # consumers are spawned and retired by the concurrency controller
+    def spawn_consumer() -> None:
+        workers.RefreshRemoteVCSAccountAccessTokenWorker(
             task_queue=task_queue,
             event=event,
             vcs_accounts_to_update=vcs_accounts_to_update,
-            vcs_accounts_to_update_lock=vcs_accounts_to_update_lock
-        )
-        worker.start()
+            vcs_accounts_to_update_lock=vcs_accounts_to_update_lock,
+            concurrency_controller=concurrency_controller
+        ).start()
+    
+    concurrency_controller = AdaptiveConcurrencyController(
+        spawn_worker=spawn_consumer,
+        initial_workers=settings.VCS_ACCESS_TOKEN_REFRESH_CONSUMERS,
+        min_workers=settings.VCS_ACCESS_TOKEN_REFRESH_MIN_CONSUMERS,
+        max_workers=settings.VCS_ACCESS_TOKEN_REFRESH_MAX_CONSUMERS
+    )
+    concurrency_controller.start()
 
     # wait for producer and all the consumers to be finished
     producer.join()
@@ -228,6 +648,18 @@ def refresh_remote_vcs_account_access_token() -> None:
     # collect results and save them to DB
     RemoteVCSAccount.objects.bulk_update(
         vcs_accounts_to_update,
-        ['access_token', 'refresh_token'],
+        ['access_token', 'refresh_token',
+         'access_token_expires_at', 'access_token_refresh_at',
+         'access_token_refresh_failures'],
         batch_size=300
     )
+    
+    postponed = sum(bool(remote_vcs_account.access_token_refresh_failures)
+                    for remote_vcs_account in vcs_accounts_to_update)
+    logger.info(f'Remote VCS account access tokens refreshed: '
+                f'{len(vcs_accounts_to_update) - postponed}, '
+                f'postponed: {postponed}, '
+                f'concurrency: {concurrency_controller.summary()}')
+    
+    metrics.observe(ACCESS_TOKEN_REFRESH_DURATION, perf_counter() - started_at)
+    metrics.flush()
@@ -2,5 +2,6 @@ from .util_factory import vcs_auth_util_factory, vcs_webhook_util_factory
 from .util_factory import VCSAuthUtility, VCSWebhookUtiltity
 from .utils import (
     RepositoryDoesNotExistError,
-    InvalidOrExpiredTemporaryOAuthTokenError
+    InvalidOrExpiredTemporaryOAuthTokenError,
+    AccessTokenRefreshError
 )
\ No newline at end of file
@@ -66,24 +66,32 @@ class AccessTokenPayload:
 
 
 class AccessTokenResponseParser:
+    """
+    Parses access token, refresh token
+    and access token lifetime (in seconds, "expires_in")
+    """
+    
     @singledispatchmethod
     @staticmethod
     def get_tokens(service_type: VCSTypes, *,
-                   response: Response) -> Tuple[str, Union[str, None]]:
+                   response: Response) -> Tuple[str, Union[str, None], Union[int, None]]:
         raise NotImplementedError('Unsupported type')
     
     @staticmethod
     @get_tokens.register
     def _(service_type: GHType, *,
-          response: Response) -> Tuple[str, Union[str, None]]:
+          response: Response) -> Tuple[str, Union[str, None], Union[int, None]]:
+        # GitHub OAuth app access tokens do not expire
         return dict(param.split('=') for param in response.text.split('&'))[
-                   'access_token'], None
+                   'access_token'], None, None
     
     @staticmethod
     @get_tokens.register
     def _(service_type: BBType, *,
-          response: Response) -> Tuple[str, Union[str, None]]:
-        return response.json()['access_token'], response.json()['refresh_token']
+          response: Response) -> Tuple[str, Union[str, None], Union[int, None]]:
+        tokens = response.json()
+        return (tokens['access_token'], tokens['refresh_token'],
+                tokens.get('expires_in'))
 
 
 class RepoWebhookRegistrationEndpoint:
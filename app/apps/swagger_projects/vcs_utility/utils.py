@@ -1,7 +1,7 @@
 from requests import Response
 import logging
 from requests.exceptions import ConnectionError, HTTPError
-from typing import Tuple, Union
+from typing import Optional, Tuple, Union
 
 from django.apps import apps
 
@@ -47,6 +47,10 @@ class InvalidOrExpiredTemporaryOAuthTokenError(VCSUtilityError):
     default_message = 'Temporary OAuth token is invalid or has expired.'
     
     
+class AccessTokenRefreshError(VCSUtilityError):
+    default_message = 'OAuth access token could not be refreshed.'
+
+
 class VCSAuthUtility:
     """
     Provides OAuth functionality to register,
@@ -59,22 +63,35 @@ class VCSAuthUtility:
     def __init__(self, remote_vcs_service: str):
         self._remote_vcs_service_type = get_vcs_service_type(remote_vcs_service)
     
-    def get_access_token(self, temp_token: str) -> Tuple[str, str]:
+    def get_access_token(self, temp_token: str) -> Tuple[str, str, Optional[int]]:
+        """
+        Return access token, refresh token
+        and access token lifetime in seconds (None if it doesn't expire)
+        """
         response = self._trigger_access_token_request(temp_token)
         try:
-            access_token, refresh_token = \
+            access_token, refresh_token, expires_in = \
                 self._parse_access_and_refresh_token_response(response)
         except KeyError:
             raise InvalidOrExpiredTemporaryOAuthTokenError()
         
-        return access_token, refresh_token
-    
-    def refresh_access_token(self, refresh_token: str) -> Tuple[str, str]:
+        return access_token, refresh_token, expires_in
+    
+    def refresh_access_token(self, refresh_token: str) -> Tuple[str, str, Optional[int]]:
+        """
+        Return new access token, refresh token
+        and access token lifetime in seconds (None if it doesn't expire),
+        raise AccessTokenRefreshError if the VCS provider responds
+        without tokens (e.g. the refresh token was revoked - "invalid_grant")
+        """
         response = self._trigger_refresh_access_token_request(refresh_token)
-        access_token, refresh_token = \
-            self._parse_access_and_refresh_token_response(response)
+        try:
+            access_token, refresh_token, expires_in = \
+                self._parse_access_and_refresh_token_response(response)
+        except (KeyError, ValueError):
+            raise AccessTokenRefreshError()
         
-        return access_token, refresh_token
+        return access_token, refresh_token, expires_in
     
     def revoke_access_token(self, access_token: str) -> Union[Response, None]:
         endpoint = AccessTokenRevokeEndpoint.get_endpoint(
@@ -129,12 +146,13 @@ class VCSAuthUtility:
         return response
 
     def _parse_access_and_refresh_token_response(self, response: Response) -> Tuple[str, ...]:
-        access_token, refresh_token = AccessTokenResponseParser.get_tokens(
-            self._remote_vcs_service_type,
-            response=response
-        )
+        access_token, refresh_token, expires_in = \
+            AccessTokenResponseParser.get_tokens(
+                self._remote_vcs_service_type,
+                response=response
+            )
     
-        return access_token, refresh_token
+        return access_token, refresh_token, expires_in
 
 
 class VCSWebhookUtiltity:
@@ -0,0 +1,131 @@
+import logging
+import threading
+from time import monotonic
+from typing import Any, Callable, Dict, List
+
+from requests.exceptions import HTTPError, RequestException
+
+from .exceptions import HostCircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# circuit states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class HostCircuitBreaker:
+    """
+    Tracks failed requests per host and stops sending requests
+    to hosts that keep failing.
+    
+    1) While a host's circuit is closed, requests are sent,
+       consecutive failures (connection errors, timeouts,
+       exhausted retries, 5xx responses) are counted.
+    2) After "failure_threshold" consecutive failures the circuit opens,
+       requests to the host are skipped (HostCircuitOpenError is raised)
+       for "cool_down" seconds.
+    3) After the cool-down the circuit is half open - a single trial request
+       is sent, if it succeeds the circuit closes, otherwise it opens again.
+    
+    Responses that are received but rejected (4xx responses, too large,
+    invalid JSON) count as successes - the host itself is up,
+    a single misconfigured swagger file URL doesn't open the circuit
+    for all the swagger projects of the host.
+    
+    Failures, opened circuits and skipped requests are counted
+    and reported in "summary".
+    
+    Thread safe.
+    """
+    
+    def __init__(self, failure_threshold: int, cool_down: float):
+        self.failure_threshold = max(failure_threshold, 1)
+        self.cool_down = cool_down
+        
+        self.lock = threading.Lock()
+        self.states = dict()
+        self.failures = dict()
+        self.opened_at = dict()
+        self.counters = dict(failures=0, opened=0, skipped=0)
+    
+    def call(self, host: str, fn: Callable[[], Any]) -> Any:
+        """
+        Call fn (a request to host) unless the host's circuit is open
+        """
+        if not self.allow(host):
+            raise HostCircuitOpenError(
+                f'Requests to {host} are skipped, '
+                f'its circuit is open for {self.cool_down} seconds.')
+        
+        try:
+            result = fn()
+        except RequestException as e:
+            if is_host_failure(e):
+                self.record_failure(host)
+            else:
+                self.record_success(host)
+            raise
+        except Exception:
+            self.record_success(host)
+            raise
+        
+        self.record_success(host)
+        return result
+    
+    def allow(self, host: str) -> bool:
+        with self.lock:
+            state = self.states.get(host, CLOSED)
+            if state == CLOSED:
+                return True
+            
+            if state == OPEN and \
+                    monotonic() - self.opened_at[host] >= self.cool_down:
+                # let a single trial request through
+                self.states[host] = HALF_OPEN
+                return True
+            
+            self.counters['skipped'] += 1
+            return False
+    
+    def record_success(self, host: str) -> None:
+        with self.lock:
+            if self.states.get(host, CLOSED) != CLOSED:
+                logger.info(f'Circuit of {host} closed.')
+            self.states.pop(host, None)
+            self.failures.pop(host, None)
+            self.opened_at.pop(host, None)
+    
+    def record_failure(self, host: str) -> None:
+        with self.lock:
+            self.counters['failures'] += 1
+            self.failures[host] = self.failures.get(host, 0) + 1
+            if self.states.get(host, CLOSED) == CLOSED and \
+                    self.failures[host] < self.failure_threshold:
+                return
+            
+            self.states[host] = OPEN
+            self.opened_at[host] = monotonic()
+            self.counters['opened'] += 1
+            logger.warning(f'Circuit of {host} opened after '
+                           f'{self.failures[host]} consecutive failures, '
+                           f'requests are skipped for {self.cool_down} seconds.')
+    
+    def open_hosts(self) -> List[str]:
+        with self.lock:
+            return sorted(host for host, state in self.states.items()
+                          if state != CLOSED)
+    
+    def summary(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counters)
+
+
+def is_host_failure(error: RequestException) -> bool:
+    """
+    Error responses count as host failures only if they're server errors
+    """
+    if isinstance(error, HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return True
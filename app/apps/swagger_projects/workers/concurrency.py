@@ -0,0 +1,209 @@
+import logging
+import threading
+import time
+from time import perf_counter
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# reasons for concurrency adjustments
+THROUGHPUT_IMPROVED = 'throughput_improved'
+ERROR_RATE_ROSE = 'error_rate_rose'
+LATENCY_ROSE = 'latency_rose'
+CPU_SATURATED = 'cpu_saturated'
+
+
+class AdaptiveConcurrencyController:
+    """
+    Adjusts the number of workers of a pool at runtime
+    within ["min_workers", "max_workers"].
+    
+    Workers report the outcome and latency of each processed task
+    (see record). After every "window" tasks, the window's throughput,
+    mean latency, error rate and CPU utilization are evaluated:
+    
+    1) If the error rate exceeds "max_error_rate",
+       mean latency exceeds the best observed window latency
+       "latency_tolerance" times or CPU utilization exceeds
+       "max_cpu_utilization", the pool shrinks (multiplicatively).
+    2) Otherwise, if throughput improved by at least "min_throughput_gain"
+       compared to the previous window, the pool grows (additively).
+    3) Otherwise, the pool keeps its size.
+    
+    CPU utilization is CPU time of this process per wall time,
+    the GIL limits threads of a single process to roughly a single core,
+    so the default limit is set just below it.
+    
+    The pool grows by calling "spawn_worker" (which should create
+    and start a worker), it shrinks by letting workers retire
+    when they are done with their current task (see retire).
+    Workers that exit on their own report it (see exit_worker),
+    workers that crashed are replaced.
+    
+    Every adjustment is recorded with its reason and reported
+    together with the chosen concurrency in "summary".
+    
+    Thread safe.
+    """
+    
+    def __init__(self, spawn_worker: Callable[[], Any],
+                 initial_workers: int,
+                 min_workers: int,
+                 max_workers: int,
+                 window: int = 20,
+                 growth_step: int = 2,
+                 shrink_factor: float = 0.75,
+                 min_throughput_gain: float = 0.05,
+                 max_error_rate: float = 0.2,
+                 latency_tolerance: float = 1.5,
+                 max_cpu_utilization: float = 0.9):
+        self.spawn_worker = spawn_worker
+        self.min_workers = max(min_workers, 1)
+        self.max_workers = max(max_workers, self.min_workers)
+        self.target_workers = min(max(initial_workers, self.min_workers),
+                                  self.max_workers)
+        self.window = window
+        self.growth_step = growth_step
+        self.shrink_factor = shrink_factor
+        self.min_throughput_gain = min_throughput_gain
+        self.max_error_rate = max_error_rate
+        self.latency_tolerance = latency_tolerance
+        self.max_cpu_utilization = max_cpu_utilization
+        
+        self.lock = threading.Lock()
+        self.active_workers = 0
+        self.tasks = 0
+        self.adjustments = []
+        self.best_latency = None
+        self.previous_throughput = None
+        self._reset_window()
+    
+    def start(self) -> None:
+        """
+        Spawn the initial workers
+        """
+        with self.lock:
+            self._reset_window()
+            workers_to_spawn = self.target_workers - self.active_workers
+            self.active_workers += workers_to_spawn
+        
+        for _ in range(workers_to_spawn):
+            self.spawn_worker()
+    
+    def record(self, latency: float, error: bool = False) -> None:
+        """
+        Record a single processed task
+        (latency in seconds, whether it failed)
+        """
+        with self.lock:
+            self.tasks += 1
+            self.window_tasks += 1
+            self.window_latency += latency
+            self.window_errors += error
+            if self.window_tasks < self.window:
+                return
+            
+            workers_to_spawn = self._adjust()
+            self._reset_window()
+        
+        for _ in range(workers_to_spawn):
+            self.spawn_worker()
+    
+    def retire(self) -> bool:
+        """
+        Called by a worker before it takes its next task,
+        returns True if the worker should exit (the pool shrank)
+        """
+        with self.lock:
+            if self.active_workers <= self.target_workers:
+                return False
+            
+            self.active_workers -= 1
+            return True
+    
+    def exit_worker(self, crashed: bool = False) -> None:
+        """
+        Called by a worker that exits without having been retired
+        (no tasks left or an unexpected error),
+        a crashed worker is replaced unless the pool shrank meanwhile
+        """
+        with self.lock:
+            self.active_workers -= 1
+            respawn = crashed and self.active_workers < self.target_workers
+            if respawn:
+                self.active_workers += 1
+        
+        if respawn:
+            logger.warning('Crashed worker replaced.')
+            self.spawn_worker()
+    
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(
+                concurrency=self.target_workers,
+                min_workers=self.min_workers,
+                max_workers=self.max_workers,
+                tasks=self.tasks,
+                adjustments=list(self.adjustments)
+            )
+    
+    def _adjust(self) -> int:
+        elapsed = max(perf_counter() - self.window_started_at, 1e-9)
+        throughput = self.window_tasks / elapsed
+        latency = self.window_latency / self.window_tasks
+        error_rate = self.window_errors / self.window_tasks
+        cpu_utilization = (time.process_time() -
+                           self.window_cpu_started_at) / elapsed
+        
+        if self.best_latency is None or latency < self.best_latency:
+            self.best_latency = latency
+        previous_throughput = self.previous_throughput
+        self.previous_throughput = throughput
+        
+        metrics = dict(throughput=round(throughput, 2),
+                       latency=round(latency, 4),
+                       error_rate=round(error_rate, 4),
+                       cpu_utilization=round(cpu_utilization, 2))
+        
+        if error_rate > self.max_error_rate:
+            reason = ERROR_RATE_ROSE
+        elif latency > self.best_latency * self.latency_tolerance:
+            reason = LATENCY_ROSE
+        elif cpu_utilization > self.max_cpu_utilization:
+            reason = CPU_SATURATED
+        elif (previous_throughput is None or
+              throughput > previous_throughput * (1 + self.min_throughput_gain)):
+            reason = THROUGHPUT_IMPROVED
+        else:
+            return 0
+        
+        if reason == THROUGHPUT_IMPROVED:
+            target_workers = min(self.target_workers + self.growth_step,
+                                 self.max_workers)
+        else:
+            target_workers = max(int(self.target_workers * self.shrink_factor),
+                                 self.min_workers)
+        if target_workers == self.target_workers:
+            return 0
+        
+        self.adjustments.append(dict(
+            after_tasks=self.tasks,
+            from_workers=self.target_workers,
+            to_workers=target_workers,
+            reason=reason,
+            **metrics
+        ))
+        logger.info(f'Concurrency adjusted from {self.target_workers} '
+                    f'to {target_workers} workers ({reason}): {metrics}')
+        
+        self.target_workers = target_workers
+        workers_to_spawn = max(target_workers - self.active_workers, 0)
+        self.active_workers += workers_to_spawn
+        return workers_to_spawn
+    
+    def _reset_window(self) -> None:
+        self.window_tasks = 0
+        self.window_latency = 0.0
+        self.window_errors = 0
+        self.window_started_at = perf_counter()
+        self.window_cpu_started_at = time.process_time()
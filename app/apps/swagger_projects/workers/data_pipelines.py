@@ -1,16 +1,65 @@
 from contextlib import contextmanager
-from typing import Callable, Generator, Tuple, List, Dict, Union
-
-import dictdiffer
+from typing import Callable, Generator, Tuple, List, Dict, Optional, Union
 
 from utils.decorators import coroutine
-from .helpers import HelperMapping
+from .diff_engine import SwaggerFileDiffEngine, SwaggerDiff
+from .instrumentation import (
+    PipelineStats,
+    DIFFS_PIPELINE,
+    DIFF_GENERATION,
+    ROUTING,
+    TRANSFORM,
+    RAW_DIFFS,
+    KEPT_CHANGES
+)
+from .helpers import (
+    HelperMapping,
+    SwaggerFileFingerprints,
+    create_contract_containers_mapping
+)
 
-SwaggerDiff = Tuple[str, Union[str, List[Union[str, int]]], tuple]
 TransfomedDiff = Dict[str, List[str]]
 FilterPredicate = Callable[[SwaggerDiff], bool]
 PipeSink = Generator[None, TransfomedDiff, None]
 PipeStage = Generator[None, SwaggerDiff, None]
+DiffFormatter = Callable[[SwaggerDiff], TransfomedDiff]
+DispatchTable = Dict[Tuple[str, str], Tuple[DiffFormatter, List[TransfomedDiff]]]
+
+ENDPOINTS = 'endpoints'
+METHODS = 'methods'
+CONTRACTS = 'contracts'
+CONTRACT_PROPERTIES = 'contract_properties'
+
+
+def split_where(where: Union[str, List[str]]) -> List[str]:
+    """Split diff location into a list of keys (dotted or list notation)"""
+    return where if isinstance(where, list) else where.split('.')
+
+
+def classify_where(where: Union[str, List[str]]) -> Optional[str]:
+    """
+    Classify diff location by its shape:
+    1) "paths" - endpoint change
+    2) "paths.<endpoint>" - method change
+    3) "definitions" - contract change
+    4) "definitions.<contract>.properties" - contract properties change
+    
+    Return None for any other location
+    """
+    node = split_where(where)
+    depth = len(node)
+    
+    if depth == 1:
+        if node[0] == 'paths':
+            return ENDPOINTS
+        if node[0] == 'definitions':
+            return CONTRACTS
+    elif depth == 2 and node[0] == 'paths':
+        return METHODS
+    elif depth == 3 and node[0] == 'definitions' and node[2] == 'properties':
+        return CONTRACT_PROPERTIES
+    
+    return None
 
 
 class SwaggerFileDiffsPipeline:
@@ -18,36 +67,142 @@ class SwaggerFileDiffsPipeline:
     Split swagger file difference processing in to multiple pipeline stages,
     these stages are supposed to be easily swapped out and added if needed.
     
-    dictdiffer library does all the heavy lifting of traversing
-    and comparing json trees. Pipeline stages interprate the resulting differences
+    SwaggerFileDiffEngine does all the heavy lifting of traversing
+    and comparing swagger files (it yields differences in dictdiffer's format).
+    Pipeline stages interprate the resulting differences
+    
+    By default the pipeline runs in "dispatch table" mode:
+    each difference is classified once by its change type and location shape
+    and is passed directly to the corresponding formatter and results list.
+    The coroutine based pipeline (broadcast -> filters -> routers ->
+    transformers -> sinks) provides the same results and is used
+    if "use_dispatch_table" is False.
+    
+    If PipelineStats are provided, the pipeline records
+    time spent generating raw differences, routing them (dispatch table mode)
+    and transforming them (per location class),
+    as well as the number of raw differences vs. kept swagger file changes.
+    Without stats no instrumentation code is run.
     """
     
     def __init__(self, current_swagger_file_version: dict,
                  new_swagger_file_version: dict,
                  endpoint_contract_mapping: HelperMapping,
-                 nested_contracts_mapping: HelperMapping):
+                 nested_contracts_mapping: HelperMapping,
+                 current_swagger_file_fingerprints: Optional[SwaggerFileFingerprints] = None,
+                 new_swagger_file_fingerprints: Optional[SwaggerFileFingerprints] = None,
+                 contract_containers_mapping: Optional[HelperMapping] = None,
+                 use_dispatch_table: bool = True,
+                 stats: Optional[PipelineStats] = None):
         self.current_swagger_file_version = current_swagger_file_version
         self.new_swagger_file_version = new_swagger_file_version
         self.endpoint_contract_mapping = endpoint_contract_mapping
         self.nested_contracts_mapping = nested_contracts_mapping
+        # contracts mapped to contracts in which they are nested (O(1) lookups),
+        # built from the nested contracts mapping if not provided
+        self.contract_containers_mapping = (
+            contract_containers_mapping
+            if contract_containers_mapping is not None
+            else create_contract_containers_mapping(nested_contracts_mapping)
+        )
+        self.current_swagger_file_fingerprints = current_swagger_file_fingerprints
+        self.new_swagger_file_fingerprints = new_swagger_file_fingerprints
+        self.use_dispatch_table = use_dispatch_table
+        self.stats = stats
         self.swagger_file_changes = dict(
             removals=dict(endpoints=[], methods=[],
                           contracts=[], contract_properties=[]),
             additions=dict(endpoints=[], methods=[],
                            contracts=[], contract_properties=[])
         )
+        
+        if stats is not None:
+            self._instrument_formatters()
     
     def run(self) -> None:
+        if self.stats is None:
+            self._run()
+            return
+        
+        with self.stats.timer(DIFFS_PIPELINE):
+            self._run()
+        self.stats.count(KEPT_CHANGES, sum(
+            len(changes)
+            for section in self.swagger_file_changes.values()
+            for changes in section.values()
+        ))
+    
+    def _run(self) -> None:
+        if self.use_dispatch_table:
+            self.run_dispatch_table()
+        else:
+            self.run_pipeline()
+    
+    def run_pipeline(self) -> None:
         with self.pipeline() as pipe:
-            swagger_file_diffs_gen = dictdiffer.diff(
-                self.current_swagger_file_version,
-                self.new_swagger_file_version
-            )
-            
             # send each swagger file change to pipeline coroutine
-            for diff in swagger_file_diffs_gen:
+            for diff in self.swagger_file_diffs_gen():
                 pipe.send(diff)
     
+    def run_dispatch_table(self) -> None:
+        dispatch_table = self.compile_dispatch_table()
+        classify = (classify_where if self.stats is None
+                    else self.stats.timed(ROUTING, classify_where))
+        
+        for diff in self.swagger_file_diffs_gen():
+            route = dispatch_table.get((diff[0], classify(diff[1])))
+            if route is None:
+                continue
+            
+            format_diff, results = route
+            results.append(format_diff(diff))
+    
+    def swagger_file_diffs_gen(self) -> Generator[SwaggerDiff, None, None]:
+        swagger_file_diffs_gen = SwaggerFileDiffEngine(
+            self.current_swagger_file_version,
+            self.new_swagger_file_version,
+            current_fingerprints=self.current_swagger_file_fingerprints,
+            new_fingerprints=self.new_swagger_file_fingerprints
+        ).diff()
+        
+        if self.stats is None:
+            return swagger_file_diffs_gen
+        return self.stats.timed_iter(DIFF_GENERATION, swagger_file_diffs_gen,
+                                     counter=RAW_DIFFS)
+    
+    def compile_dispatch_table(self) -> DispatchTable:
+        """
+        Map (change type, location class) pairs
+        to formatters and results lists they should be saved to
+        """
+        formatters = {
+            ENDPOINTS: self.format_endpoint_diff,
+            METHODS: self.format_method_diff,
+            CONTRACTS: self.format_contract_diff,
+            CONTRACT_PROPERTIES: self.format_contract_properties_diff,
+        }
+        change_types = (('add', 'additions'), ('remove', 'removals'))
+        
+        return {
+            (change_type, where): (format_diff,
+                                   self.swagger_file_changes[section][where])
+            for change_type, section in change_types
+            for where, format_diff in formatters.items()
+        }
+    
+    def _instrument_formatters(self) -> None:
+        # formatters are shared by both pipeline modes,
+        # shadow them with their timed versions on this instance only
+        formatters = (
+            (ENDPOINTS, 'format_endpoint_diff'),
+            (METHODS, 'format_method_diff'),
+            (CONTRACTS, 'format_contract_diff'),
+            (CONTRACT_PROPERTIES, 'format_contract_properties_diff'),
+        )
+        for where, name in formatters:
+            setattr(self, name, self.stats.timed(f'{TRANSFORM}.{where}',
+                                                 getattr(self, name)))
+    
     @contextmanager
     def pipeline(self):
         pipe = self.pipeline_coro()
@@ -182,9 +337,7 @@ class SwaggerFileDiffsPipeline:
         """
         while True:
             diff = yield
-            where = diff[1]
-            what = [el[0] for el in diff[2]]
-            target.send(dict(where=where, what=what))
+            target.send(self.format_endpoint_diff(diff))
     
     @coroutine
     def method_diff_transformer(self, target: PipeSink) -> PipeStage:
@@ -196,9 +349,7 @@ class SwaggerFileDiffsPipeline:
         """
         while True:
             diff = yield
-            where = diff[1].split('.')[-1]
-            what = [el[0] for el in diff[2]]
-            target.send(dict(where=where, what=what))
+            target.send(self.format_method_diff(diff))
     
     @coroutine
     def contract_diff_transformer(self, target: PipeSink) -> PipeStage:
@@ -210,9 +361,7 @@ class SwaggerFileDiffsPipeline:
         """
         while True:
             diff = yield
-            where = diff[1]
-            what = [el[0] for el in diff[2]]
-            target.send(dict(where=where, what=what))
+            target.send(self.format_contract_diff(diff))
     
     @coroutine
     def contract_properties_diff_transformer(self, target: PipeSink) -> PipeStage:
@@ -232,19 +381,38 @@ class SwaggerFileDiffsPipeline:
         """
         while True:
             diff = yield
-            where = diff[1].split('.')[-2]
-            what = [el[0] for el in diff[2]]
-            new_where = dict()
-            nested_in_contracts = [k for k, v
-                                   in self.nested_contracts_mapping.items()
-                                   if where in v]
-            
-            new_where['contract'] = where
-            new_where['endpoints'] = self.endpoint_contract_mapping.get(where)
-            new_where['nested_in_other_contracts'] = \
-                nested_in_contracts if nested_in_contracts else None
-            
-            target.send(dict(where=new_where, what=what))
+            target.send(self.format_contract_properties_diff(diff))
+    
+    @staticmethod
+    def format_endpoint_diff(diff: SwaggerDiff) -> TransfomedDiff:
+        where = diff[1]
+        what = [el[0] for el in diff[2]]
+        return dict(where=where, what=what)
+    
+    @staticmethod
+    def format_method_diff(diff: SwaggerDiff) -> TransfomedDiff:
+        where = split_where(diff[1])[-1]
+        what = [el[0] for el in diff[2]]
+        return dict(where=where, what=what)
+    
+    @staticmethod
+    def format_contract_diff(diff: SwaggerDiff) -> TransfomedDiff:
+        where = diff[1]
+        what = [el[0] for el in diff[2]]
+        return dict(where=where, what=what)
+    
+    def format_contract_properties_diff(self, diff: SwaggerDiff) -> TransfomedDiff:
+        where = split_where(diff[1])[-2]
+        what = [el[0] for el in diff[2]]
+        new_where = dict()
+        nested_in_contracts = self.contract_containers_mapping.get(where)
+        
+        new_where['contract'] = where
+        new_where['endpoints'] = self.endpoint_contract_mapping.get(where)
+        new_where['nested_in_other_contracts'] = \
+            list(nested_in_contracts) if nested_in_contracts else None
+        
+        return dict(where=new_where, what=what)
     
     @coroutine
     def save_diff(self, change_type: str, where: str) -> PipeSink:
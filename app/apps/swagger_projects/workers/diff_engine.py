@@ -0,0 +1,136 @@
+from typing import Generator, List, Mapping, Optional, Tuple, Union
+
+from .helpers import SwaggerFileFingerprints
+
+SwaggerDiff = Tuple[str, Union[str, List[Union[str, int]]], tuple]
+SwaggerDiffGen = Generator[SwaggerDiff, None, None]
+SwaggerSections = Tuple[Optional[dict], Optional[dict]]
+
+ADD = 'add'
+REMOVE = 'remove'
+
+PATHS = 'paths'
+DEFINITIONS = 'definitions'
+PROPERTIES = 'properties'
+
+
+def dotted(*node: str) -> Union[str, List[str]]:
+    """
+    Return node location in dictdiffer's notation:
+    a dotted string if none of the keys contain dots, otherwise a list of keys
+    """
+    if any('.' in key for key in node):
+        return list(node)
+    return '.'.join(node)
+
+
+class SwaggerFileDiffEngine:
+    """
+    Purpose-built replacement for a generic dictdiffer walk
+    over the whole swagger file.
+    
+    Compares only the parts of a swagger file
+    that are reported as swagger file changes:
+    1) Endpoints - "paths" keys.
+    2) Methods - method keys under each endpoint.
+    3) Contracts - "definitions" keys.
+    4) Contract properties - "properties" keys under each contract.
+    
+    Descriptions, examples, parameters, etc. are never visited.
+    
+    If subtree fingerprints of both swagger file versions are provided
+    (see create_swagger_file_fingerprints), endpoints and contracts
+    with equal fingerprints are skipped without being compared.
+    
+    Differences are yielded in the same format and order
+    as they would be yielded by dictdiffer,
+    so they can be fed directly into SwaggerFileDiffsPipeline stages.
+    """
+    
+    def __init__(self, current_swagger_file_version: dict,
+                 new_swagger_file_version: dict,
+                 current_fingerprints: Optional[SwaggerFileFingerprints] = None,
+                 new_fingerprints: Optional[SwaggerFileFingerprints] = None):
+        self.current_swagger_file_version = current_swagger_file_version
+        self.new_swagger_file_version = new_swagger_file_version
+        self.current_fingerprints = current_fingerprints or {}
+        self.new_fingerprints = new_fingerprints or {}
+    
+    def __iter__(self) -> SwaggerDiffGen:
+        return self.diff()
+    
+    def diff(self) -> SwaggerDiffGen:
+        yield from self.endpoints_diff()
+        yield from self.contracts_diff()
+    
+    def endpoints_diff(self) -> SwaggerDiffGen:
+        """Yield method changes first, then endpoint changes"""
+        current, new = self._get_sections(PATHS)
+        
+        changed_entries = self._changed_common_entries(current, new, PATHS)
+        for path, current_methods in changed_entries:
+            yield from self._keys_diff(
+                current_methods,
+                new[path],
+                dotted(PATHS, path)
+            )
+        
+        yield from self._keys_diff(current, new, PATHS)
+    
+    def contracts_diff(self) -> SwaggerDiffGen:
+        """Yield contract properties changes first, then contract changes"""
+        current, new = self._get_sections(DEFINITIONS)
+        
+        changed_entries = self._changed_common_entries(current, new, DEFINITIONS)
+        for contract, current_details in changed_entries:
+            yield from self._keys_diff(
+                current_details.get(PROPERTIES),
+                new[contract].get(PROPERTIES),
+                dotted(DEFINITIONS, contract, PROPERTIES)
+            )
+        
+        yield from self._keys_diff(current, new, DEFINITIONS)
+    
+    def _get_sections(self, section: str) -> SwaggerSections:
+        return (self.current_swagger_file_version.get(section),
+                self.new_swagger_file_version.get(section))
+    
+    def _changed_common_entries(self, current: Optional[Mapping],
+                                new: Optional[Mapping],
+                                section: str) -> Generator[Tuple[str, dict], None, None]:
+        """
+        Yield entries (endpoints, contracts) present in both versions
+        in current version order,
+        skip entries which have equal fingerprints in both versions
+        """
+        if not isinstance(current, dict) or not isinstance(new, dict):
+            return
+        
+        current_fingerprints = self.current_fingerprints.get(section, {})
+        new_fingerprints = self.new_fingerprints.get(section, {})
+        
+        for key, current_details in current.items():
+            fingerprint = current_fingerprints.get(key)
+            if fingerprint is not None and \
+                    fingerprint == new_fingerprints.get(key):
+                continue
+            
+            if isinstance(current_details, dict) and \
+                    isinstance(new.get(key), dict):
+                yield key, current_details
+    
+    @staticmethod
+    def _keys_diff(current: Optional[Mapping], new: Optional[Mapping],
+                   where: Union[str, List[str]]) -> SwaggerDiffGen:
+        if not isinstance(current, dict) or not isinstance(new, dict):
+            return
+        
+        # same ordering as in dictdiffer:
+        # additions in new version order, removals in current version order
+        addition = [(k, v) for k, v in new.items() if k not in current]
+        deletion = [(k, v) for k, v in current.items() if k not in new]
+        
+        if addition:
+            yield ADD, where, addition
+        if deletion:
+            yield REMOVE, where, deletion
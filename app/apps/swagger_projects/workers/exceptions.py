@@ -0,0 +1,32 @@
+class SwaggerFileFetchError(Exception):
+    """Base swagger file fetch exception"""
+    
+    default_message = 'Swagger file could not be fetched.'
+    
+    def __init__(self, message=None, *args, **kwargs):
+        self.message = message or self.default_message
+        args = (self.message, *args)
+        super().__init__(*args, **kwargs)
+
+
+class SwaggerFileTooLargeError(SwaggerFileFetchError):
+    default_message = 'Swagger file exceeds the maximum allowed size.'
+
+
+class InvalidSwaggerFileError(SwaggerFileFetchError):
+    default_message = 'Swagger file is not a valid JSON document.'
+
+
+class HostCircuitOpenError(SwaggerFileFetchError):
+    default_message = 'Swagger file host keeps failing, requests are skipped.'
+
+
+class SwaggerFileProcessingError(Exception):
+    """Swagger file changes could not be processed by a process pool"""
+    
+    default_message = 'Swagger file changes could not be processed.'
+    
+    def __init__(self, message=None, *args, **kwargs):
+        self.message = message or self.default_message
+        args = (self.message, *args)
+        super().__init__(*args, **kwargs)
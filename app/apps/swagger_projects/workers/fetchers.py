@@ -0,0 +1,129 @@
+from collections import namedtuple
+from time import perf_counter
+from typing import Optional
+
+from requests import Response
+
+from django.apps import apps
+from django.conf import settings
+
+from apps.swagger_projects.metrics import (
+    metrics,
+    SWAGGER_FILE_FETCH_DURATION,
+    SWAGGER_FILE_FETCH_BYTES,
+    DOWNLOADED,
+    NOT_MODIFIED,
+    FAILED
+)
+from .exceptions import (
+    SwaggerFileFetchError,
+    SwaggerFileTooLargeError,
+    InvalidSwaggerFileError
+)
+from .processing import parse_swagger_file
+
+APP = apps.get_app_config('swagger_projects')
+http = APP.http
+
+HTTP_304_NOT_MODIFIED = 304
+# 64 KB
+CHUNK_SIZE = 64 * 1024
+
+SwaggerFileResponse = namedtuple(
+    'SwaggerFileResponse',
+    ['swagger_file', 'etag', 'last_modified', 'not_modified']
+)
+
+
+def fetch_swagger_file(swagger_file_url: str,
+                       etag: Optional[str] = None,
+                       last_modified: Optional[str] = None,
+                       parse: bool = True) -> SwaggerFileResponse:
+    """
+    Download and parse swagger file.
+    
+    If response validators of a previously downloaded swagger file version
+    are provided (ETag, Last-Modified), make a conditional request.
+    If the server responds with "304 Not Modified",
+    do not read the response body -
+    the previously downloaded swagger file version is still current.
+    
+    The response body is streamed and parsed with orjson straight from bytes
+    (see read_swagger_file_bytes), so only a single raw copy of the swagger file
+    is held in memory while it is being parsed.
+    If "parse" is False, the raw swagger file (bytes) is returned unparsed -
+    parsing is left to the caller (see process_swagger_file_diffs).
+    
+    Raise HTTPError if the server responds with an error status
+    (the body of an error response is never taken for a swagger file),
+    SwaggerFileTooLargeError if the swagger file exceeds
+    SWAGGER_FILE_MAX_SIZE_IN_BYTES
+    and InvalidSwaggerFileError if it's not a valid JSON document.
+    
+    Download latency (including retries) and downloaded bytes
+    are recorded in metrics.
+    """
+    headers = dict()
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    
+    started_at = perf_counter()
+    outcome = FAILED
+    try:
+        with http.get(swagger_file_url, headers=headers, stream=True) as response:
+            if response.status_code == HTTP_304_NOT_MODIFIED:
+                outcome = NOT_MODIFIED
+                return SwaggerFileResponse(
+                    swagger_file=None,
+                    etag=response.headers.get('ETag', etag),
+                    last_modified=response.headers.get('Last-Modified',
+                                                       last_modified),
+                    not_modified=True
+                )
+            
+            response.raise_for_status()
+            raw_swagger_file = read_swagger_file_bytes(response)
+            outcome = DOWNLOADED
+            metrics.inc(SWAGGER_FILE_FETCH_BYTES, len(raw_swagger_file))
+            return SwaggerFileResponse(
+                swagger_file=(parse_swagger_file(raw_swagger_file)
+                              if parse else raw_swagger_file),
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+                not_modified=False
+            )
+    finally:
+        metrics.observe(SWAGGER_FILE_FETCH_DURATION,
+                        perf_counter() - started_at, outcome=outcome)
+
+
+def read_swagger_file_bytes(response: Response,
+                            max_size: Optional[int] = None) -> bytearray:
+    """
+    Read streamed response body in chunks.
+    
+    Reject swagger files larger than max_size
+    (defaults to SWAGGER_FILE_MAX_SIZE_IN_BYTES) as early as possible:
+    before reading the body if the declared Content-Length is too large,
+    otherwise as soon as the (decompressed) body exceeds max_size.
+    """
+    max_size = max_size or settings.SWAGGER_FILE_MAX_SIZE_IN_BYTES
+    
+    content_length = response.headers.get('Content-Length')
+    if content_length and content_length.isdigit() and \
+            int(content_length) > max_size:
+        raise SwaggerFileTooLargeError(
+            f'Swagger file declares {content_length} bytes, '
+            f'maximum allowed size is {max_size} bytes.')
+    
+    body = bytearray()
+    for chunk in response.iter_content(CHUNK_SIZE):
+        body += chunk
+        if len(body) > max_size:
+            raise SwaggerFileTooLargeError(
+                f'Swagger file exceeds maximum allowed size '
+                f'of {max_size} bytes.')
+    
+    return body
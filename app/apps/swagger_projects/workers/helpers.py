@@ -1,9 +1,61 @@
-from typing import Dict, Mapping, List
+from collections import namedtuple
+from typing import Dict, Mapping, List, Optional, Generator
 
-from utils.generators import extract_values_from_dict_gen, transform_values_gen
+from utils.functions import canonical_json_digest
+from utils.generators import extract_values_from_dict_gen
 
 HelperMapping = Dict[str, List[str]]
 SwaggerSection = Mapping[str, dict]
+SwaggerFileFingerprints = Dict[str, Dict[str, str]]
+
+SwaggerFileIndex = namedtuple(
+    'SwaggerFileIndex',
+    ['endpoint_contract_mapping',
+     'nested_contracts_mapping',
+     'contract_containers_mapping',
+     'fingerprints']
+)
+
+
+def index_swagger_file(swagger_file: dict) -> SwaggerFileIndex:
+    """
+    Walk "paths" and "definitions" of a swagger file once
+    and create all the mappings required for swagger file changes processing
+    together with endpoint and contract fingerprints
+    (see create_endpoints_contract_mapping, create_nested_contracts_mapping,
+    create_contract_containers_mapping
+    and create_swagger_file_fingerprints for details).
+    
+    Each endpoint and contract is indexed by the same helpers
+    the separate functions use, so their results can't disagree.
+    """
+    endpoint_contract_mapping = dict()
+    nested_contracts_mapping = dict()
+    fingerprints = dict()
+    
+    paths = swagger_file.get('paths')
+    if isinstance(paths, dict):
+        paths_fingerprints = fingerprints['paths'] = dict()
+        
+        for path, methods in paths.items():
+            paths_fingerprints[path] = canonical_json_digest(methods)
+            _map_endpoint_contracts(path, methods, endpoint_contract_mapping)
+    
+    contracts = swagger_file.get('definitions')
+    if isinstance(contracts, dict):
+        contracts_fingerprints = fingerprints['definitions'] = dict()
+        
+        for contract, details in contracts.items():
+            contracts_fingerprints[contract] = canonical_json_digest(details)
+            _map_nested_contracts(contract, details, nested_contracts_mapping)
+    
+    return SwaggerFileIndex(
+        endpoint_contract_mapping=endpoint_contract_mapping,
+        nested_contracts_mapping=nested_contracts_mapping,
+        contract_containers_mapping=create_contract_containers_mapping(
+            nested_contracts_mapping),
+        fingerprints=fingerprints
+    )
 
 
 def create_endpoints_contract_mapping(paths: SwaggerSection) -> HelperMapping:
@@ -14,21 +66,7 @@ def create_endpoints_contract_mapping(paths: SwaggerSection) -> HelperMapping:
     endpoint_contract_mapping = dict()
     
     for path, methods in paths.items():
-        for method, details in methods.items():
-            # find value for key "$ref" - it points to contract that is being used
-            contract_gen = extract_values_from_dict_gen(details, '$ref')
-            transformed_contract_gen = transform_values_gen(
-                contract_gen,
-                lambda c: c.split('/')[-1]
-            )
-            
-            try:
-                contract = next(transformed_contract_gen)
-            except StopIteration:
-                continue
-            
-            endpoint_contract_mapping.setdefault(contract, []).append(
-                f'{method} {path}')
+        _map_endpoint_contracts(path, methods, endpoint_contract_mapping)
     
     return endpoint_contract_mapping
 
@@ -42,15 +80,78 @@ def create_nested_contracts_mapping(contracts: SwaggerSection) -> HelperMapping:
     nested_contracts_mapping = dict()
     
     for k, v in contracts.items():
-        # find all values for key "$ref" -
-        # they point to contracts that are being used
-        contract_gen = extract_values_from_dict_gen(v, '$ref')
-        transformed_contract_gen = transform_values_gen(
-            contract_gen,
-            lambda c: c.split('/')[-1]
-        )
-        
-        if contracts := list(transformed_contract_gen):
-            nested_contracts_mapping[k] = contracts
+        _map_nested_contracts(k, v, nested_contracts_mapping)
     
     return nested_contracts_mapping
+
+
+def create_contract_containers_mapping(
+    nested_contracts_mapping: HelperMapping
+) -> HelperMapping:
+    """
+    Create and return dictionary (an inverted nested contracts mapping)
+    that contains contracts as keys
+    and contracts in which they are nested as values.
+    
+    Containing contracts are listed once each,
+    in the order of the nested contracts mapping
+    """
+    contract_containers_mapping = dict()
+    
+    for container, contracts in nested_contracts_mapping.items():
+        # a contract may be referenced by its container multiple times
+        for contract in set(contracts):
+            contract_containers_mapping.setdefault(contract, []).append(
+                container)
+    
+    return contract_containers_mapping
+
+
+def create_swagger_file_fingerprints(swagger_file: dict) -> SwaggerFileFingerprints:
+    """
+    Create and return dictionary
+    that maps each endpoint (path item) and each contract
+    to a content hash of its whole subtree:
+    {"paths": {<endpoint>: <hash>}, "definitions": {<contract>: <hash>}}
+    
+    Subtrees with equal hashes in two swagger file versions are unchanged
+    and do not have to be compared (computed by index_swagger_file)
+    """
+    return index_swagger_file(swagger_file).fingerprints
+
+
+def _map_endpoint_contracts(path: str, methods: dict,
+                            endpoint_contract_mapping: HelperMapping) -> None:
+    """
+    Add methods of a single endpoint (path item)
+    to the contracts they respond with
+    """
+    for method, details in methods.items():
+        contract = _get_first_contract_ref(details)
+        if contract is None:
+            continue
+        
+        endpoint_contract_mapping.setdefault(contract, []).append(
+            f'{method} {path}')
+
+
+def _map_nested_contracts(contract: str, details: dict,
+                          nested_contracts_mapping: HelperMapping) -> None:
+    """
+    Add contracts nested in a single contract (if any)
+    """
+    if nested_contracts := list(_contract_refs_gen(details)):
+        nested_contracts_mapping[contract] = nested_contracts
+
+
+def _contract_refs_gen(target: dict) -> Generator[str, None, None]:
+    """
+    Find all values for key "$ref" - they point to contracts that are being used,
+    yield contract names
+    """
+    for ref in extract_values_from_dict_gen(target, '$ref'):
+        yield ref.split('/')[-1]
+
+
+def _get_first_contract_ref(target: dict) -> Optional[str]:
+    return next(_contract_refs_gen(target), None)
@@ -0,0 +1,122 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+# timed stages
+INDEXING = 'indexing'
+DIFFS_PIPELINE = 'diffs_pipeline'
+DIFF_GENERATION = 'diff_generation'
+ROUTING = 'routing'
+TRANSFORM = 'transform'
+
+# counters
+SWAGGER_FILES = 'swagger_files'
+RAW_DIFFS = 'raw_diffs'
+KEPT_CHANGES = 'kept_changes'
+
+
+class PipelineStats:
+    """
+    Per-stage event counts and cumulative time (in seconds)
+    recorded while processing a single swagger file.
+    
+    Not thread safe - each worker records stats of the swagger file
+    it is currently processing and passes them on
+    to SweepStatsCollector when finished.
+    
+    Instrumentation is optional: components accept None instead of stats
+    and in that case stay on their uninstrumented code paths.
+    """
+    
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.timings = defaultdict(float)
+    
+    def count(self, stage: str, events: int = 1) -> None:
+        self.counts[stage] += events
+    
+    def add_time(self, stage: str, seconds: float) -> None:
+        self.timings[stage] += seconds
+    
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        started_at = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] += perf_counter() - started_at
+    
+    def timed(self, stage: str, fn: Callable,
+              counter: Optional[str] = None) -> Callable:
+        """
+        Wrap callable to time its calls under stage
+        and count them under counter (defaults to stage)
+        """
+        counter = counter or stage
+        counts = self.counts
+        timings = self.timings
+        
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started_at = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timings[stage] += perf_counter() - started_at
+                counts[counter] += 1
+        
+        return wrapper
+    
+    def timed_iter(self, stage: str, iterable: Iterable,
+                   counter: Optional[str] = None) -> Iterator:
+        """
+        Time producing items of iterable under stage
+        and count them under counter (defaults to stage),
+        time spent by the consumer is not included
+        """
+        counter = counter or stage
+        iterator = iter(iterable)
+        counts = self.counts
+        timings = self.timings
+        
+        while True:
+            started_at = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                timings[stage] += perf_counter() - started_at
+                return
+            timings[stage] += perf_counter() - started_at
+            counts[counter] += 1
+            yield item
+    
+    def merge(self, other: 'PipelineStats') -> None:
+        for stage, events in other.counts.items():
+            self.counts[stage] += events
+        for stage, seconds in other.timings.items():
+            self.timings[stage] += seconds
+    
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        return dict(counts=dict(self.counts), timings=dict(self.timings))
+
+
+class SweepStatsCollector:
+    """
+    Thread safe aggregate of PipelineStats
+    recorded by all the workers during a single sweep
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = PipelineStats()
+    
+    def collect(self, stats: PipelineStats) -> None:
+        with self.lock:
+            self.stats.merge(stats)
+    
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return self.stats.as_dict()
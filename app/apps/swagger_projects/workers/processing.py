@@ -0,0 +1,84 @@
+"""
+CPU-bound part of swagger file changes processing
+(parsing, indexing, calculating and interpreting differences).
+
+Doesn't depend on Django being set up,
+so it can be run in a process pool - see ProcessSwaggerFileDiffsWorker.
+"""
+from collections import namedtuple
+from typing import Optional, Union
+
+import orjson
+
+from utils.functions import canonical_json_digest
+from .data_pipelines import SwaggerFileDiffsPipeline
+from .exceptions import InvalidSwaggerFileError
+from .helpers import SwaggerFileFingerprints, index_swagger_file
+from .instrumentation import PipelineStats, INDEXING
+
+SwaggerFileDiffsResult = namedtuple(
+    'SwaggerFileDiffsResult',
+    ['digest', 'fingerprints', 'swagger_file_changes', 'stats']
+)
+
+
+def parse_swagger_file(raw_swagger_file: Union[bytes, bytearray]) -> dict:
+    try:
+        return orjson.loads(raw_swagger_file)
+    except orjson.JSONDecodeError as e:
+        raise InvalidSwaggerFileError() from e
+
+
+def process_swagger_file_diffs(
+    current_swagger_file_version: Optional[dict],
+    raw_new_swagger_file: Union[bytes, bytearray],
+    current_swagger_file_digest: Optional[str],
+    current_swagger_file_fingerprints: Optional[SwaggerFileFingerprints],
+    instrumented: bool = False
+) -> SwaggerFileDiffsResult:
+    """
+    Parse downloaded swagger file, calculate its canonical digest
+    and if it differs from the digest of the stored swagger file,
+    index the new swagger file and run SwaggerFileDiffsPipeline.
+    
+    Only compact results are returned (no swagger file documents):
+    digest, fingerprints and swagger file changes of the new swagger file
+    (fingerprints and changes are None if the digests are equal)
+    and pipeline stats if instrumented.
+    
+    The stored swagger file can be omitted (None) to only compare digests
+    (so that it isn't sent to the process pool in vain),
+    fingerprints and changes are None in that case as well.
+    """
+    stats = PipelineStats() if instrumented else None
+    
+    new_swagger_file_version = parse_swagger_file(raw_new_swagger_file)
+    digest = canonical_json_digest(new_swagger_file_version)
+    if digest == current_swagger_file_digest or \
+            current_swagger_file_version is None:
+        return SwaggerFileDiffsResult(digest, None, None, stats)
+    
+    if stats is None:
+        swagger_file_index = index_swagger_file(new_swagger_file_version)
+    else:
+        with stats.timer(INDEXING):
+            swagger_file_index = index_swagger_file(new_swagger_file_version)
+    
+    pipe = SwaggerFileDiffsPipeline(
+        current_swagger_file_version=current_swagger_file_version,
+        new_swagger_file_version=new_swagger_file_version,
+        endpoint_contract_mapping=swagger_file_index.endpoint_contract_mapping,
+        nested_contracts_mapping=swagger_file_index.nested_contracts_mapping,
+        contract_containers_mapping=swagger_file_index.contract_containers_mapping,
+        current_swagger_file_fingerprints=current_swagger_file_fingerprints,
+        new_swagger_file_fingerprints=swagger_file_index.fingerprints,
+        stats=stats
+    )
+    pipe.run()
+    
+    return SwaggerFileDiffsResult(
+        digest,
+        swagger_file_index.fingerprints,
+        pipe.swagger_file_changes,
+        stats
+    )
@@ -0,0 +1,79 @@
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+# values shared between swagger projects with the same swagger file URL
+SWAGGER_FILE_RESPONSE = 'swagger_file_response'
+SWAGGER_FILE_DIGEST = 'swagger_file_digest'
+SWAGGER_FILE_INDEX = 'swagger_file_index'
+SWAGGER_FILE = 'swagger_file'
+# suffixed with the digest of the stored swagger file
+# (differences are shared only by swagger projects storing the same version)
+SWAGGER_FILE_DIFFS = 'swagger_file_diffs'
+
+
+class SharedSwaggerFiles:
+    """
+    Swagger files shared by several swagger projects
+    (swagger projects with the same swagger file URL)
+    processed during a single run.
+    
+    Each shared swagger file is downloaded once
+    and values derived from it (its digest, index, etc.)
+    are calculated once and shared between all of its swagger projects.
+    Concurrent callers wait for the value calculated by the first caller,
+    errors are shared as well.
+    
+    Swagger file URLs have to be registered (together with the number
+    of swagger projects that share them) before their swagger projects
+    are processed. Values of a shared swagger file are released
+    as soon as all of its swagger projects have been processed.
+    
+    Thread safe.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.swagger_projects_left = dict()
+        self.values = defaultdict(dict)
+    
+    def register(self, swagger_file_url: str, swagger_projects: int) -> None:
+        with self.lock:
+            self.swagger_projects_left[swagger_file_url] = swagger_projects
+    
+    def is_shared(self, swagger_file_url: Optional[str]) -> bool:
+        with self.lock:
+            return swagger_file_url in self.swagger_projects_left
+    
+    def get(self, swagger_file_url: str, name: str, fn: Callable) -> Any:
+        """
+        Return value "name" of the shared swagger file,
+        calculate it with fn if it's requested for the first time
+        """
+        with self.lock:
+            future = self.values[swagger_file_url].get(name)
+            calculate = future is None
+            if calculate:
+                future = self.values[swagger_file_url][name] = Future()
+        
+        if calculate:
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                future.set_exception(e)
+        
+        return future.result()
+    
+    def release(self, swagger_file_url: str) -> None:
+        """
+        Mark a single swagger project of the shared swagger file as processed
+        """
+        with self.lock:
+            if swagger_file_url not in self.swagger_projects_left:
+                return
+            
+            self.swagger_projects_left[swagger_file_url] -= 1
+            if self.swagger_projects_left[swagger_file_url] <= 0:
+                del self.swagger_projects_left[swagger_file_url]
+                self.values.pop(swagger_file_url, None)
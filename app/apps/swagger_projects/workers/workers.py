@@ -1,30 +1,154 @@
+import asyncio
 import threading
 import logging
+from collections import namedtuple, defaultdict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
 from threading import Event, Lock
-from queue import Queue
-from requests.exceptions import ConnectionError
-from typing import List, DefaultDict
+from time import perf_counter
+from queue import Queue, Empty
+from requests.exceptions import RequestException
+from typing import Any, Callable, List, DefaultDict, Optional
+from urllib.parse import urlsplit
 
-from django.apps import apps
+from django.db import transaction
 from django.utils import timezone
 
+from utils.decorators import close_db_connections_when_finished
+from utils.functions import canonical_json_digest
 from .data_pipelines import SwaggerFileDiffsPipeline
-from apps.swagger_projects.models import SwaggerFileChange, RemoteVCSAccount
-from .helpers import (
-    create_endpoints_contract_mapping,
-    create_nested_contracts_mapping
+from .fetchers import (
+    fetch_swagger_file,
+    SwaggerFileResponse,
+    SwaggerFileFetchError
+)
+from .processing import (
+    process_swagger_file_diffs,
+    parse_swagger_file,
+    SwaggerFileDiffsResult
+)
+from .instrumentation import (
+    PipelineStats,
+    SweepStatsCollector,
+    INDEXING,
+    SWAGGER_FILES
+)
+from apps.swagger_projects.metrics import (
+    metrics,
+    SWAGGER_PROJECTS_PROCESSED,
+    SWAGGER_FILE_DIFF_DURATION,
+    SWAGGER_FILE_RESULTS_FLUSH_DURATION,
+    ACCESS_TOKEN_REFRESHES,
+    CHANGED,
+    UNCHANGED,
+    SKIPPED,
+    FAILED,
+    COMMITTED,
+    REFRESHED
+)
+from apps.swagger_projects.models import (
+    SwaggerFile,
+    SwaggerProject,
+    SwaggerFileChange,
+    RemoteVCSAccount
+)
+from apps.swagger_projects.vcs_utility import AccessTokenRefreshError
+from .helpers import index_swagger_file
+from .concurrency import AdaptiveConcurrencyController
+from .circuit_breaker import HostCircuitBreaker
+from .exceptions import HostCircuitOpenError, SwaggerFileProcessingError
+from .shared import (
+    SharedSwaggerFiles,
+    SWAGGER_FILE_RESPONSE,
+    SWAGGER_FILE_DIGEST,
+    SWAGGER_FILE_INDEX,
+    SWAGGER_FILE,
+    SWAGGER_FILE_DIFFS
 )
 
 SWAGGER_FILE_CHANGES_TO_CREATE = 'swagger_file_changes_to_create'
 SWAGGER_FILE_CHANGES_TO_UPDATE = 'swagger_file_changes_to_update'
 SWAGGER_FILE_CHANGES_TO_DELETE = 'swagger_file_changes_to_delete'
 SWAGGER_FILES_TO_UPDATE = 'swagger_files_to_update'
+SWAGGER_FILES_SHORT_CIRCUITED = 'swagger_files_short_circuited'
+SWAGGER_FILE_VALIDATORS_TO_UPDATE = 'swagger_file_validators_to_update'
+SWAGGER_PROJECTS_TO_RESCHEDULE = 'swagger_projects_to_reschedule'
+RESULT_TYPES = (
+    SWAGGER_FILE_CHANGES_TO_CREATE,
+    SWAGGER_FILE_CHANGES_TO_UPDATE,
+    SWAGGER_FILE_CHANGES_TO_DELETE,
+    SWAGGER_FILES_TO_UPDATE,
+    SWAGGER_FILES_SHORT_CIRCUITED,
+    SWAGGER_FILE_VALIDATORS_TO_UPDATE,
+    SWAGGER_PROJECTS_TO_RESCHEDULE,
+)
+
+# swagger file response and fetch error are set
+# if the swagger file was downloaded by FetchSwaggerFilesWorker
+Task = namedtuple(
+    'Task',
+    ['swagger_file_instance',
+     'swagger_project_instance',
+     'swagger_file_change_instance',
+     'swagger_file_response',
+     'fetch_error'],
+    defaults=(None, None)
+)
+
+# tasks pulled by FetchSwaggerFilesWorker ahead of free download slots
+# (per download slot), so that tasks of busy hosts don't block the others
+FETCH_BACKLOG_PER_DOWNLOAD_SLOT = 4
+
+# consumers wait for a task at most this long (in seconds)
+# before checking again whether more tasks will be produced
+# (the last task may have been taken by another consumer)
+TASK_QUEUE_POLL_TIMEOUT = 0.5
 
-APP = apps.get_app_config('swagger_projects')
-http = APP.http
 logger = logging.getLogger(__name__)
 
 
+def download_swagger_file(task: Task,
+                          shared_swagger_files: Optional[SharedSwaggerFiles] = None,
+                          parse: bool = True,
+                          circuit_breaker: Optional[HostCircuitBreaker] = None) -> SwaggerFileResponse:
+    """
+    Download swagger file of the task's swagger project.
+    
+    Swagger files shared by several swagger projects are downloaded once,
+    unconditionally - response validators stored by the swagger projects
+    sharing a swagger file may differ (a single download replaces
+    a conditional request per swagger project, unchanged swagger files
+    are still short-circuited by their digest).
+    
+    If a HostCircuitBreaker is provided, downloads from hosts
+    that keep failing are skipped (HostCircuitOpenError is raised).
+    """
+    swagger_file_url = task.swagger_project_instance.swagger_file_url
+    if shared_swagger_files is not None and \
+            shared_swagger_files.is_shared(swagger_file_url):
+        fetch = partial(fetch_swagger_file, swagger_file_url, parse=parse)
+        if circuit_breaker is not None:
+            fetch = partial(circuit_breaker.call,
+                            urlsplit(swagger_file_url).netloc, fetch)
+        return shared_swagger_files.get(
+            swagger_file_url,
+            SWAGGER_FILE_RESPONSE,
+            fetch
+        )
+    
+    swagger_file_instance = task.swagger_file_instance
+    fetch = partial(
+        fetch_swagger_file,
+        swagger_file_url,
+        etag=swagger_file_instance.swagger_file_etag,
+        last_modified=swagger_file_instance.swagger_file_last_modified,
+        parse=parse
+    )
+    if circuit_breaker is not None:
+        return circuit_breaker.call(urlsplit(swagger_file_url).netloc, fetch)
+    return fetch()
+
+
 class ProcessSwaggerFileDiffsWorker(threading.Thread):
     """
     Worker that processes swagger file changes
@@ -35,16 +159,30 @@ class ProcessSwaggerFileDiffsWorker(threading.Thread):
     partialy initialized swagger file change
     if swagger project is integrated with a remote VCS account).
     
-    2) Download current swagger file version for swagger project.
+    2) Download current swagger file version for swagger project
+       (conditionally, if response validators of the stored swagger file
+       are known - ETag, Last-Modified).
+       (unless it was already downloaded by FetchSwaggerFilesWorker).
+       If the server responds with "304 Not Modified"
+       or the canonical digest of the downloaded swagger file
+       matches the digest of the stored swagger file,
+       skip steps 3 and 4 - there are no swagger file changes.
+       Otherwise load the stored swagger file and its fingerprints
+       (deferred by the producer).
     
-    3) Generate 2 mappings (required for swagger file changes processing):
+    3) Generate 3 mappings (required for swagger file changes processing):
         1.  Mapping that associates endpoints with their corresponding contracts.
         2.  Mapping that provides information
             about contracts nested in other contracts.
+        3.  Inverted mapping 2 - contracts
+            and the contracts in which they are nested.
+       Fingerprint endpoints and contracts of the downloaded swagger file.
+       All of this is done in a single walk over the swagger file.
             
     4) Calculate swagger file differences by comparing 2 swagger files -
        swagger file stored in "our" system
        and downloaded swagger file (current version).
+       Only endpoints and contracts with differing fingerprints are compared.
        
        Interprate these changes (additions or removals in endpoints, methods,
        contracts, contract properties).
@@ -56,72 +194,336 @@ class ProcessSwaggerFileDiffsWorker(threading.Thread):
     (update or create new swagger file change entity,
     delete swagger file change entity if no changes were registered,
     replace swagger file stored in the database with its new version
-    if swagger file changes were registered).
-    """
+    if its digest has changed).
+    
+    6) Schedule the next check of the swagger project
+       (see SwaggerProject.schedule_next_check).
+    
+    7) Pass all the entities prepared for the swagger file
+       on to PersistSwaggerFileResultsWorker via the results queue,
+       so that they are persisted together in the same transaction.
+    
+    If an executor (process pool) is provided, the worker only downloads
+    swagger files, steps 3 and 4 (together with parsing and digesting
+    the downloaded swagger file) are run by the executor
+    (see process_swagger_file_diffs), only compact results are sent back.
+    The stored swagger file is sent to the executor only if its digest
+    differs, failures of the executor fail only the current task.
+    
+    If a SweepStatsCollector is provided, per-stage timings and counters
+    are recorded for each processed swagger file (see PipelineStats)
+    and aggregated by the collector across the whole sweep.
+    
+    If SharedSwaggerFiles are provided, swagger files shared
+    by several swagger projects are downloaded, digested and indexed
+    only once for all of them. With an executor, swagger file differences
+    are calculated only once for all the swagger projects
+    that store the same version of the shared swagger file.
+    
+    If an AdaptiveConcurrencyController is provided, the latency
+    and outcome of each task are reported to it, the worker exits
+    when the controller shrinks the pool (and is replaced if it crashes).
     
-    _SWAGGER_FILE_CHANGES_TO_CREATE_LOCK = 'swagger_file_changes_to_create_lock'
-    _SWAGGER_FILE_CHANGES_TO_UPDATE_LOCK = 'swagger_file_changes_to_update_lock'
-    _SWAGGER_FILE_CHANGES_TO_DELETE_LOCK = 'swagger_file_changes_to_delete_lock'
-    _SWAGGER_FILES_TO_UPDATE_LOCK = 'swagger_files_to_update_lock'
+    If a HostCircuitBreaker is provided, swagger files of hosts
+    that keep failing are skipped (and not reported
+    to the concurrency controller) until their cool-down ends.
+    
+    The outcome of each task (changed, unchanged, skipped or failed)
+    and the time spent calculating swagger file differences
+    are recorded in metrics.
+    """
     
     def __init__(self, task_queue: Queue,
                  event: Event,
-                 locks: DefaultDict[str, Lock],
-                 results_mapping: DefaultDict[str, list]):
+                 results_queue: Queue,
+                 stats_collector: Optional[SweepStatsCollector] = None,
+                 executor: Optional[Executor] = None,
+                 shared_swagger_files: Optional[SharedSwaggerFiles] = None,
+                 concurrency_controller: Optional[AdaptiveConcurrencyController] = None,
+                 circuit_breaker: Optional[HostCircuitBreaker] = None):
         threading.Thread.__init__(self)
         self.task_queue = task_queue
         self.event = event
-        self.locks = locks
-        self.results_mapping = results_mapping
+        self.results_queue = results_queue
+        self.stats_collector = stats_collector
+        self.executor = executor
+        self.shared_swagger_files = shared_swagger_files
+        self.concurrency_controller = concurrency_controller
+        self.circuit_breaker = circuit_breaker
         
+        self.task = None
+        self.stats = None
+        self.task_results = None
         self.swagger_file_changes = None
         self.swagger_file_instance = None
         self.swagger_project_instance = None
         self.swagger_file_change_instance = None
         self.current_swagger_file_version = None
         self.new_swagger_file_version = None
+        self.raw_new_swagger_file = None
+        self.swagger_file_response = None
+        self.fetch_error = None
+        self.new_swagger_file_not_modified = None
+        self.new_swagger_file_etag = None
+        self.new_swagger_file_last_modified = None
+        self.new_swagger_file_digest = None
+        self.new_swagger_file_fingerprints = None
         self.endpoint_contract_mapping = None
         self.nested_contracts_mapping = None
+        self.contract_containers_mapping = None
     
+    @close_db_connections_when_finished
     def run(self) -> None:
-        while not self.event.is_set() or not self.task_queue.empty():
-            self.get_store_task_from_queue()
-            
-            try:
-                self.load_store_swagger_files()
-            except ConnectionError as e:
-                logging.exception(e)
-            else:
-                self.generate_set_mandatory_mappings()
-                self.run_swagger_file_diffs_pipeline()
-                self.prepare_swagger_file_changes_to_be_saved_to_db()
-            finally:
-                self.task_queue.task_done()
+        self.process_tasks()
+    
+    def process_tasks(self) -> None:
+        """
+        Process tasks till the event is set and the task queue is empty.
+        Does not close DB connections when finished (unlike "run"),
+        so it can be called from a thread that keeps using them.
+        """
+        retired = False
+        crashed = True
+        try:
+            while not self.event.is_set() or not self.task_queue.empty():
+                if self.concurrency_controller and \
+                        self.concurrency_controller.retire():
+                    retired = True
+                    break
+                
+                try:
+                    self.get_store_task_from_queue()
+                except Empty:
+                    continue
+                started_at = perf_counter()
+                error = False
+                skipped = False
+                outcome = FAILED
+                
+                try:
+                    self.load_store_swagger_files()
+                    if self.executor is None:
+                        self.process_swagger_file()
+                    else:
+                        self.process_swagger_file_in_executor()
+                    outcome = (UNCHANGED
+                               if self.task_results.get(SWAGGER_FILES_SHORT_CIRCUITED)
+                               else CHANGED)
+                except HostCircuitOpenError as e:
+                    skipped = True
+                    outcome = SKIPPED
+                    logger.warning(e)
+                except (RequestException,
+                        SwaggerFileFetchError,
+                        SwaggerFileProcessingError) as e:
+                    error = True
+                    logging.exception(e)
+                finally:
+                    metrics.inc(SWAGGER_PROJECTS_PROCESSED, outcome=outcome)
+                    if self.concurrency_controller and not skipped:
+                        self.concurrency_controller.record(
+                            perf_counter() - started_at, error)
+                    self.pass_on_task_results()
+                    self.release_shared_swagger_file()
+                    self.release_task_data()
+                    self.task_queue.task_done()
+            crashed = False
+        finally:
+            # a crashed worker is replaced, so that remaining tasks
+            # are still consumed
+            if self.concurrency_controller and not retired:
+                self.concurrency_controller.exit_worker(crashed)
+    
+    def process_swagger_file(self) -> None:
+        if self.swagger_file_unchanged():
+            self.short_circuit_unchanged_swagger_file()
+            return
+        
+        self.load_current_swagger_file_version()
+        with metrics.timer(SWAGGER_FILE_DIFF_DURATION):
+            self.generate_set_mandatory_mappings()
+            self.run_swagger_file_diffs_pipeline()
+        self.prepare_swagger_file_changes_to_be_saved_to_db()
+        self.collect_stats()
+    
+    def process_swagger_file_in_executor(self) -> None:
+        if self.new_swagger_file_not_modified:
+            self.short_circuit_unchanged_swagger_file()
+            return
+        
+        # the digest is calculated by the executor as well,
+        # the stored swagger file is loaded and sent to the executor
+        # only if the digests differ
+        self.new_swagger_file_digest = self.share(
+            SWAGGER_FILE_DIGEST,
+            lambda: self.submit_to_executor(None).digest
+        )
+        if self.swagger_file_unchanged():
+            self.short_circuit_unchanged_swagger_file()
+            return
+        
+        self.load_current_swagger_file_version()
+        started_at = perf_counter()
+        result = self.share_swagger_file_diffs(
+            partial(self.submit_to_executor, self.current_swagger_file_version))
+        # includes sending the swagger files to the executor and back
+        metrics.observe(SWAGGER_FILE_DIFF_DURATION, perf_counter() - started_at)
+        
+        # the parsed swagger file is only needed to be persisted,
+        # parsing with orjson is cheap compared to processing
+        self.new_swagger_file_version = self.share(
+            SWAGGER_FILE,
+            partial(parse_swagger_file, self.raw_new_swagger_file)
+        )
+        self.new_swagger_file_fingerprints = result.fingerprints
+        self.swagger_file_changes = result.swagger_file_changes
+        
+        self.prepare_swagger_file_changes_to_be_saved_to_db()
+        self.collect_stats()
+    
+    def submit_to_executor(
+        self, current_swagger_file_version: Optional[dict]
+    ) -> SwaggerFileDiffsResult:
+        """
+        Run process_swagger_file_diffs in the executor
+        (without the stored swagger file only digests are compared).
+        
+        Failures of the executor (e.g. the pool is broken
+        after one of its processes was killed) fail only the current task
+        (SwaggerFileProcessingError is raised).
+        """
+        current_swagger_file_fingerprints = (
+            self.swagger_file_instance.swagger_file_fingerprints
+            if current_swagger_file_version is not None
+            else None
+        )
+        try:
+            result = self.executor.submit(
+                process_swagger_file_diffs,
+                current_swagger_file_version,
+                self.raw_new_swagger_file,
+                self.swagger_file_instance.swagger_file_digest,
+                current_swagger_file_fingerprints,
+                self.stats is not None
+            ).result()
+        except SwaggerFileFetchError:
+            # the downloaded swagger file is not valid
+            raise
+        except Exception as e:
+            raise SwaggerFileProcessingError() from e
+        
+        if result.stats is not None:
+            self.stats.merge(result.stats)
+        return result
     
     def get_store_task_from_queue(self) -> None:
-        task = self.task_queue.get()
+        task = self.task_queue.get(timeout=TASK_QUEUE_POLL_TIMEOUT)
+        self.task = task
         self.swagger_file_instance = task.swagger_file_instance
         self.swagger_project_instance = task.swagger_project_instance
         self.swagger_file_change_instance = task.swagger_file_change_instance
+        self.swagger_file_response = task.swagger_file_response
+        self.fetch_error = task.fetch_error
+        self.stats = PipelineStats() if self.stats_collector else None
+        self.task_results = defaultdict(list)
     
     def load_store_swagger_files(self) -> None:
+        # swagger file could have been already downloaded
+        # by FetchSwaggerFilesWorker
+        if self.fetch_error is not None:
+            raise self.fetch_error
+        
+        # when processing is delegated to an executor,
+        # parsing is delegated as well
+        swagger_file_response = self.swagger_file_response or download_swagger_file(
+            self.task,
+            self.shared_swagger_files,
+            parse=self.executor is None,
+            circuit_breaker=self.circuit_breaker
+        )
+        self.new_swagger_file_not_modified = swagger_file_response.not_modified
+        self.new_swagger_file_etag = swagger_file_response.etag
+        self.new_swagger_file_last_modified = swagger_file_response.last_modified
+        
+        if self.executor is not None:
+            self.raw_new_swagger_file = swagger_file_response.swagger_file
+            return
+        
+        self.new_swagger_file_version = swagger_file_response.swagger_file
+        if not self.new_swagger_file_not_modified:
+            self.new_swagger_file_digest = self.share(
+                SWAGGER_FILE_DIGEST,
+                partial(canonical_json_digest, self.new_swagger_file_version)
+            )
+    
+    def load_current_swagger_file_version(self) -> None:
+        # the stored swagger file and its fingerprints are deferred
+        # by the producer, load them in a single query
+        deferred_fields = self.swagger_file_instance.get_deferred_fields()
+        if deferred_fields:
+            self.swagger_file_instance.refresh_from_db(
+                fields=list(deferred_fields))
+        
         self.current_swagger_file_version = \
             self.swagger_file_instance.swagger_file
-        self.new_swagger_file_version = http.get(
-            self.swagger_project_instance.swagger_file_url).json()
+    
+    def swagger_file_unchanged(self) -> bool:
+        """
+        The swagger file is unchanged if the server responded
+        with "304 Not Modified" or the canonical digests
+        of the parsed swagger files (not of raw bytes) are equal
+        (see SwaggerFile)
+        """
+        return (self.new_swagger_file_not_modified or
+                self.swagger_file_instance.swagger_file_digest ==
+                self.new_swagger_file_digest)
+    
+    def short_circuit_unchanged_swagger_file(self) -> None:
+        # if swagger project is integrated with a remote VCS account,
+        # registered commits didn't trigger any swagger file changes,
+        # prepare partialy initialized swagger file change to be deleted
+        if self.swagger_file_change_instance:
+            self._prepare_changes_for_deletion()
+        
+        # swagger file content is the same,
+        # but its response validators may have changed
+        if self._swagger_file_validators_changed():
+            self._prepare_validators_for_update()
+        
+        self.task_results[SWAGGER_FILES_SHORT_CIRCUITED].append(
+            self.swagger_file_instance.id)
+        
+        self._prepare_project_for_rescheduling(changed=False)
     
     def generate_set_mandatory_mappings(self) -> None:
-        paths = self.new_swagger_file_version['paths']
-        contracts = self.new_swagger_file_version['definitions']
-        self.endpoint_contract_mapping = create_endpoints_contract_mapping(paths)
-        self.nested_contracts_mapping = create_nested_contracts_mapping(contracts)
+        # a single walk over the swagger file creates all the mappings
+        # and fingerprints
+        index = partial(index_swagger_file, self.new_swagger_file_version)
+        if self.stats is None:
+            swagger_file_index = self.share(SWAGGER_FILE_INDEX, index)
+        else:
+            with self.stats.timer(INDEXING):
+                swagger_file_index = self.share(SWAGGER_FILE_INDEX, index)
+        self.endpoint_contract_mapping = \
+            swagger_file_index.endpoint_contract_mapping
+        self.nested_contracts_mapping = \
+            swagger_file_index.nested_contracts_mapping
+        self.contract_containers_mapping = \
+            swagger_file_index.contract_containers_mapping
+        self.new_swagger_file_fingerprints = swagger_file_index.fingerprints
     
     def run_swagger_file_diffs_pipeline(self) -> None:
+        current_swagger_file_fingerprints = \
+            self.swagger_file_instance.swagger_file_fingerprints
         pipe = SwaggerFileDiffsPipeline(
             current_swagger_file_version=self.current_swagger_file_version,
             new_swagger_file_version=self.new_swagger_file_version,
             endpoint_contract_mapping=self.endpoint_contract_mapping,
             nested_contracts_mapping=self.nested_contracts_mapping,
+            contract_containers_mapping=self.contract_containers_mapping,
+            current_swagger_file_fingerprints=current_swagger_file_fingerprints,
+            new_swagger_file_fingerprints=self.new_swagger_file_fingerprints,
+            stats=self.stats
         )
         pipe.run()
         self.swagger_file_changes = pipe.swagger_file_changes
@@ -145,7 +547,15 @@ class ProcessSwaggerFileDiffsWorker(threading.Thread):
             
             # replace swagger file with its new version
             self._prepare_files_for_update()
+            self._prepare_project_for_rescheduling(changed=True)
         else:
+            # swagger file content has changed (its digest differs)
+            # without affecting endpoints, methods, contracts
+            # or contract properties - still replace it with its new version,
+            # so that it can be short-circuited by its digest next time
+            self._prepare_files_for_update()
+            self._prepare_project_for_rescheduling(changed=False)
+            
             if not self.swagger_file_change_instance:
                 return
             
@@ -154,65 +564,453 @@ class ProcessSwaggerFileDiffsWorker(threading.Thread):
             # prepare partialy initialized swagger file change to be deleted
             self._prepare_changes_for_deletion()
     
+    def share(self, name: str, fn: Callable) -> Any:
+        # values derived from a swagger file shared by several
+        # swagger projects are calculated only once
+        swagger_file_url = self.swagger_project_instance.swagger_file_url
+        if self.shared_swagger_files is None or \
+                not self.shared_swagger_files.is_shared(swagger_file_url):
+            return fn()
+        
+        return self.shared_swagger_files.get(swagger_file_url, name, fn)
+    
+    def share_swagger_file_diffs(self, fn: Callable) -> Any:
+        # differences of a shared swagger file are the same
+        # for all the swagger projects storing the same version of it
+        # (stored swagger files without a digest are not comparable)
+        current_swagger_file_digest = \
+            self.swagger_file_instance.swagger_file_digest
+        if current_swagger_file_digest is None:
+            return fn()
+        
+        return self.share(
+            f'{SWAGGER_FILE_DIFFS}_{current_swagger_file_digest}', fn)
+    
+    def release_shared_swagger_file(self) -> None:
+        if self.shared_swagger_files is not None:
+            self.shared_swagger_files.release(
+                self.swagger_project_instance.swagger_file_url)
+    
+    def pass_on_task_results(self) -> None:
+        # blocks while the results queue is full
+        if self.task_results:
+            self.results_queue.put(self.task_results)
+    
+    def release_task_data(self) -> None:
+        """
+        Drop references to swagger file documents and derived data
+        as soon as a task is done, so that they can be garbage collected
+        while the worker waits for its next task
+        (entities prepared to be persisted
+        are passed on to PersistSwaggerFileResultsWorker)
+        """
+        self.task = None
+        self.task_results = None
+        self.swagger_file_changes = None
+        self.swagger_file_instance = None
+        self.swagger_project_instance = None
+        self.swagger_file_change_instance = None
+        self.current_swagger_file_version = None
+        self.new_swagger_file_version = None
+        self.raw_new_swagger_file = None
+        self.swagger_file_response = None
+        self.fetch_error = None
+        self.new_swagger_file_not_modified = None
+        self.new_swagger_file_etag = None
+        self.new_swagger_file_last_modified = None
+        self.new_swagger_file_digest = None
+        self.new_swagger_file_fingerprints = None
+        self.endpoint_contract_mapping = None
+        self.nested_contracts_mapping = None
+        self.contract_containers_mapping = None
+        self.stats = None
+    
+    def collect_stats(self) -> None:
+        if self.stats is None:
+            return
+        
+        self.stats.count(SWAGGER_FILES)
+        self.stats_collector.collect(self.stats)
+    
     def _prepare_changes_for_creation(self) -> None:
         swagger_file_change = SwaggerFileChange(
             swagger_project=self.swagger_project_instance,
             swagger_file_changes=self.swagger_file_changes,
-            changes_added_at=timezone.now()
+            changes_added_at=timezone.now(),
+            status=SwaggerFileChange.PROCESSED
         )
         
-        with self.locks[self._SWAGGER_FILE_CHANGES_TO_CREATE_LOCK]:
-            self.results_mapping[SWAGGER_FILE_CHANGES_TO_CREATE].append(
-                swagger_file_change)
+        self.task_results[SWAGGER_FILE_CHANGES_TO_CREATE].append(
+            swagger_file_change)
     
     def _prepare_changes_for_update(self) -> None:
         self.swagger_file_change_instance.changes_added_at = timezone.now()
         self.swagger_file_change_instance.swagger_file_changes = \
             self.swagger_file_changes
+        self.swagger_file_change_instance.status = SwaggerFileChange.PROCESSED
         
-        with self.locks[self._SWAGGER_FILE_CHANGES_TO_UPDATE_LOCK]:
-            self.results_mapping[SWAGGER_FILE_CHANGES_TO_UPDATE].append(
-                self.swagger_file_change_instance)
+        self.task_results[SWAGGER_FILE_CHANGES_TO_UPDATE].append(
+            self.swagger_file_change_instance)
     
     def _prepare_changes_for_deletion(self) -> None:
-        with self.locks[self._SWAGGER_FILE_CHANGES_TO_DELETE_LOCK]:
-            self.results_mapping[SWAGGER_FILE_CHANGES_TO_DELETE].append(
-                self.swagger_file_change_instance.id)
+        self.task_results[SWAGGER_FILE_CHANGES_TO_DELETE].append(
+            self.swagger_file_change_instance.id)
     
     def _prepare_files_for_update(self) -> None:
         self.swagger_file_instance.swagger_file = self.new_swagger_file_version
+        self.swagger_file_instance.swagger_file_digest = \
+            self.new_swagger_file_digest
+        self._set_swagger_file_validators()
+        self.swagger_file_instance.swagger_file_fingerprints = \
+            self.new_swagger_file_fingerprints
+        
+        self.task_results[SWAGGER_FILES_TO_UPDATE].append(
+            self.swagger_file_instance)
+    
+    def _prepare_validators_for_update(self) -> None:
+        self._set_swagger_file_validators()
+        
+        self.task_results[SWAGGER_FILE_VALIDATORS_TO_UPDATE].append(
+            self.swagger_file_instance)
+    
+    def _prepare_project_for_rescheduling(self, changed: bool) -> None:
+        self.swagger_project_instance.schedule_next_check(changed)
         
-        with self.locks[self._SWAGGER_FILES_TO_UPDATE_LOCK]:
-            self.results_mapping[SWAGGER_FILES_TO_UPDATE].append(
-                self.swagger_file_instance)
+        self.task_results[SWAGGER_PROJECTS_TO_RESCHEDULE].append(
+            self.swagger_project_instance)
+    
+    def _swagger_file_validators_changed(self) -> bool:
+        return (
+            self.swagger_file_instance.swagger_file_etag !=
+            self.new_swagger_file_etag or
+            self.swagger_file_instance.swagger_file_last_modified !=
+            self.new_swagger_file_last_modified
+        )
+    
+    def _set_swagger_file_validators(self) -> None:
+        self.swagger_file_instance.swagger_file_etag = \
+            self.new_swagger_file_etag
+        self.swagger_file_instance.swagger_file_last_modified = \
+            self.new_swagger_file_last_modified
+
+
+class PersistSwaggerFileResultsWorker(threading.Thread):
+    """
+    Worker that persists results of ProcessSwaggerFileDiffsWorker to DB
+    while swagger files are still being processed.
+    
+    Results of each processed swagger file (mappings of result types
+    to prepared entities) are pulled from the results queue
+    until None is received and persisted in batches of "batch_size"
+    swagger files, each batch within its own short transaction.
+    Results of a single swagger file are never split across batches,
+    so a swagger file change and its swagger file update
+    are persisted atomically.
+    
+    If a batch fails to be persisted, batches persisted earlier are kept
+    and results of the batch's swagger files are persisted one by one,
+    each within its own transaction - only results of the swagger files
+    that fail again (e.g. due to a too long ETag) are lost.
+    Errors of any kind fail only the batch, the writer keeps
+    draining the results queue (consumer workers would block otherwise).
+    
+    Counts persisted entities per result type in "summary".
+    """
+    
+    def __init__(self, results_queue: Queue, batch_size: int):
+        threading.Thread.__init__(self)
+        self.results_queue = results_queue
+        self.batch_size = batch_size
+        self.summary = dict.fromkeys(RESULT_TYPES, 0)
+    
+    @close_db_connections_when_finished
+    def run(self) -> None:
+        self.persist_results()
+    
+    def persist_results(self) -> None:
+        """
+        Persist results till None is received.
+        Does not close DB connections when finished (unlike "run"),
+        so it can be called from a thread that keeps using them.
+        """
+        batch = []
+        
+        while True:
+            task_results = self.results_queue.get()
+            if task_results is None:
+                break
+            
+            batch.append(task_results)
+            if len(batch) >= self.batch_size:
+                self.persist_batch(batch)
+                batch = []
+        
+        if batch:
+            self.persist_batch(batch)
+    
+    def persist_batch(self, batch: List[DefaultDict[str, list]]) -> None:
+        if self.try_persist_batch(batch) or len(batch) == 1:
+            return
+        
+        # do not let a single bad swagger file drop results of the others
+        for task_results in batch:
+            self.try_persist_batch([task_results])
+    
+    def try_persist_batch(self, batch: List[DefaultDict[str, list]]) -> bool:
+        started_at = perf_counter()
+        # any error is only logged - if the writer died,
+        # consumer workers would block on the full results queue forever
+        try:
+            results_mapping = defaultdict(list)
+            for task_results in batch:
+                for result_type, results in task_results.items():
+                    results_mapping[result_type].extend(results)
+            
+            self.save_results_to_db(results_mapping)
+        except Exception as e:
+            metrics.observe(SWAGGER_FILE_RESULTS_FLUSH_DURATION,
+                            perf_counter() - started_at, outcome=FAILED)
+            logger.exception(e)
+            return False
+        metrics.observe(SWAGGER_FILE_RESULTS_FLUSH_DURATION,
+                        perf_counter() - started_at, outcome=COMMITTED)
+        
+        for result_type in RESULT_TYPES:
+            self.summary[result_type] += len(results_mapping[result_type])
+        return True
+    
+    @staticmethod
+    def save_results_to_db(results_mapping: DefaultDict[str, list]) -> None:
+        # do it within a transaction to avoid data inconsistency -
+        # updated swagger files without registered swagger file changes
+        with transaction.atomic():
+            SwaggerFileChange.objects.bulk_update(
+                results_mapping[SWAGGER_FILE_CHANGES_TO_UPDATE],
+                ['changes_added_at', 'swagger_file_changes', 'status'],
+                batch_size=100
+            )
+            
+            SwaggerFileChange.objects.bulk_create(
+                results_mapping[SWAGGER_FILE_CHANGES_TO_CREATE],
+                batch_size=100
+            )
+            
+            SwaggerFileChange.objects.filter(
+                id__in=results_mapping[SWAGGER_FILE_CHANGES_TO_DELETE]
+            ).delete()
+            
+            SwaggerFile.objects.bulk_update(
+                results_mapping[SWAGGER_FILES_TO_UPDATE],
+                ['swagger_file', 'swagger_file_digest',
+                 'swagger_file_fingerprints', 'swagger_file_etag',
+                 'swagger_file_last_modified'],
+                batch_size=100
+            )
+            
+            SwaggerFile.objects.bulk_update(
+                results_mapping[SWAGGER_FILE_VALIDATORS_TO_UPDATE],
+                ['swagger_file_etag', 'swagger_file_last_modified'],
+                batch_size=100
+            )
+            
+            SwaggerProject.objects.bulk_update(
+                results_mapping[SWAGGER_PROJECTS_TO_RESCHEDULE],
+                ['next_check_at', 'check_interval'],
+                batch_size=100
+            )
+
+
+class FetchSwaggerFilesWorker(threading.Thread):
+    """
+    Worker that concurrently downloads swagger files
+    and passes tasks with downloaded swagger files (or fetch errors)
+    on to ProcessSwaggerFileDiffsWorker.
+    
+    Tasks are pulled from the input queue until None is received.
+    
+    Downloads are scheduled on an asyncio event loop,
+    each download (download_swagger_file) runs in a thread pool,
+    so the shared "requests" session with its timeout and retry policy
+    is reused.
+    At most "concurrency" downloads are in flight,
+    at most "per_host_concurrency" of them to the same host.
+    A download slot of the host is acquired before a global one,
+    so tasks waiting for a busy host don't hold global download slots
+    (tasks of other hosts are not blocked behind them).
+    At most FETCH_BACKLOG_PER_DOWNLOAD_SLOT * "concurrency" tasks
+    are pulled ahead of free download slots.
+    Swagger files shared by several swagger projects
+    are downloaded only once (if SharedSwaggerFiles are provided).
+    Downloads from hosts that keep failing are skipped
+    (if a HostCircuitBreaker is provided).
+    
+    Sets the output event when all the tasks have been passed on.
+    """
+    
+    def __init__(self, input_queue: Queue,
+                 output_queue: Queue,
+                 output_event: Event,
+                 concurrency: int,
+                 per_host_concurrency: int,
+                 parse: bool = True,
+                 shared_swagger_files: Optional[SharedSwaggerFiles] = None,
+                 circuit_breaker: Optional[HostCircuitBreaker] = None):
+        threading.Thread.__init__(self)
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.output_event = output_event
+        self.concurrency = concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.parse = parse
+        self.shared_swagger_files = shared_swagger_files
+        self.circuit_breaker = circuit_breaker
+    
+    def run(self) -> None:
+        try:
+            asyncio.run(self.fetch_swagger_files())
+        finally:
+            self.output_event.set()
+    
+    async def fetch_swagger_files(self) -> None:
+        loop = asyncio.get_running_loop()
+        max_pending = FETCH_BACKLOG_PER_DOWNLOAD_SLOT * self.concurrency
+        pending_limit = asyncio.Semaphore(max_pending)
+        concurrency_limit = asyncio.Semaphore(self.concurrency)
+        host_concurrency_limits = defaultdict(
+            partial(asyncio.Semaphore, self.per_host_concurrency))
+        in_flight = set()
+        
+        # pending tasks may block on the output queue,
+        # an additional thread waits for tasks on the input queue
+        with ThreadPoolExecutor(max_workers=max_pending + 1) as executor:
+            while True:
+                # do not pull the next task until the backlog has room for it
+                await pending_limit.acquire()
+                task = await loop.run_in_executor(executor, self.input_queue.get)
+                if task is None:
+                    pending_limit.release()
+                    break
+                
+                host = urlsplit(
+                    task.swagger_project_instance.swagger_file_url).netloc
+                download = asyncio.ensure_future(self.fetch_swagger_file(
+                    task,
+                    executor,
+                    pending_limit,
+                    concurrency_limit,
+                    host_concurrency_limits[host]
+                ))
+                in_flight.add(download)
+                download.add_done_callback(in_flight.discard)
+            
+            if in_flight:
+                await asyncio.gather(*in_flight)
+    
+    async def fetch_swagger_file(self, task: Task,
+                                 executor: Executor,
+                                 pending_limit: asyncio.Semaphore,
+                                 concurrency_limit: asyncio.Semaphore,
+                                 host_concurrency_limit: asyncio.Semaphore) -> None:
+        loop = asyncio.get_running_loop()
+        
+        try:
+            # host slot first, a global slot is held only while downloading
+            async with host_concurrency_limit, concurrency_limit:
+                try:
+                    swagger_file_response = await loop.run_in_executor(
+                        executor,
+                        partial(
+                            download_swagger_file,
+                            task,
+                            self.shared_swagger_files,
+                            parse=self.parse,
+                            circuit_breaker=self.circuit_breaker
+                        )
+                    )
+                except Exception as e:
+                    # handled by ProcessSwaggerFileDiffsWorker
+                    task = task._replace(fetch_error=e)
+                else:
+                    task = task._replace(
+                        swagger_file_response=swagger_file_response)
+            
+            # blocks while the output queue is full
+            await loop.run_in_executor(executor, self.output_queue.put, task)
+        finally:
+            pending_limit.release()
 
 
 class RefreshRemoteVCSAccountAccessTokenWorker(threading.Thread):
     """
     Worker that refreshes OAuth access tokens
     and prepares new access tokens to be saved to DB.
+    
+    Refreshes that fail (the VCS provider is unavailable or rejects
+    the refresh token) are postponed with a backoff
+    (see RemoteVCSAccount.postpone_access_token_refresh)
+    and the postponed refreshes are saved to DB as well.
+    
+    If an AdaptiveConcurrencyController is provided, the latency
+    and outcome of each refresh are reported to it, the worker exits
+    when the controller shrinks the pool (and is replaced if it crashes).
+    
+    The outcome of each refresh is recorded in metrics.
     """
     
     def __init__(self, task_queue: Queue,
                  event: Event,
                  vcs_accounts_to_update_lock: Lock,
-                 vcs_accounts_to_update: List[RemoteVCSAccount]):
+                 vcs_accounts_to_update: List[RemoteVCSAccount],
+                 concurrency_controller: Optional[AdaptiveConcurrencyController] = None):
         threading.Thread.__init__(self)
         self.task_queue = task_queue
         self.event = event
         self.vcs_accounts_to_update_lock = vcs_accounts_to_update_lock
         self.vcs_accounts_to_update = vcs_accounts_to_update
+        self.concurrency_controller = concurrency_controller
     
     def run(self) -> None:
-        while not self.event.is_set() or not self.task_queue.empty():
-            remote_vcs_account = self.task_queue.get()
-            
-            try:
-                remote_vcs_account.refresh_access_token()
-            except ConnectionError as e:
-                logging.exception(e)
-            else:
-                with self.vcs_accounts_to_update_lock:
-                    self.vcs_accounts_to_update.append(remote_vcs_account)
-            finally:
-                self.task_queue.task_done()
+        retired = False
+        crashed = True
+        try:
+            while not self.event.is_set() or not self.task_queue.empty():
+                if self.concurrency_controller and \
+                        self.concurrency_controller.retire():
+                    retired = True
+                    break
+                
+                try:
+                    remote_vcs_account = self.task_queue.get(
+                        timeout=TASK_QUEUE_POLL_TIMEOUT)
+                except Empty:
+                    continue
+                started_at = perf_counter()
+                error = False
+                outcome = FAILED
+                
+                try:
+                    try:
+                        remote_vcs_account.refresh_access_token()
+                    except (RequestException, AccessTokenRefreshError) as e:
+                        error = True
+                        logging.exception(e)
+                        # retried by one of the next runs (with a backoff),
+                        # not by the next batch of this run
+                        remote_vcs_account.postpone_access_token_refresh()
+                    else:
+                        outcome = REFRESHED
+                    
+                    with self.vcs_accounts_to_update_lock:
+                        self.vcs_accounts_to_update.append(remote_vcs_account)
+                finally:
+                    metrics.inc(ACCESS_TOKEN_REFRESHES, outcome=outcome)
+                    if self.concurrency_controller:
+                        self.concurrency_controller.record(
+                            perf_counter() - started_at, error)
+                    self.task_queue.task_done()
+            crashed = False
+        finally:
+            # a crashed worker is replaced, so that remaining tasks
+            # are still consumed
+            if self.concurrency_controller and not retired:
+                self.concurrency_controller.exit_worker(crashed)
@@ -0,0 +1,249 @@
+"""
+Benchmark swagger file changes processing on synthetic swagger files.
+
+Measures helper mappings creation, swagger file indexing
+and SwaggerFileDiffsPipeline (both modes) for each requested size,
+reports per-stage time, throughput and peak memory as JSON.
+
+Usage (from the "app" directory):
+    
+    python -m benchmarks.bench_swagger_file_diffs \
+        --sizes 1000 10000 50000 --output bench.json
+    
+    # compare with results of a previous commit,
+    # exits with status 1 if any stage got slower than allowed
+    python -m benchmarks.bench_swagger_file_diffs \
+        --sizes 1000 10000 --compare bench.json
+"""
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from time import perf_counter
+from typing import Callable, List, Optional
+
+from apps.swagger_projects.workers.data_pipelines import SwaggerFileDiffsPipeline
+from apps.swagger_projects.workers.helpers import (
+    create_endpoints_contract_mapping,
+    create_nested_contracts_mapping,
+    create_swagger_file_fingerprints,
+    index_swagger_file
+)
+from apps.swagger_projects.workers.instrumentation import (
+    PipelineStats,
+    RAW_DIFFS,
+    KEPT_CHANGES
+)
+from .swagger_file_generator import generate_swagger_file_pair
+
+DEFAULT_SIZES = (1000, 10000, 50000)
+
+ENDPOINTS_CONTRACT_MAPPING = 'endpoints_contract_mapping'
+NESTED_CONTRACTS_MAPPING = 'nested_contracts_mapping'
+INDEX_SWAGGER_FILE = 'index_swagger_file'
+DISPATCH_TABLE_PIPELINE = 'dispatch_table_pipeline'
+COROUTINE_PIPELINE = 'coroutine_pipeline'
+
+
+def run_benchmark(paths: int, args: argparse.Namespace) -> dict:
+    definitions = max(int(paths * args.definitions_ratio), 1)
+    current_version, new_version = generate_swagger_file_pair(
+        paths=paths,
+        methods_per_path=args.methods_per_path,
+        definitions=definitions,
+        properties_per_definition=args.properties_per_definition,
+        nesting_depth=args.nesting_depth,
+        change_ratio=args.change_ratio,
+        seed=args.seed
+    )
+    current_fingerprints = create_swagger_file_fingerprints(current_version)
+    swagger_file_index = index_swagger_file(new_version)
+    
+    def run_pipeline(use_dispatch_table: bool,
+                     stats: Optional[PipelineStats] = None) -> None:
+        SwaggerFileDiffsPipeline(
+            current_swagger_file_version=current_version,
+            new_swagger_file_version=new_version,
+            endpoint_contract_mapping=swagger_file_index.endpoint_contract_mapping,
+            nested_contracts_mapping=swagger_file_index.nested_contracts_mapping,
+            contract_containers_mapping=swagger_file_index.contract_containers_mapping,
+            current_swagger_file_fingerprints=current_fingerprints,
+            new_swagger_file_fingerprints=swagger_file_index.fingerprints,
+            use_dispatch_table=use_dispatch_table,
+            stats=stats
+        ).run()
+    
+    stages = {
+        ENDPOINTS_CONTRACT_MAPPING:
+            lambda: create_endpoints_contract_mapping(new_version['paths']),
+        NESTED_CONTRACTS_MAPPING:
+            lambda: create_nested_contracts_mapping(new_version['definitions']),
+        INDEX_SWAGGER_FILE: lambda: index_swagger_file(new_version),
+        DISPATCH_TABLE_PIPELINE: lambda: run_pipeline(True),
+        COROUTINE_PIPELINE: lambda: run_pipeline(False),
+    }
+    
+    timings = {stage: _best_time(fn, args.repeat)
+               for stage, fn in stages.items()}
+    peak_memory = {stage: _peak_memory(fn) for stage, fn in stages.items()}
+    
+    # a single instrumented run for the per-stage pipeline breakdown
+    stats = PipelineStats()
+    run_pipeline(True, stats)
+    
+    raw_diffs = stats.counts[RAW_DIFFS]
+    return {
+        'size': {
+            'paths': paths,
+            'methods_per_path': args.methods_per_path,
+            'definitions': definitions,
+            'properties_per_definition': args.properties_per_definition,
+            'nesting_depth': args.nesting_depth,
+            'change_ratio': args.change_ratio,
+        },
+        'timings': timings,
+        'throughput': {
+            'index_swagger_file_paths_per_second':
+                _per_second(paths, timings[INDEX_SWAGGER_FILE]),
+            'dispatch_table_pipeline_diffs_per_second':
+                _per_second(raw_diffs, timings[DISPATCH_TABLE_PIPELINE]),
+            'coroutine_pipeline_diffs_per_second':
+                _per_second(raw_diffs, timings[COROUTINE_PIPELINE]),
+        },
+        'peak_memory_bytes': peak_memory,
+        'pipeline_stats': stats.as_dict(),
+        'counts': {
+            RAW_DIFFS: raw_diffs,
+            KEPT_CHANGES: stats.counts[KEPT_CHANGES],
+        },
+    }
+
+
+def compare_results(results: List[dict], baseline: dict,
+                    max_regression: float) -> List[str]:
+    """
+    Compare stage timings with baseline results of the same sizes,
+    return descriptions of stages that got slower than allowed
+    """
+    baseline_by_paths = {r['size']['paths']: r for r in baseline['results']}
+    regressions = []
+    
+    for result in results:
+        paths = result['size']['paths']
+        baseline_result = baseline_by_paths.get(paths)
+        if baseline_result is None:
+            continue
+        
+        for stage, seconds in result['timings'].items():
+            baseline_seconds = baseline_result['timings'].get(stage)
+            if not baseline_seconds:
+                continue
+            
+            ratio = seconds / baseline_seconds
+            print(f'{paths:>7} paths  {stage:<28} {ratio:6.2f}x', file=sys.stderr)
+            if ratio > max_regression:
+                regressions.append(f'{stage} ({paths} paths): {ratio:.2f}x')
+    
+    return regressions
+
+
+def _best_time(fn: Callable, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        started_at = perf_counter()
+        fn()
+        best = min(best, perf_counter() - started_at)
+    return best
+
+
+def _peak_memory(fn: Callable) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def _per_second(events: int, seconds: float) -> float:
+    return round(events / seconds, 1) if seconds else 0.0
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='numbers of paths to benchmark')
+    parser.add_argument('--methods-per-path', type=int, default=2)
+    parser.add_argument('--definitions-ratio', type=float, default=0.5,
+                        help='number of definitions per path')
+    parser.add_argument('--properties-per-definition', type=int, default=6)
+    parser.add_argument('--nesting-depth', type=int, default=3)
+    parser.add_argument('--change-ratio', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per stage, the best time is reported')
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--compare',
+                        help='JSON results of a previous run to compare with')
+    parser.add_argument('--max-regression', type=float, default=1.2,
+                        help='allowed slowdown vs. compared results')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    
+    results = []
+    for paths in args.sizes:
+        print(f'benchmarking {paths} paths...', file=sys.stderr)
+        results.append(run_benchmark(paths, args))
+    
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': int(time.time()),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    
+    serialized_report = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(serialized_report)
+    else:
+        print(serialized_report)
+    
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        
+        regressions = compare_results(results, baseline, args.max_regression)
+        if regressions:
+            print('regressions:', *regressions, sep='\n  ', file=sys.stderr)
+            return 1
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
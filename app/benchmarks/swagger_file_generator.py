@@ -0,0 +1,178 @@
+import random
+from typing import Tuple
+
+HTTP_METHODS = ('get', 'post', 'put', 'patch', 'delete', 'head', 'options')
+PROPERTY_TYPES = (
+    {'type': 'integer', 'format': 'int64'},
+    {'type': 'string'},
+    {'type': 'string', 'format': 'date-time'},
+    {'type': 'boolean'},
+    {'type': 'array', 'items': {'type': 'string'}},
+)
+
+
+def generate_swagger_file_pair(paths: int = 1000,
+                               methods_per_path: int = 2,
+                               definitions: int = 500,
+                               properties_per_definition: int = 6,
+                               nesting_depth: int = 3,
+                               change_ratio: float = 0.05,
+                               seed: int = 0) -> Tuple[dict, dict]:
+    """
+    Generate 2 versions of a synthetic Swagger 2.0 file.
+    
+    Definitions are chained into groups of "nesting_depth" contracts,
+    each contract of a group references the next one
+    (directly or as array items), so contracts are nested
+    up to "nesting_depth" levels deep.
+    Each method references a contract
+    through its body parameter or its "200" response schema.
+    
+    The new version is the current version
+    with roughly "change_ratio" of endpoints and contracts changed:
+    endpoints and methods are added or removed,
+    contract properties are added or removed,
+    new endpoints and contracts are appended.
+    
+    The same arguments always produce the same pair of swagger files.
+    """
+    current_version = _generate_swagger_file(
+        paths, methods_per_path, definitions, properties_per_definition,
+        nesting_depth, random.Random(seed)
+    )
+    new_version = _generate_swagger_file(
+        paths, methods_per_path, definitions, properties_per_definition,
+        nesting_depth, random.Random(seed)
+    )
+    _apply_changes(new_version, change_ratio, random.Random(seed + 1))
+    
+    return current_version, new_version
+
+
+def _generate_swagger_file(paths: int,
+                           methods_per_path: int,
+                           definitions: int,
+                           properties_per_definition: int,
+                           nesting_depth: int,
+                           rng: random.Random) -> dict:
+    definitions = max(definitions, 1)
+    nesting_depth = max(nesting_depth, 1)
+    methods_per_path = min(max(methods_per_path, 1), len(HTTP_METHODS))
+    
+    return {
+        'swagger': '2.0',
+        'info': {'title': 'Synthetic API', 'version': '1.0.0',
+                 'description': 'Generated for benchmarking'},
+        'host': 'api.example.com',
+        'basePath': '/v1',
+        'schemes': ['https'],
+        'paths': {
+            f'/resource{i}/{{id}}': {
+                method: _generate_method(i, method, definitions, rng)
+                for method in rng.sample(HTTP_METHODS, methods_per_path)
+            }
+            for i in range(paths)
+        },
+        'definitions': {
+            _contract_name(i): _generate_contract(
+                i, definitions, properties_per_definition, nesting_depth, rng)
+            for i in range(definitions)
+        },
+    }
+
+
+def _generate_method(path_index: int, method: str,
+                     definitions: int, rng: random.Random) -> dict:
+    schema = {'$ref': f'#/definitions/{_contract_name(rng.randrange(definitions))}'}
+    details = {
+        'tags': [f'tag{path_index % 20}'],
+        'summary': f'{method.upper()} resource {path_index}',
+        'operationId': f'{method}Resource{path_index}',
+        'produces': ['application/json'],
+        'parameters': [
+            {'name': 'id', 'in': 'path', 'required': True,
+             'type': 'integer', 'format': 'int64'},
+        ],
+        'responses': {
+            '200': {'description': 'successful operation'},
+            '404': {'description': 'Resource not found'},
+        },
+    }
+    
+    if method in ('post', 'put', 'patch'):
+        details['parameters'].append(
+            {'name': 'body', 'in': 'body', 'required': True, 'schema': schema})
+    else:
+        details['responses']['200']['schema'] = schema
+    
+    return details
+
+
+def _generate_contract(index: int, definitions: int,
+                       properties_per_definition: int,
+                       nesting_depth: int, rng: random.Random) -> dict:
+    properties = {
+        f'field{j}': dict(rng.choice(PROPERTY_TYPES))
+        for j in range(properties_per_definition)
+    }
+    
+    # reference the next contract of the same nesting chain
+    if (index + 1) % nesting_depth and index + 1 < definitions:
+        ref = {'$ref': f'#/definitions/{_contract_name(index + 1)}'}
+        if rng.random() < 0.5:
+            properties['nested'] = ref
+        else:
+            properties['nested'] = {'type': 'array', 'items': ref}
+    
+    return {
+        'type': 'object',
+        'required': list(properties)[:2],
+        'properties': properties,
+    }
+
+
+def _apply_changes(swagger_file: dict, change_ratio: float,
+                   rng: random.Random) -> None:
+    paths = swagger_file['paths']
+    contracts = swagger_file['definitions']
+    num_contracts = len(contracts)
+    
+    for path in list(paths):
+        if rng.random() >= change_ratio:
+            continue
+        
+        methods = paths[path]
+        change = rng.randrange(3)
+        if change == 0:
+            del paths[path]
+        elif change == 1 and len(methods) > 1:
+            del methods[rng.choice(list(methods))]
+        else:
+            unused_methods = [m for m in HTTP_METHODS if m not in methods]
+            if unused_methods:
+                method = rng.choice(unused_methods)
+                methods[method] = _generate_method(0, method, num_contracts, rng)
+    
+    for contract in list(contracts):
+        if rng.random() >= change_ratio:
+            continue
+        
+        properties = contracts[contract]['properties']
+        if rng.randrange(2) and len(properties) > 1:
+            del properties[rng.choice(list(properties))]
+        else:
+            properties[f'added{len(properties)}'] = dict(
+                rng.choice(PROPERTY_TYPES))
+    
+    num_paths = len(paths)
+    for i in range(int(num_paths * change_ratio / 2)):
+        paths[f'/added{i}/{{id}}'] = {
+            'get': _generate_method(i, 'get', num_contracts, rng)}
+    
+    for i in range(int(num_contracts * change_ratio / 2)):
+        contracts[f'Added{i}'] = _generate_contract(
+            i, num_contracts, 3, 1, rng)
+
+
+def _contract_name(index: int) -> str:
+    return f'Model{index}'
@@ -158,6 +158,116 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'mediafiles')
 # requests lib related settings
 REQUESTS_DEFAULT_TIMEOUT_IN_SECONDS = int(os.environ.get(
     'REQUESTS_DEFAULT_TIMEOUT'))
+# retries sleep a random time of up to backoff factor * 2 ** (retries - 1)
+# seconds or as long as requested by "Retry-After" headers (up to a limit)
+REQUESTS_RETRY_BACKOFF_FACTOR = float(os.environ.get(
+    'REQUESTS_RETRY_BACKOFF_FACTOR', 0.5))
+REQUESTS_RETRY_AFTER_MAX_IN_SECONDS = int(os.environ.get(
+    'REQUESTS_RETRY_AFTER_MAX', 30))
+
+# Swagger file changes processing related settings
+# record per-stage timings and counters of the swagger file diffs pipeline
+SWAGGER_FILE_DIFFS_INSTRUMENTATION = os.environ.get(
+    'SWAGGER_FILE_DIFFS_INSTRUMENTATION', 'false').lower() == 'true'
+# a sweep is split into shards (celery tasks) of this many swagger file ids
+SWAGGER_FILE_SWEEP_SHARD_SIZE = int(os.environ.get(
+    'SWAGGER_FILE_SWEEP_SHARD_SIZE', 500))
+# new sweeps are not started while the previous one is running,
+# unless none of its shards reported for this long (in seconds)
+SWAGGER_FILE_SWEEP_LEASE_TIMEOUT_IN_SECONDS = int(os.environ.get(
+    'SWAGGER_FILE_SWEEP_LEASE_TIMEOUT', 60 * 60))
+# periodic tasks are not run while the previous run is in progress,
+# unless it has been running for this long (in seconds)
+TASK_LEASE_TIMEOUT_IN_SECONDS = int(os.environ.get(
+    'TASK_LEASE_TIMEOUT', 30 * 60))
+# swagger files are queried in chunks of this size
+SWAGGER_FILE_DIFFS_CHUNK_SIZE = int(os.environ.get(
+    'SWAGGER_FILE_DIFFS_CHUNK_SIZE', 100))
+# results of this many swagger files are persisted in a single transaction
+SWAGGER_FILE_RESULTS_BATCH_SIZE = int(os.environ.get(
+    'SWAGGER_FILE_RESULTS_BATCH_SIZE', 50))
+# the number of consumer workers is adjusted at runtime within these bounds
+SWAGGER_FILE_DIFFS_CONSUMERS = int(os.environ.get(
+    'SWAGGER_FILE_DIFFS_CONSUMERS', 10))
+SWAGGER_FILE_DIFFS_MIN_CONSUMERS = int(os.environ.get(
+    'SWAGGER_FILE_DIFFS_MIN_CONSUMERS', 2))
+SWAGGER_FILE_DIFFS_MAX_CONSUMERS = int(os.environ.get(
+    'SWAGGER_FILE_DIFFS_MAX_CONSUMERS', 40))
+# maximum number of swagger files waiting to be processed
+SWAGGER_FILE_DIFFS_QUEUE_SIZE = int(os.environ.get(
+    'SWAGGER_FILE_DIFFS_QUEUE_SIZE', 20))
+# download swagger files concurrently on an asyncio event loop
+SWAGGER_FILE_ASYNC_FETCH = os.environ.get(
+    'SWAGGER_FILE_ASYNC_FETCH', 'false').lower() == 'true'
+# maximum number of concurrent downloads (in total and per host)
+SWAGGER_FILE_FETCH_CONCURRENCY = int(os.environ.get(
+    'SWAGGER_FILE_FETCH_CONCURRENCY', 100))
+SWAGGER_FILE_FETCH_PER_HOST_CONCURRENCY = int(os.environ.get(
+    'SWAGGER_FILE_FETCH_PER_HOST_CONCURRENCY', 10))
+# swagger files are not downloaded from a host for the cool-down period
+# (in seconds) after this many consecutive failed downloads
+SWAGGER_FILE_FETCH_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get(
+    'SWAGGER_FILE_FETCH_CIRCUIT_FAILURE_THRESHOLD', 5))
+SWAGGER_FILE_FETCH_CIRCUIT_COOL_DOWN_IN_SECONDS = int(os.environ.get(
+    'SWAGGER_FILE_FETCH_CIRCUIT_COOL_DOWN', 5 * 60))
+# run CPU-bound swagger file changes processing in a pool of processes
+SWAGGER_FILE_DIFFS_PROCESS_POOL = os.environ.get(
+    'SWAGGER_FILE_DIFFS_PROCESS_POOL', 'false').lower() == 'true'
+SWAGGER_FILE_DIFFS_PROCESS_POOL_SIZE = int(os.environ.get(
+    'SWAGGER_FILE_DIFFS_PROCESS_POOL_SIZE', os.cpu_count() or 1))
+# swagger projects are checked for swagger file changes
+# with intervals (in seconds) growing by the backoff factor
+# while their swagger files stay unchanged,
+# intervals are reset when a change is detected or a commit is registered
+SWAGGER_PROJECT_MIN_CHECK_INTERVAL_IN_SECONDS = int(os.environ.get(
+    'SWAGGER_PROJECT_MIN_CHECK_INTERVAL', 15 * 60))
+SWAGGER_PROJECT_MAX_CHECK_INTERVAL_IN_SECONDS = int(os.environ.get(
+    'SWAGGER_PROJECT_MAX_CHECK_INTERVAL', 24 * 60 * 60))
+SWAGGER_PROJECT_CHECK_INTERVAL_BACKOFF_FACTOR = float(os.environ.get(
+    'SWAGGER_PROJECT_CHECK_INTERVAL_BACKOFF_FACTOR', 2))
+# process swagger file changes of swagger projects integrated
+# with remote VCS accounts as soon as commits are registered by webhooks,
+# commits registered within the debounce delay (in seconds)
+# are processed together
+SWAGGER_PROJECT_WEBHOOK_PROCESSING = os.environ.get(
+    'SWAGGER_PROJECT_WEBHOOK_PROCESSING', 'true').lower() == 'true'
+SWAGGER_PROJECT_WEBHOOK_DEBOUNCE_IN_SECONDS = int(os.environ.get(
+    'SWAGGER_PROJECT_WEBHOOK_DEBOUNCE', 30))
+# larger swagger files are rejected while being downloaded
+SWAGGER_FILE_MAX_SIZE_IN_BYTES = int(os.environ.get(
+    'SWAGGER_FILE_MAX_SIZE', 10 * 1024 * 1024))
+
+# OAuth access tokens refresh related settings
+# the number of consumer workers is adjusted at runtime within these bounds
+VCS_ACCESS_TOKEN_REFRESH_CONSUMERS = int(os.environ.get(
+    'VCS_ACCESS_TOKEN_REFRESH_CONSUMERS', 10))
+VCS_ACCESS_TOKEN_REFRESH_MIN_CONSUMERS = int(os.environ.get(
+    'VCS_ACCESS_TOKEN_REFRESH_MIN_CONSUMERS', 2))
+VCS_ACCESS_TOKEN_REFRESH_MAX_CONSUMERS = int(os.environ.get(
+    'VCS_ACCESS_TOKEN_REFRESH_MAX_CONSUMERS', 20))
+# access tokens are refreshed within this window (in seconds) of expiring,
+# should be longer than the interval between refresh runs
+VCS_ACCESS_TOKEN_EXPIRY_WINDOW_IN_SECONDS = int(os.environ.get(
+    'VCS_ACCESS_TOKEN_EXPIRY_WINDOW', 20 * 60))
+# refreshes are scheduled up to this much earlier (in seconds) at random
+VCS_ACCESS_TOKEN_REFRESH_SPREAD_IN_SECONDS = int(os.environ.get(
+    'VCS_ACCESS_TOKEN_REFRESH_SPREAD', 20 * 60))
+# maximum number of access tokens refreshed by a single run
+VCS_ACCESS_TOKEN_REFRESH_BATCH_SIZE = int(os.environ.get(
+    'VCS_ACCESS_TOKEN_REFRESH_BATCH_SIZE', 500))
+# failed refreshes are retried after this delay (in seconds),
+# doubled with each consecutive failure up to the maximum delay
+VCS_ACCESS_TOKEN_REFRESH_RETRY_DELAY_IN_SECONDS = int(os.environ.get(
+    'VCS_ACCESS_TOKEN_REFRESH_RETRY_DELAY', 10 * 60))
+VCS_ACCESS_TOKEN_REFRESH_MAX_RETRY_DELAY_IN_SECONDS = int(os.environ.get(
+    'VCS_ACCESS_TOKEN_REFRESH_MAX_RETRY_DELAY', 24 * 60 * 60))
+
+# Metrics related settings
+# background pipelines' metrics (/metrics/) are served only to scrapers
+# presenting this bearer token and/or connecting from these IP addresses
+# (space separated), not served at all if neither is set
+METRICS_BEARER_TOKEN = os.environ.get('METRICS_BEARER_TOKEN')
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '').split()
 
 # Celery related settings
 CELERY_ACCEPT_CONTENT = ['application/json']
@@ -3,6 +3,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.http import HttpResponse
 
+from apps.swagger_projects.metrics import metrics_view
 
 urlpatterns = [
     path('v1/', include('apps.accounts.api.urls')),
@@ -11,6 +12,9 @@ urlpatterns = [
     path('auth/', include('rest_framework.urls')),
     # for kubernetes readiness and liveness probes
     path('healthz/', lambda request: HttpResponse()),
+    # for prometheus to scrape background pipelines' metrics
+    # (restricted by METRICS_BEARER_TOKEN and METRICS_ALLOWED_IPS settings)
+    path('metrics/', metrics_view),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,28 @@
+import random
+
+from requests.packages.urllib3.util.retry import Retry
+
+from django.conf import settings
+
+RETRY_AFTER_MAX = settings.REQUESTS_RETRY_AFTER_MAX_IN_SECONDS
+
+
+class JitteredRetry(Retry):
+    """
+    Inherits from Retry to randomize exponential backoff ("full jitter") -
+    sleep a random time between 0 and backoff_factor * 2 ** (retries - 1),
+    so clients retrying after a shared failure do not retry in lockstep.
+    
+    "Retry-After" response headers are respected (see Retry.sleep),
+    but never for more than REQUESTS_RETRY_AFTER_MAX_IN_SECONDS.
+    """
+    
+    def get_backoff_time(self):
+        return random.uniform(0, super().get_backoff_time())
+    
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        
+        return min(retry_after, RETRY_AFTER_MAX)
@@ -1 +1,2 @@
-from .pipeline_conftest import *
\ No newline at end of file
+from .pipeline_conftest import *
+from .db_conftest import *
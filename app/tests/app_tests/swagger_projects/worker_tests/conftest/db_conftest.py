@@ -0,0 +1,18 @@
+from pytest import fixture
+
+from apps.accounts.models import Company, User
+from apps.swagger_projects.models import SwaggerProject
+
+
+@fixture
+def swagger_project() -> SwaggerProject:
+    company = Company.objects.create(company_name='Company')
+    user = User.objects.create_user('owner@example.com', 'password')
+    # bulk created, so that its swagger file isn't downloaded
+    swagger_project, = SwaggerProject.objects.bulk_create([SwaggerProject(
+        project_name='Project',
+        swagger_file_url='https://example.com/swagger.json',
+        company=company,
+        project_owner=user
+    )])
+    return swagger_project
@@ -0,0 +1,103 @@
+import pytest
+from requests import Response
+from requests.exceptions import ConnectionError, HTTPError
+
+from apps.swagger_projects.workers import circuit_breaker as circuit_breaker_module
+from apps.swagger_projects.workers.circuit_breaker import HostCircuitBreaker
+from apps.swagger_projects.workers.exceptions import (
+    HostCircuitOpenError,
+    InvalidSwaggerFileError
+)
+
+
+def fail():
+    raise ConnectionError()
+
+
+def respond_with(status_code):
+    def request():
+        response = Response()
+        response.status_code = status_code
+        raise HTTPError(f'{status_code} Error', response=response)
+    
+    return request
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(circuit_breaker_module, 'monotonic', lambda: now[0])
+    return now
+
+
+class TestHostCircuitBreaker:
+    
+    def test_circuit_opens_after_consecutive_failures(self, clock):
+        breaker = HostCircuitBreaker(failure_threshold=2, cool_down=60)
+        
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                breaker.call('down.example.com', fail)
+        
+        with pytest.raises(HostCircuitOpenError):
+            breaker.call('down.example.com', lambda: 'swagger file')
+        assert breaker.call('up.example.com', lambda: 'swagger file') \
+            == 'swagger file'
+        assert breaker.open_hosts() == ['down.example.com']
+        assert breaker.summary() == dict(failures=2, opened=1, skipped=1)
+    
+    def test_successes_and_rejected_responses_reset_failures(self, clock):
+        breaker = HostCircuitBreaker(failure_threshold=2, cool_down=60)
+        
+        def reject():
+            raise InvalidSwaggerFileError()
+        
+        for fn in (fail, reject, fail, lambda: None, fail):
+            try:
+                breaker.call('flaky.example.com', fn)
+            except (ConnectionError, InvalidSwaggerFileError):
+                pass
+        
+        assert breaker.open_hosts() == []
+        assert breaker.summary() == dict(failures=3, opened=0, skipped=0)
+    
+    def test_only_server_error_responses_count_as_failures(self, clock):
+        breaker = HostCircuitBreaker(failure_threshold=2, cool_down=60)
+        
+        for status_code in (404, 401, 404, 500, 403, 503, 404):
+            with pytest.raises(HTTPError):
+                breaker.call('raw.example.com', respond_with(status_code))
+        
+        # client errors (e.g. a misconfigured swagger file URL)
+        # reset consecutive failures
+        assert breaker.open_hosts() == []
+        assert breaker.summary() == dict(failures=2, opened=0, skipped=0)
+        
+        for _ in range(2):
+            with pytest.raises(HTTPError):
+                breaker.call('raw.example.com', respond_with(502))
+        assert breaker.open_hosts() == ['raw.example.com']
+    
+    def test_single_trial_request_after_cool_down(self, clock):
+        breaker = HostCircuitBreaker(failure_threshold=1, cool_down=60)
+        with pytest.raises(ConnectionError):
+            breaker.call('down.example.com', fail)
+        
+        clock[0] = 30
+        assert not breaker.allow('down.example.com')
+        
+        # failed trial request opens the circuit again
+        clock[0] = 60
+        assert breaker.allow('down.example.com')
+        assert not breaker.allow('down.example.com')
+        breaker.record_failure('down.example.com')
+        clock[0] = 90
+        assert not breaker.allow('down.example.com')
+        
+        # successful trial request closes the circuit
+        clock[0] = 120
+        assert breaker.call('down.example.com', lambda: 'swagger file') \
+            == 'swagger file'
+        assert breaker.allow('down.example.com')
+        assert breaker.open_hosts() == []
+        assert breaker.summary() == dict(failures=2, opened=2, skipped=3)
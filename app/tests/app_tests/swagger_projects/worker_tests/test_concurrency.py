@@ -0,0 +1,82 @@
+from apps.swagger_projects.workers.concurrency import (
+    AdaptiveConcurrencyController,
+    THROUGHPUT_IMPROVED,
+    ERROR_RATE_ROSE,
+    LATENCY_ROSE
+)
+
+
+def create_controller(**kwargs):
+    spawned = []
+    controller = AdaptiveConcurrencyController(
+        spawn_worker=lambda: spawned.append(1),
+        window=2,
+        max_cpu_utilization=float('inf'),
+        **kwargs
+    )
+    return controller, spawned
+
+
+class TestAdaptiveConcurrencyController:
+    
+    def test_initial_workers_are_spawned_within_bounds(self):
+        controller, spawned = create_controller(
+            initial_workers=10, min_workers=2, max_workers=4)
+        
+        controller.start()
+        
+        assert len(spawned) == 4
+        assert controller.summary()['concurrency'] == 4
+    
+    def test_pool_grows_while_throughput_improves(self):
+        controller, spawned = create_controller(
+            initial_workers=2, min_workers=1, max_workers=5)
+        controller.start()
+        
+        # the first window has nothing to compare with
+        for _ in range(2):
+            controller.record(0.01)
+        controller.previous_throughput = 0
+        for _ in range(2):
+            controller.record(0.01)
+        
+        summary = controller.summary()
+        assert len(spawned) == 5
+        assert summary['concurrency'] == 5
+        assert [adjustment['reason'] for adjustment in summary['adjustments']] \
+            == [THROUGHPUT_IMPROVED, THROUGHPUT_IMPROVED]
+    
+    def test_pool_shrinks_when_errors_or_latency_rise(self):
+        controller, _ = create_controller(
+            initial_workers=8, min_workers=3, max_workers=8)
+        controller.start()
+        
+        controller.record(0.01, error=True)
+        controller.record(0.01, error=True)
+        controller.record(1.0)
+        controller.record(1.0)
+        controller.record(1.0, error=True)
+        controller.record(1.0, error=True)
+        
+        summary = controller.summary()
+        assert [(adjustment['from_workers'], adjustment['to_workers'],
+                 adjustment['reason'])
+                for adjustment in summary['adjustments']] == [
+            (8, 6, ERROR_RATE_ROSE),
+            (6, 4, LATENCY_ROSE),
+            (4, 3, ERROR_RATE_ROSE),
+        ]
+        # workers retire until the pool matches its new size
+        assert [controller.retire() for _ in range(6)] == [True] * 5 + [False]
+    
+    def test_crashed_workers_are_replaced(self):
+        controller, spawned = create_controller(
+            initial_workers=3, min_workers=1, max_workers=3)
+        controller.start()
+        
+        controller.exit_worker(crashed=True)
+        # workers that run out of tasks are not replaced
+        controller.exit_worker()
+        
+        assert len(spawned) == 4
+        assert controller.active_workers == 2
@@ -0,0 +1,160 @@
+import orjson
+import pytest
+from requests.exceptions import HTTPError
+from requests.packages.urllib3.response import HTTPResponse
+
+from apps.swagger_projects.models import SwaggerFile, SwaggerProject
+from apps.swagger_projects.workers import fetchers
+from apps.swagger_projects.workers.fetchers import (
+    fetch_swagger_file,
+    SwaggerFileTooLargeError,
+    InvalidSwaggerFileError
+)
+from shared import jittered_retry
+from shared.jittered_retry import JitteredRetry
+
+
+class FakeResponse:
+    
+    def __init__(self, body=b'', status_code=200, headers=None):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.consumed_chunks = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            self.consumed_chunks += 1
+            yield self.body[i:i + chunk_size]
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError(f'{self.status_code} Error', response=self)
+
+
+class FakeSession:
+    
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+    
+    def get(self, url, **kwargs):
+        self.requests.append((url, kwargs))
+        return self.response
+
+
+@pytest.fixture
+def fake_http(monkeypatch):
+    def install(response):
+        session = FakeSession(response)
+        monkeypatch.setattr(fetchers, 'http', session)
+        return session
+    
+    return install
+
+
+class TestFetchers:
+    
+    def test_swagger_file_is_streamed_and_parsed(self, fake_http, swagger_files):
+        _, new_version = swagger_files
+        session = fake_http(FakeResponse(
+            orjson.dumps(new_version),
+            headers={'ETag': '"v2"', 'Last-Modified': 'Sat, 17 Oct 2026'}
+        ))
+        
+        swagger_file_response = fetch_swagger_file(
+            'https://example.com/swagger.json', etag='"v1"')
+        
+        assert swagger_file_response.swagger_file == new_version
+        assert swagger_file_response.etag == '"v2"'
+        assert swagger_file_response.last_modified == 'Sat, 17 Oct 2026'
+        assert not swagger_file_response.not_modified
+        assert session.requests[0][1]['stream'] is True
+        assert session.requests[0][1]['headers'] == {'If-None-Match': '"v1"'}
+    
+    def test_not_modified_body_is_not_read(self, fake_http):
+        response = FakeResponse(b'{}', status_code=304)
+        fake_http(response)
+        
+        swagger_file_response = fetch_swagger_file(
+            'https://example.com/swagger.json', etag='"v1"')
+        
+        assert swagger_file_response.not_modified
+        assert swagger_file_response.swagger_file is None
+        assert swagger_file_response.etag == '"v1"'
+        assert response.consumed_chunks == 0
+    
+    def test_declared_oversized_swagger_file_is_rejected_before_reading(
+        self, fake_http, settings
+    ):
+        settings.SWAGGER_FILE_MAX_SIZE_IN_BYTES = 1024
+        response = FakeResponse(b'{}', headers={'Content-Length': '2048'})
+        fake_http(response)
+        
+        with pytest.raises(SwaggerFileTooLargeError):
+            fetch_swagger_file('https://example.com/swagger.json')
+        assert response.consumed_chunks == 0
+    
+    def test_streamed_oversized_swagger_file_is_rejected_early(self, fake_http,
+                                                               settings):
+        settings.SWAGGER_FILE_MAX_SIZE_IN_BYTES = fetchers.CHUNK_SIZE
+        response = FakeResponse(b' ' * fetchers.CHUNK_SIZE * 10 + b'{}')
+        fake_http(response)
+        
+        with pytest.raises(SwaggerFileTooLargeError):
+            fetch_swagger_file('https://example.com/swagger.json')
+        assert response.consumed_chunks == 2
+    
+    def test_invalid_json_is_rejected(self, fake_http):
+        fake_http(FakeResponse(b'<html>Not Found</html>'))
+        
+        with pytest.raises(InvalidSwaggerFileError):
+            fetch_swagger_file('https://example.com/swagger.json')
+    
+    def test_error_response_is_rejected(self, fake_http):
+        response = FakeResponse(b'{"error": "Service Unavailable"}',
+                                status_code=503)
+        fake_http(response)
+        
+        with pytest.raises(HTTPError):
+            fetch_swagger_file('https://example.com/swagger.json')
+        assert response.consumed_chunks == 0
+    
+    @pytest.mark.django_db
+    def test_swagger_project_is_deleted_on_error_response(self, fake_http,
+                                                          swagger_project):
+        fake_http(FakeResponse(b'{"error": "Not Found"}', status_code=404))
+        
+        assert SwaggerFile.objects.validate_create(swagger_project) is None
+        assert not SwaggerProject.objects.filter(id=swagger_project.id).exists()
+
+
+class TestJitteredRetry:
+    
+    def test_backoff_is_randomized_up_to_exponential_backoff(self, monkeypatch):
+        monkeypatch.setattr(jittered_retry.random, 'uniform',
+                            lambda low, high: (low, high))
+        retry = JitteredRetry(total=5, backoff_factor=0.5,
+                              status_forcelist=[503])
+        
+        for _ in range(3):
+            retry = retry.increment('GET', '/swagger.json',
+                                    response=HTTPResponse(status=503))
+        
+        assert retry.get_backoff_time() == (0, 2.0)
+    
+    def test_retry_after_is_respected_up_to_limit(self, monkeypatch):
+        monkeypatch.setattr(jittered_retry, 'RETRY_AFTER_MAX', 30)
+        retry = JitteredRetry(total=3, status_forcelist=[503])
+        
+        assert retry.get_retry_after(
+            HTTPResponse(status=503, headers={'Retry-After': '5'})) == 5
+        assert retry.get_retry_after(
+            HTTPResponse(status=503, headers={'Retry-After': '3600'})) == 30
+        assert retry.get_retry_after(HTTPResponse(status=503)) is None
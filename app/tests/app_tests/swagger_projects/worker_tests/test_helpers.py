@@ -0,0 +1,97 @@
+from apps.swagger_projects.workers.helpers import (
+    index_swagger_file,
+    create_nested_contracts_mapping,
+    create_contract_containers_mapping,
+    create_swagger_file_fingerprints
+)
+from utils.functions import canonical_json_digest
+
+
+class TestHelpers:
+    
+    def test_contract_containers_mapping(self, mandatory_mappings):
+        _, nested_contracts_mapping = mandatory_mappings
+        
+        contract_containers_mapping = create_contract_containers_mapping(
+            nested_contracts_mapping)
+        
+        contracts = {contract
+                     for contracts in nested_contracts_mapping.values()
+                     for contract in contracts}
+        
+        assert contracts
+        for contract in contracts:
+            assert contract_containers_mapping[contract] == [
+                k for k, v in nested_contracts_mapping.items() if contract in v
+            ]
+    
+    def test_contract_containers_are_not_duplicated(self):
+        nested_contracts_mapping = {
+            'Order': ['Pet', 'User', 'Pet'],
+            'Cart': ['Order', 'Pet'],
+        }
+        
+        contract_containers_mapping = create_contract_containers_mapping(
+            nested_contracts_mapping)
+        
+        assert contract_containers_mapping == {
+            'Pet': ['Order', 'Cart'],
+            'User': ['Order'],
+            'Order': ['Cart'],
+        }
+    
+    def test_index_swagger_file(self, swagger_files, mandatory_mappings):
+        _, new_version = swagger_files
+        endpoint_contract_mapping, nested_contracts_mapping = mandatory_mappings
+        
+        swagger_file_index = index_swagger_file(new_version)
+        
+        assert (swagger_file_index.endpoint_contract_mapping ==
+                endpoint_contract_mapping)
+        assert (swagger_file_index.nested_contracts_mapping ==
+                nested_contracts_mapping)
+        assert (swagger_file_index.contract_containers_mapping ==
+                create_contract_containers_mapping(nested_contracts_mapping))
+        assert swagger_file_index.fingerprints == {
+            section: {k: canonical_json_digest(v)
+                      for k, v in new_version[section].items()}
+            for section in ('paths', 'definitions')
+        }
+        assert (create_swagger_file_fingerprints(new_version) ==
+                swagger_file_index.fingerprints)
+    
+    def test_deeply_nested_contract_refs(self):
+        details = {'$ref': '#/definitions/Root'}
+        for _ in range(5000):
+            details = {'properties': {'nested': details}}
+        
+        nested_contracts_mapping = create_nested_contracts_mapping(
+            {'Deep': details})
+        
+        assert nested_contracts_mapping == {'Deep': ['Root']}
+    
+    def test_deeply_nested_swagger_file_is_indexed(self):
+        def create_swagger_file(leaf_type):
+            details = {'$ref': '#/definitions/Root', 'type': leaf_type}
+            for _ in range(5000):
+                details = {'properties': {'nested': details}}
+            return {
+                'paths': {'/deep': {'get': {'responses': {'200': details}}}},
+                'definitions': {'Deep': details, 'Root': {'type': 'object'}},
+            }
+        
+        swagger_file_index = index_swagger_file(create_swagger_file('string'))
+        changed_swagger_file_index = index_swagger_file(
+            create_swagger_file('integer'))
+        
+        assert swagger_file_index.endpoint_contract_mapping == {
+            'Root': ['get /deep']}
+        assert swagger_file_index.nested_contracts_mapping == {'Deep': ['Root']}
+        fingerprints = swagger_file_index.fingerprints
+        changed_fingerprints = changed_swagger_file_index.fingerprints
+        assert fingerprints['paths']['/deep'] != \
+            changed_fingerprints['paths']['/deep']
+        assert fingerprints['definitions']['Deep'] != \
+            changed_fingerprints['definitions']['Deep']
+        assert fingerprints['definitions']['Root'] == \
+            changed_fingerprints['definitions']['Root']
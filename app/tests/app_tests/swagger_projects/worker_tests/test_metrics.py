@@ -0,0 +1,168 @@
+import pytest
+from django.db import DatabaseError
+from django.test import RequestFactory
+
+from apps.swagger_projects.metrics import (
+    MetricsRegistry,
+    Metric,
+    render_metrics,
+    metrics_view,
+    COUNTER,
+    HISTOGRAM,
+    SWAGGER_PROJECTS_PROCESSED,
+    SWAGGER_FILE_FETCH_DURATION
+)
+from apps.swagger_projects.models import PipelineMetric
+
+LATENCY = Metric('latency_seconds', HISTOGRAM, 'Latency.', (0.1, 1))
+REQUESTS = Metric('requests_total', COUNTER, 'Requests.')
+
+
+class TestMetricsRegistry:
+    
+    def test_counters_and_histograms_are_buffered(self):
+        registry = MetricsRegistry()
+        
+        registry.inc(REQUESTS, outcome='ok')
+        registry.inc(REQUESTS, 2, outcome='ok')
+        registry.observe(LATENCY, 0.05)
+        registry.observe(LATENCY, 0.5)
+        
+        assert registry.collect() == {
+            ('requests_total', (('outcome', 'ok'),)): 3,
+            ('latency_seconds_bucket', (('le', '0.1'),)): 1,
+            ('latency_seconds_bucket', (('le', '1.0'),)): 2,
+            ('latency_seconds_bucket', (('le', '+Inf'),)): 2,
+            ('latency_seconds_sum', ()): 0.55,
+            ('latency_seconds_count', ()): 2,
+        }
+        # collected samples are no longer buffered
+        assert registry.collect() == {}
+    
+    def test_samples_stay_buffered_if_flush_fails(self, monkeypatch):
+        def increment(samples):
+            raise DatabaseError()
+        
+        monkeypatch.setattr(PipelineMetric.objects, 'increment', increment)
+        registry = MetricsRegistry()
+        registry.inc(REQUESTS)
+        
+        registry.flush()
+        registry.inc(REQUESTS)
+        
+        assert registry.collect() == {('requests_total', ()): 2}
+
+
+def test_samples_are_rendered_in_prometheus_text_format():
+    samples = [
+        ('swagger_projects_processed_total', {'outcome': 'changed'}, 3),
+        ('swagger_file_fetch_duration_seconds_bucket',
+         {'outcome': 'failed', 'le': '+Inf'}, 2),
+        ('swagger_file_fetch_duration_seconds_bucket',
+         {'le': '10.0', 'outcome': 'failed'}, 1),
+        ('swagger_file_fetch_duration_seconds_bucket',
+         {'outcome': 'failed', 'le': '2.5'}, 1),
+        ('swagger_file_fetch_duration_seconds_sum', {'outcome': 'failed'}, 31),
+        ('swagger_file_fetch_duration_seconds_count', {'outcome': 'failed'}, 2),
+        ('removed_metric_total', {}, 1),
+    ]
+    
+    lines = render_metrics(samples).splitlines()
+    
+    assert '# TYPE swagger_whats_new_swagger_projects_processed_total counter' \
+        in lines
+    assert 'swagger_whats_new_swagger_projects_processed_total' \
+           '{outcome="changed"} 3.0' in lines
+    assert f'# HELP swagger_whats_new_{SWAGGER_PROJECTS_PROCESSED.name} ' \
+           f'{SWAGGER_PROJECTS_PROCESSED.description}' in lines
+    name = f'swagger_whats_new_{SWAGGER_FILE_FETCH_DURATION.name}'
+    fetch_duration_lines = [line for line in lines if line.startswith(name)]
+    assert fetch_duration_lines == [
+        f'{name}_bucket{{outcome="failed",le="2.5"}} 1.0',
+        f'{name}_bucket{{outcome="failed",le="10.0"}} 1.0',
+        f'{name}_bucket{{outcome="failed",le="+Inf"}} 2.0',
+        f'{name}_sum{{outcome="failed"}} 31.0',
+        f'{name}_count{{outcome="failed"}} 2.0',
+    ]
+    assert not any('removed_metric_total' in line for line in lines)
+
+
+@pytest.mark.parametrize('value, escaped', [
+    ('say "hi"', r'say \"hi\"'),
+    ('back\\slash', r'back\\slash'),
+    ('new\nline', r'new\nline'),
+])
+def test_label_values_are_escaped(value, escaped):
+    samples = [('swagger_projects_processed_total', {'outcome': value}, 1)]
+    
+    assert f'{{outcome="{escaped}"}} 1.0' in render_metrics(samples)
+
+
+class TestMetricsView:
+    
+    @pytest.fixture
+    def scrape(self, monkeypatch):
+        # rejected scrapes never reach the DB
+        monkeypatch.setattr(PipelineMetric.objects, 'values_list',
+                            lambda *fields: [])
+        
+        def scrape(authorization=None, remote_addr='10.0.0.1'):
+            headers = ({'HTTP_AUTHORIZATION': authorization}
+                       if authorization else {})
+            request = RequestFactory().get('/metrics/', REMOTE_ADDR=remote_addr,
+                                           **headers)
+            return metrics_view(request).status_code
+        
+        return scrape
+    
+    def test_metrics_are_not_served_if_not_configured(self, scrape, settings):
+        settings.METRICS_BEARER_TOKEN = None
+        settings.METRICS_ALLOWED_IPS = []
+        
+        assert scrape('Bearer ') == 403
+    
+    def test_bearer_token_is_required(self, scrape, settings):
+        settings.METRICS_BEARER_TOKEN = 'token'
+        settings.METRICS_ALLOWED_IPS = []
+        
+        assert scrape() == 403
+        assert scrape('Bearer wrong') == 403
+        assert scrape('Bearer token') == 200
+    
+    def test_allowed_ip_is_required(self, scrape, settings):
+        settings.METRICS_BEARER_TOKEN = None
+        settings.METRICS_ALLOWED_IPS = ['10.0.0.2']
+        
+        assert scrape() == 403
+        assert scrape(remote_addr='10.0.0.2') == 200
+    
+    def test_both_bearer_token_and_allowed_ip_are_required(self, scrape,
+                                                           settings):
+        settings.METRICS_BEARER_TOKEN = 'token'
+        settings.METRICS_ALLOWED_IPS = ['10.0.0.2']
+        
+        assert scrape('Bearer token') == 403
+        assert scrape(remote_addr='10.0.0.2') == 403
+        assert scrape('Bearer token', remote_addr='10.0.0.2') == 200
+
+
+@pytest.mark.django_db
+def test_stored_samples_are_incremented():
+    PipelineMetric.objects.increment({
+        ('requests_total', (('outcome', 'ok'), ('vcs', 'GH'))): 1,
+        ('requests_total', (('outcome', 'failed'), ('vcs', 'GH'))): 1,
+    })
+    PipelineMetric.objects.increment({
+        ('requests_total', (('outcome', 'ok'), ('vcs', 'GH'))): 2,
+        ('latency_seconds_sum', ()): 0.5,
+    })
+    PipelineMetric.objects.increment({})
+    
+    samples = {(name, tuple(sorted(labels.items()))): value
+               for name, labels, value in PipelineMetric.objects.values_list(
+                   'name', 'labels', 'value')}
+    assert samples == {
+        ('requests_total', (('outcome', 'ok'), ('vcs', 'GH'))): 3,
+        ('requests_total', (('outcome', 'failed'), ('vcs', 'GH'))): 1,
+        ('latency_seconds_sum', ()): 0.5,
+    }
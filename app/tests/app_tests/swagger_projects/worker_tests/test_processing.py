@@ -0,0 +1,57 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import orjson
+
+from apps.swagger_projects.workers.helpers import create_swagger_file_fingerprints
+from apps.swagger_projects.workers.processing import process_swagger_file_diffs
+from utils.functions import canonical_json_digest
+from utils.generators import canonical_json_chunks_gen
+
+
+class TestProcessing:
+    
+    def test_swagger_file_diffs_are_processed_in_a_process_pool(
+        self, swagger_files, precalculated_results
+    ):
+        current_version, new_version = swagger_files
+        
+        with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context('spawn')
+        ) as executor:
+            result = executor.submit(
+                process_swagger_file_diffs,
+                current_version,
+                orjson.dumps(new_version),
+                canonical_json_digest(current_version),
+                create_swagger_file_fingerprints(current_version),
+                True
+            ).result()
+        
+        assert result.digest == canonical_json_digest(new_version)
+        assert result.fingerprints == create_swagger_file_fingerprints(new_version)
+        assert (result.swagger_file_changes ==
+                precalculated_results['pipeline_results'])
+        assert result.stats.counts['kept_changes'] == 10
+    
+    def test_swagger_file_with_unchanged_digest_is_not_processed(self,
+                                                                 swagger_files):
+        current_version, _ = swagger_files
+        digest = canonical_json_digest(current_version)
+        
+        result = process_swagger_file_diffs(
+            current_version, orjson.dumps(current_version), digest, None)
+        
+        assert result.digest == digest
+        assert result.fingerprints is None
+        assert result.swagger_file_changes is None
+        assert result.stats is None
+    
+    def test_non_recursive_canonical_json_matches_orjson(self, swagger_files):
+        current_version, _ = swagger_files
+        value = {'b': [1, 2.5, True, None, {'z': 'quoted "é"', 'a': []}],
+                 'a': {}, 'c': 'new\nline', 'swagger': current_version}
+        
+        assert ''.join(canonical_json_chunks_gen(value)).encode() == \
+            orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
@@ -0,0 +1,31 @@
+from utils.functions import split_range, merge_counters
+
+
+class TestSharding:
+    
+    def test_id_range_is_split_into_shards(self):
+        assert split_range(1, 10, 4) == [(1, 4), (5, 8), (9, 10)]
+        assert split_range(7, 7, 500) == [(7, 7)]
+        assert split_range(1, 1000, 500) == [(1, 500), (501, 1000)]
+    
+    def test_shard_summaries_are_merged(self):
+        sweep_summary = {}
+        
+        merge_counters(sweep_summary, {
+            'swagger_files_to_update': 2,
+            'pipeline_stats': {'counts': {'raw_diffs': 10},
+                               'timings': {'routing': 0.5}}
+        })
+        merge_counters(sweep_summary, {
+            'swagger_files_to_update': 1,
+            'swagger_files_short_circuited': 4,
+            'pipeline_stats': {'counts': {'raw_diffs': 5, 'kept_changes': 5},
+                               'timings': {'routing': 0.25}}
+        })
+        
+        assert sweep_summary == {
+            'swagger_files_to_update': 3,
+            'swagger_files_short_circuited': 4,
+            'pipeline_stats': {'counts': {'raw_diffs': 15, 'kept_changes': 5},
+                               'timings': {'routing': 0.75}}
+        }
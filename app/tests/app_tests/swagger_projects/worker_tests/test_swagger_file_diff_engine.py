@@ -0,0 +1,90 @@
+import copy
+
+import dictdiffer
+
+from apps.swagger_projects.workers.diff_engine import SwaggerFileDiffEngine
+from apps.swagger_projects.workers.helpers import create_swagger_file_fingerprints
+
+
+def strip_values(diffs):
+    return [(change, where, [el[0] for el in what])
+            for change, where, what in diffs]
+
+
+class TestSwaggerFileDiffEngine:
+    
+    def test_diffs_match_dictdiffer_diffs(self, swagger_files):
+        current_version, new_version = swagger_files
+        
+        engine_diffs = strip_values(
+            SwaggerFileDiffEngine(current_version, new_version).diff())
+        dictdiffer_diffs = strip_values(
+            diff for diff in dictdiffer.diff(current_version, new_version)
+            if diff[0] != 'change'
+        )
+        
+        assert len(engine_diffs) == 10
+        assert engine_diffs == dictdiffer_diffs
+    
+    def test_fingerprinted_diffs_match_full_diffs(self, swagger_files):
+        current_version, new_version = swagger_files
+        
+        full_diffs = strip_values(
+            SwaggerFileDiffEngine(current_version, new_version))
+        fingerprinted_diffs = strip_values(SwaggerFileDiffEngine(
+            current_version,
+            new_version,
+            current_fingerprints=create_swagger_file_fingerprints(
+                current_version),
+            new_fingerprints=create_swagger_file_fingerprints(new_version)
+        ))
+        
+        assert fingerprinted_diffs == full_diffs
+    
+    def test_subtrees_with_equal_fingerprints_are_skipped(self, swagger_files):
+        current_version, new_version = swagger_files
+        current_fingerprints = create_swagger_file_fingerprints(current_version)
+        
+        # pretend that nothing changed inside of endpoints and contracts
+        diffs = strip_values(SwaggerFileDiffEngine(
+            current_version,
+            new_version,
+            current_fingerprints=current_fingerprints,
+            new_fingerprints=current_fingerprints
+        ))
+        
+        assert diffs == [
+            ('add', 'paths', ['/pet/{petId}/uploadImage']),
+            ('remove', 'paths', ['/pet/{petId}/uploadFile']),
+            ('add', 'definitions', ['Category', 'Tag']),
+            ('remove', 'definitions', ['subCategory']),
+        ]
+    
+    def test_unreported_changes_are_ignored(self, swagger_files):
+        current_version, _ = swagger_files
+        new_version = copy.deepcopy(current_version)
+        
+        new_version['info']['description'] = 'changed'
+        new_version['tags'].append({'name': 'new_tag'})
+        new_version['paths']['/pet']['post']['parameters'].append(
+            {'in': 'query', 'name': 'new_param'})
+        new_version['paths']['/pet']['post']['responses']['404'] = {}
+        new_version['definitions']['Pet']['required'].append('status')
+        
+        diffs = list(SwaggerFileDiffEngine(current_version, new_version))
+        
+        assert diffs == []
+    
+    def test_dotted_keys_use_list_notation(self):
+        current_version = {'paths': {}, 'definitions': {
+            'com.example.Pet': {'properties': {'id': {}}}
+        }}
+        new_version = {'paths': {}, 'definitions': {
+            'com.example.Pet': {'properties': {'id': {}, 'name': {}}}
+        }}
+        
+        diffs = strip_values(SwaggerFileDiffEngine(current_version, new_version))
+        
+        assert diffs == [
+            ('add', ['definitions', 'com.example.Pet', 'properties'], ['name'])
+        ]
@@ -1,4 +1,11 @@
 import dictdiffer
+import pytest
+
+from apps.swagger_projects.workers.data_pipelines import (
+    SwaggerFileDiffsPipeline,
+    classify_where
+)
+from apps.swagger_projects.workers.instrumentation import PipelineStats
 
 
 class TestSwaggerFileDiffsPipeline:
@@ -245,3 +252,43 @@ class TestSwaggerFileDiffsPipeline:
         swagger_file_diffs_pipeline.run()
         assert (swagger_file_diffs_pipeline.swagger_file_changes ==
                 precalculated_results['pipeline_results'])
+    
+    def test_coroutine_pipeline_flow_and_results(self, precalculated_results,
+                                                 swagger_file_diffs_pipeline):
+        swagger_file_diffs_pipeline.use_dispatch_table = False
+        swagger_file_diffs_pipeline.run()
+        assert (swagger_file_diffs_pipeline.swagger_file_changes ==
+                precalculated_results['pipeline_results'])
+    
+    def test_classify_where(self):
+        assert classify_where('paths') == 'endpoints'
+        assert classify_where('paths./pet') == 'methods'
+        assert classify_where('definitions') == 'contracts'
+        assert classify_where('definitions.Pet.properties') == 'contract_properties'
+        assert classify_where(['definitions', 'a.Pet', 'properties']) == \
+            'contract_properties'
+        assert classify_where('definitions.Pet.required') is None
+        assert classify_where('info') is None
+    
+    @pytest.mark.parametrize('use_dispatch_table', [True, False])
+    def test_instrumented_pipeline_flow_and_results(self, use_dispatch_table,
+                                                    precalculated_results,
+                                                    swagger_file_diffs_pipeline):
+        stats = PipelineStats()
+        default_pipe = swagger_file_diffs_pipeline
+        pipe = SwaggerFileDiffsPipeline(
+            current_swagger_file_version=default_pipe.current_swagger_file_version,
+            new_swagger_file_version=default_pipe.new_swagger_file_version,
+            endpoint_contract_mapping=default_pipe.endpoint_contract_mapping,
+            nested_contracts_mapping=default_pipe.nested_contracts_mapping,
+            use_dispatch_table=use_dispatch_table,
+            stats=stats
+        )
+        pipe.run()
+        
+        assert pipe.swagger_file_changes == precalculated_results['pipeline_results']
+        assert stats.counts['raw_diffs'] == 10
+        assert stats.counts['kept_changes'] == 10
+        assert sum(count for stage, count in stats.counts.items()
+                   if stage.startswith('transform.')) == 10
+        assert stats.timings['diffs_pipeline'] >= stats.timings['diff_generation']
@@ -0,0 +1,48 @@
+from apps.swagger_projects.workers.data_pipelines import SwaggerFileDiffsPipeline
+from apps.swagger_projects.workers.helpers import index_swagger_file
+from benchmarks.swagger_file_generator import generate_swagger_file_pair
+
+
+class TestSwaggerFileGenerator:
+    
+    def test_generated_swagger_files_are_deterministic(self):
+        assert (generate_swagger_file_pair(paths=50, seed=1) ==
+                generate_swagger_file_pair(paths=50, seed=1))
+    
+    def test_generated_swagger_files_shape(self):
+        current_version, new_version = generate_swagger_file_pair(
+            paths=200,
+            methods_per_path=3,
+            definitions=90,
+            nesting_depth=3,
+            change_ratio=0
+        )
+        swagger_file_index = index_swagger_file(current_version)
+        
+        assert current_version == new_version
+        assert len(current_version['paths']) == 200
+        assert all(len(methods) == 3
+                   for methods in current_version['paths'].values())
+        assert len(current_version['definitions']) == 90
+        # 30 chains of 3 contracts, the last contract of a chain nests nothing
+        assert len(swagger_file_index.nested_contracts_mapping) == 60
+        endpoints = swagger_file_index.endpoint_contract_mapping.values()
+        assert sum(map(len, endpoints)) == 600
+    
+    def test_generated_changes_are_reported(self):
+        current_version, new_version = generate_swagger_file_pair(
+            paths=500, change_ratio=0.1)
+        swagger_file_index = index_swagger_file(new_version)
+        
+        pipe = SwaggerFileDiffsPipeline(
+            current_swagger_file_version=current_version,
+            new_swagger_file_version=new_version,
+            endpoint_contract_mapping=swagger_file_index.endpoint_contract_mapping,
+            nested_contracts_mapping=swagger_file_index.nested_contracts_mapping
+        )
+        pipe.run()
+        
+        for change_type in ('additions', 'removals'):
+            for where in ('endpoints', 'methods', 'contract_properties'):
+                assert pipe.swagger_file_changes[change_type][where]
+        assert pipe.swagger_file_changes['additions']['contracts']
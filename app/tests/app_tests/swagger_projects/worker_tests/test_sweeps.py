@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+import pytest
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from apps.swagger_projects.models import SwaggerFileSweep
+from apps.swagger_projects.tasks import process_swagger_file_changes_shard
+
+pytestmark = pytest.mark.django_db
+
+
+class TestSwaggerFileSweepManager:
+    
+    def test_unfinished_sweep_holding_a_lease_is_active(self):
+        sweep = SwaggerFileSweep.objects.create(shards_total=2)
+        
+        assert list(SwaggerFileSweep.objects.active()) == [sweep]
+    
+    def test_finished_sweep_is_not_active(self):
+        SwaggerFileSweep.objects.create(shards_total=1, shards_done=1,
+                                        finished_at=timezone.now())
+        
+        assert not SwaggerFileSweep.objects.active().exists()
+    
+    def test_sweep_with_expired_lease_is_not_active(self):
+        sweep = SwaggerFileSweep.objects.create(
+            shards_total=2,
+            heartbeat_at=timezone.now() - timedelta(
+                seconds=settings.SWAGGER_FILE_SWEEP_LEASE_TIMEOUT_IN_SECONDS + 1)
+        )
+        assert not SwaggerFileSweep.objects.active().exists()
+        
+        # a heartbeat renews the lease
+        SwaggerFileSweep.objects.heartbeat(sweep.id)
+        
+        assert list(SwaggerFileSweep.objects.active()) == [sweep]
+
+
+class TestSwaggerFileSweepLifecycle:
+    
+    def test_sweep_finishes_when_all_shards_are_done(self):
+        sweep = SwaggerFileSweep.objects.create(shards_total=3)
+        
+        SwaggerFileSweep.objects.record_shard_summary(sweep.id, {'changed': 1})
+        # a permanently failed shard is recorded by the shard task
+        process_swagger_file_changes_shard.on_failure(
+            DatabaseError(), 'task-id', (sweep.id, 501, 1000), {}, None)
+        
+        sweep.refresh_from_db()
+        assert sweep.shards_done == 2
+        assert sweep.finished_at is None
+        assert list(SwaggerFileSweep.objects.active()) == [sweep]
+        
+        SwaggerFileSweep.objects.record_shard_summary(sweep.id, {'changed': 2})
+        
+        sweep.refresh_from_db()
+        assert sweep.shards_done == 3
+        assert sweep.shards_failed == 1
+        assert sweep.summary == {'changed': 3}
+        assert sweep.finished_at is not None
+        assert not SwaggerFileSweep.objects.active().exists()
+    
+    def test_sweep_of_failed_shards_only_finishes(self):
+        sweep = SwaggerFileSweep.objects.create(shards_total=1)
+        
+        process_swagger_file_changes_shard.on_failure(
+            DatabaseError(), 'task-id', (),
+            {'sweep_id': sweep.id, 'first_swagger_file_id': 1,
+             'last_swagger_file_id': 500},
+            None
+        )
+        
+        sweep.refresh_from_db()
+        assert sweep.shards_failed == 1
+        assert sweep.finished_at is not None
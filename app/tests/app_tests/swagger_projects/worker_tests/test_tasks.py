@@ -0,0 +1,226 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+from django.conf import settings
+from django.utils import timezone
+
+from apps.swagger_projects.models import (
+    SwaggerFile,
+    SwaggerFileChange,
+    TaskLease
+)
+from apps.swagger_projects.repo_commits_webhook_callback import webhook_callback
+from apps.swagger_projects.repo_commits_webhook_callback.webhook_callback import (
+    RepositoryCommitsWebhookCallback
+)
+from apps.swagger_projects.tasks import (
+    process_swagger_project_changes,
+    run_exclusively
+)
+from apps.swagger_projects.workers import workers
+from apps.swagger_projects.workers.fetchers import SwaggerFileResponse
+from utils.functions import canonical_json_digest
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def enqueued_tasks(monkeypatch):
+    enqueued = []
+    monkeypatch.setattr(
+        webhook_callback.process_swagger_project_changes, 'apply_async',
+        lambda args, countdown: enqueued.append((args, countdown))
+    )
+    return enqueued
+
+
+def register_commit(swagger_project_id, commit):
+    callback = RepositoryCommitsWebhookCallback('GitHub-Hookshot', {})
+    callback.callback_initialized = True
+    callback.swagger_project_id = swagger_project_id
+    callback.related_commit_details = commit
+    callback()
+
+
+class TestRepositoryCommitsWebhookCallback:
+    
+    def test_commits_are_debounced_into_a_single_task(self, swagger_project,
+                                                      enqueued_tasks):
+        register_commit(swagger_project.id, {'id': 'a'})
+        register_commit(swagger_project.id, {'id': 'b'})
+        
+        swagger_file_change, = SwaggerFileChange.objects.filter(
+            swagger_project=swagger_project)
+        assert swagger_file_change.status == SwaggerFileChange.PENDING
+        assert swagger_file_change.related_commit_details == \
+            [{'id': 'a'}, {'id': 'b'}]
+        assert enqueued_tasks == [
+            ((swagger_project.id,),
+             settings.SWAGGER_PROJECT_WEBHOOK_DEBOUNCE_IN_SECONDS)
+        ]
+    
+    def test_next_check_is_pushed_past_the_task(self, swagger_project,
+                                                enqueued_tasks):
+        swagger_project.check_interval = 3600
+        swagger_project.save()
+        registered_at = timezone.now()
+        
+        register_commit(swagger_project.id, {'id': 'a'})
+        
+        swagger_project.refresh_from_db()
+        assert swagger_project.check_interval == 0
+        assert swagger_project.next_check_at >= registered_at + timedelta(
+            seconds=settings.SWAGGER_PROJECT_WEBHOOK_DEBOUNCE_IN_SECONDS +
+            settings.SWAGGER_PROJECT_MIN_CHECK_INTERVAL_IN_SECONDS)
+    
+    def test_next_check_is_due_if_webhook_processing_is_disabled(
+            self, swagger_project, enqueued_tasks, settings):
+        settings.SWAGGER_PROJECT_WEBHOOK_PROCESSING = False
+        
+        register_commit(swagger_project.id, {'id': 'a'})
+        
+        swagger_project.refresh_from_db()
+        assert swagger_project.next_check_at <= timezone.now()
+        assert not enqueued_tasks
+    
+    def test_commit_is_not_added_to_claimed_change(self, swagger_project,
+                                                   enqueued_tasks):
+        claimed_change = SwaggerFileChange.objects.create(
+            swagger_project=swagger_project,
+            related_commit_details=[{'id': 'a'}],
+            processing_started_at=timezone.now()
+        )
+        
+        register_commit(swagger_project.id, {'id': 'b'})
+        
+        claimed_change.refresh_from_db()
+        assert claimed_change.related_commit_details == [{'id': 'a'}]
+        new_change = SwaggerFileChange.objects.exclude(id=claimed_change.id).get()
+        assert new_change.related_commit_details == [{'id': 'b'}]
+        assert new_change.processing_started_at is None
+        # the new pending change gets a task of its own
+        assert len(enqueued_tasks) == 1
+
+
+class TestProcessSwaggerProjectChanges:
+    
+    @pytest.fixture
+    def swagger_file(self, swagger_project, swagger_files, monkeypatch):
+        current_version, new_version = swagger_files
+        
+        def fake_fetch_swagger_file(swagger_file_url, etag=None,
+                                    last_modified=None, parse=True):
+            return SwaggerFileResponse(new_version, '"v2"', None, False)
+        
+        monkeypatch.setattr(workers, 'fetch_swagger_file',
+                            fake_fetch_swagger_file)
+        return SwaggerFile.objects.create(
+            swagger_project=swagger_project,
+            swagger_file=current_version,
+            swagger_file_digest=canonical_json_digest(current_version)
+        )
+    
+    def test_pending_change_is_processed(self, swagger_project, swagger_file,
+                                         swagger_files):
+        _, new_version = swagger_files
+        pending_change = SwaggerFileChange.objects.create(
+            swagger_project=swagger_project,
+            related_commit_details=[{'id': 'a'}]
+        )
+        
+        summary = process_swagger_project_changes(swagger_project.id)
+        
+        assert summary[workers.SWAGGER_FILE_CHANGES_TO_UPDATE] == 1
+        assert summary[workers.SWAGGER_FILES_TO_UPDATE] == 1
+        # the DB connection is still usable after the task
+        pending_change.refresh_from_db()
+        assert pending_change.status == SwaggerFileChange.PROCESSED
+        assert pending_change.processing_started_at is not None
+        assert pending_change.swagger_file_changes
+        assert pending_change.related_commit_details == [{'id': 'a'}]
+        swagger_file.refresh_from_db()
+        assert swagger_file.swagger_file == new_version
+        assert swagger_file.swagger_file_etag == '"v2"'
+        swagger_project.refresh_from_db()
+        assert swagger_project.check_interval == \
+            settings.SWAGGER_PROJECT_MIN_CHECK_INTERVAL_IN_SECONDS
+    
+    def test_only_the_oldest_pending_change_is_claimed(self, swagger_project,
+                                                       swagger_file):
+        oldest_change, newest_change = [
+            SwaggerFileChange.objects.create(
+                swagger_project=swagger_project,
+                related_commit_details=[{'id': commit_id}]
+            )
+            for commit_id in ('a', 'b')
+        ]
+        
+        process_swagger_project_changes(swagger_project.id)
+        
+        oldest_change.refresh_from_db()
+        newest_change.refresh_from_db()
+        assert oldest_change.status == SwaggerFileChange.PROCESSED
+        assert newest_change.status == SwaggerFileChange.PENDING
+        assert newest_change.processing_started_at is None
+    
+    def test_swagger_project_without_swagger_file_is_skipped(self,
+                                                             swagger_project):
+        assert process_swagger_project_changes(swagger_project.id) == {}
+
+
+class TestTaskLease:
+    
+    def test_held_lease_is_not_acquired(self):
+        assert TaskLease.objects.acquire('task', 60) is not None
+        assert TaskLease.objects.acquire('task', 60) is None
+        # leases are independent
+        assert TaskLease.objects.acquire('other_task', 60) is not None
+    
+    def test_expired_lease_is_taken_over(self):
+        expired_holder = TaskLease.objects.acquire('task', 0)
+        
+        holder = TaskLease.objects.acquire('task', 60)
+        
+        assert holder not in (None, expired_holder)
+        # the expired holder no longer releases the lease
+        TaskLease.objects.release('task', expired_holder)
+        assert TaskLease.objects.get(name='task').holder == holder
+        TaskLease.objects.release('task', holder)
+        assert not TaskLease.objects.exists()
+
+
+class TestRunExclusively:
+    
+    def test_overlapping_run_is_skipped(self):
+        @run_exclusively('task')
+        def run(nested):
+            return run(False) if nested else 'done'
+        
+        assert run(True) is None
+        assert run(False) == 'done'
+        assert not TaskLease.objects.exists()
+    
+    def test_lease_is_released_if_run_fails(self):
+        @run_exclusively('task')
+        def run():
+            raise ValueError
+        
+        with pytest.raises(ValueError):
+            run()
+        
+        assert not TaskLease.objects.exists()
+    
+    def test_run_that_outlived_its_lease_does_not_block(self):
+        TaskLease.objects.create(
+            name='task',
+            holder=uuid.uuid4(),
+            acquired_at=timezone.now() - timedelta(hours=2),
+            expires_at=timezone.now() - timedelta(hours=1)
+        )
+        
+        @run_exclusively('task')
+        def run():
+            return 'done'
+        
+        assert run() == 'done'
@@ -0,0 +1,945 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from io import BytesIO
+from queue import Queue
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from django.db import DataError
+from django.utils import timezone
+from requests import Response
+from requests.exceptions import ConnectionError, RetryError
+
+from apps.accounts.models import Company
+from apps.swagger_projects.models import (
+    SwaggerFile,
+    SwaggerProject,
+    SwaggerFileChange,
+    RemoteVCSAccount
+)
+from apps.swagger_projects.vcs_utility import utils as vcs_utils
+from apps.swagger_projects.vcs_utility import AccessTokenRefreshError
+from apps.swagger_projects.workers import fetchers, workers
+from apps.swagger_projects.workers.circuit_breaker import HostCircuitBreaker
+from apps.swagger_projects.workers.concurrency import AdaptiveConcurrencyController
+from apps.swagger_projects.workers.exceptions import HostCircuitOpenError
+from apps.swagger_projects.workers.fetchers import SwaggerFileResponse
+from apps.swagger_projects.workers.helpers import (
+    index_swagger_file,
+    create_swagger_file_fingerprints
+)
+from apps.swagger_projects.workers.shared import SharedSwaggerFiles
+from apps.swagger_projects.workers.workers import Task
+from utils.functions import canonical_json_digest
+
+
+@pytest.fixture
+def run_worker(monkeypatch, swagger_files):
+    current_version, new_version = swagger_files
+    
+    def run(fetched_swagger_file=new_version, swagger_file_digest=None):
+        def fake_fetch_swagger_file(swagger_file_url, etag=None,
+                                    last_modified=None, parse=True):
+            return SwaggerFileResponse(fetched_swagger_file, '"v2"', None, False)
+        
+        monkeypatch.setattr(workers, 'fetch_swagger_file',
+                            fake_fetch_swagger_file)
+        swagger_file_instance = SwaggerFile(
+            id=1,
+            swagger_file=current_version,
+            swagger_file_digest=swagger_file_digest,
+            swagger_file_fingerprints={},
+            swagger_file_etag='"v1"',
+            swagger_file_last_modified=None
+        )
+        task_queue = Queue(maxsize=1)
+        task_queue.put(Task(
+            swagger_file_instance,
+            SwaggerProject(swagger_file_url='https://example.com/swagger.json',
+                           check_interval=3600),
+            SimpleNamespace(id=1)
+        ))
+        event = threading.Event()
+        event.set()
+        results_queue = Queue()
+        
+        worker = workers.ProcessSwaggerFileDiffsWorker(
+            task_queue=task_queue,
+            event=event,
+            results_queue=results_queue
+        )
+        worker.run()
+        
+        task_results, = results_queue.queue
+        return worker, task_results
+    
+    return run
+
+
+class TestProcessSwaggerFileDiffsWorker:
+    
+    def test_swagger_file_changes_are_prepared_to_be_saved(self, run_worker,
+                                                           swagger_files,
+                                                           precalculated_results):
+        _, new_version = swagger_files
+        
+        _, results_mapping = run_worker()
+        
+        swagger_file_change, = \
+            results_mapping[workers.SWAGGER_FILE_CHANGES_TO_UPDATE]
+        swagger_file, = results_mapping[workers.SWAGGER_FILES_TO_UPDATE]
+        assert (swagger_file_change.swagger_file_changes ==
+                precalculated_results['pipeline_results'])
+        assert swagger_file_change.status == SwaggerFileChange.PROCESSED
+        assert swagger_file.swagger_file == new_version
+        assert swagger_file.swagger_file_etag == '"v2"'
+    
+    def test_changed_swagger_project_check_interval_is_reset(self, run_worker,
+                                                            settings):
+        settings.SWAGGER_PROJECT_MIN_CHECK_INTERVAL_IN_SECONDS = 900
+        
+        _, results_mapping = run_worker()
+        
+        swagger_project, = results_mapping[workers.SWAGGER_PROJECTS_TO_RESCHEDULE]
+        assert swagger_project.check_interval == 900
+        assert swagger_project.next_check_at > timezone.now()
+    
+    def test_swagger_file_with_unchanged_digest_is_short_circuited(
+            self, run_worker, swagger_files):
+        current_version, _ = swagger_files
+        # the same swagger file with its keys reordered
+        fetched_swagger_file = orjson.loads(orjson.dumps(
+            dict(reversed(list(current_version.items())))))
+        
+        worker, results_mapping = run_worker(
+            fetched_swagger_file,
+            swagger_file_digest=canonical_json_digest(current_version)
+        )
+        
+        assert results_mapping[workers.SWAGGER_FILES_SHORT_CIRCUITED] == [1]
+        assert not results_mapping[workers.SWAGGER_FILES_TO_UPDATE]
+        assert not results_mapping[workers.SWAGGER_FILE_CHANGES_TO_UPDATE]
+        assert results_mapping[workers.SWAGGER_FILE_CHANGES_TO_DELETE] == [1]
+        # only response validators of the stored swagger file are updated
+        swagger_file, = results_mapping[workers.SWAGGER_FILE_VALIDATORS_TO_UPDATE]
+        assert swagger_file.swagger_file == current_version
+        assert swagger_file.swagger_file_etag == '"v2"'
+    
+    def test_swagger_file_with_changed_digest_is_replaced(self, run_worker,
+                                                          swagger_files):
+        current_version, _ = swagger_files
+        # changed without affecting endpoints, methods or contracts
+        fetched_swagger_file = dict(current_version,
+                                    info={'title': 'Renamed API'})
+        
+        _, results_mapping = run_worker(
+            fetched_swagger_file,
+            swagger_file_digest=canonical_json_digest(current_version)
+        )
+        
+        assert not results_mapping[workers.SWAGGER_FILES_SHORT_CIRCUITED]
+        assert not results_mapping[workers.SWAGGER_FILE_CHANGES_TO_UPDATE]
+        assert results_mapping[workers.SWAGGER_FILE_CHANGES_TO_DELETE] == [1]
+        swagger_file, = results_mapping[workers.SWAGGER_FILES_TO_UPDATE]
+        assert swagger_file.swagger_file == fetched_swagger_file
+        assert swagger_file.swagger_file_digest == \
+            canonical_json_digest(fetched_swagger_file)
+        assert swagger_file.swagger_file_fingerprints == \
+            create_swagger_file_fingerprints(fetched_swagger_file)
+        assert swagger_file.swagger_file_etag == '"v2"'
+    
+    def test_stored_swagger_file_is_not_loaded_if_not_modified(self,
+                                                               monkeypatch):
+        monkeypatch.setattr(
+            workers, 'fetch_swagger_file',
+            lambda *args, **kwargs: SwaggerFileResponse(None, '"v1"', None, True)
+        )
+        monkeypatch.setattr(
+            SwaggerFile, 'refresh_from_db',
+            lambda *args, **kwargs: pytest.fail('stored swagger file loaded')
+        )
+        # swagger file instance with deferred fields, as queried by the producer
+        swagger_file_instance = SwaggerFile.from_db(
+            None,
+            ['id', 'swagger_file_digest', 'swagger_file_etag',
+             'swagger_file_last_modified', 'swagger_project_id'],
+            [1, None, '"v1"', None, 1]
+        )
+        task_queue = Queue(maxsize=1)
+        task_queue.put(Task(
+            swagger_file_instance,
+            SwaggerProject(swagger_file_url='https://example.com/swagger.json'),
+            None
+        ))
+        event = threading.Event()
+        event.set()
+        results_queue = Queue()
+        
+        workers.ProcessSwaggerFileDiffsWorker(
+            task_queue=task_queue,
+            event=event,
+            results_queue=results_queue
+        ).run()
+        
+        task_results, = results_queue.queue
+        assert task_results[workers.SWAGGER_FILES_SHORT_CIRCUITED] == [1]
+        assert swagger_file_instance.get_deferred_fields() == {
+            'swagger_file', 'swagger_file_fingerprints'}
+    
+    def test_stored_swagger_file_is_kept_on_error_response(self, monkeypatch,
+                                                           swagger_files):
+        current_version, _ = swagger_files
+        response = Response()
+        response.status_code = 500
+        response.url = 'https://example.com/swagger.json'
+        response.raw = BytesIO(b'{"error": "Internal Server Error"}')
+        monkeypatch.setattr(fetchers, 'http', SimpleNamespace(
+            get=lambda *args, **kwargs: response))
+        swagger_file_instance = SwaggerFile(
+            id=1,
+            swagger_file=current_version,
+            swagger_file_digest='digest',
+            swagger_file_fingerprints={},
+            swagger_file_etag='"v1"'
+        )
+        task_queue = Queue(maxsize=1)
+        task_queue.put(Task(
+            swagger_file_instance,
+            SwaggerProject(swagger_file_url='https://example.com/swagger.json'),
+            None
+        ))
+        event = threading.Event()
+        event.set()
+        results_queue = Queue()
+        
+        workers.ProcessSwaggerFileDiffsWorker(
+            task_queue=task_queue,
+            event=event,
+            results_queue=results_queue
+        ).run()
+        
+        assert results_queue.empty()
+        assert swagger_file_instance.swagger_file == current_version
+        assert swagger_file_instance.swagger_file_digest == 'digest'
+        assert swagger_file_instance.swagger_file_etag == '"v1"'
+    
+    def test_shared_swagger_file_is_downloaded_and_indexed_once(
+            self, monkeypatch, swagger_files):
+        current_version, new_version = swagger_files
+        downloads = []
+        indexed = []
+        
+        def fake_fetch_swagger_file(swagger_file_url, etag=None,
+                                    last_modified=None, parse=True):
+            downloads.append((swagger_file_url, etag))
+            time.sleep(0.01)
+            return SwaggerFileResponse(new_version, '"v2"', None, False)
+        
+        def fake_index_swagger_file(swagger_file):
+            indexed.append(swagger_file)
+            return index_swagger_file(swagger_file)
+        
+        monkeypatch.setattr(workers, 'fetch_swagger_file', fake_fetch_swagger_file)
+        monkeypatch.setattr(workers, 'index_swagger_file', fake_index_swagger_file)
+        
+        shared_url = 'https://example.com/shared.json'
+        shared_swagger_files = SharedSwaggerFiles()
+        shared_swagger_files.register(shared_url, 3)
+        task_queue = Queue()
+        for i, url in enumerate((shared_url, shared_url,
+                                 'https://example.com/own.json', shared_url)):
+            task_queue.put(Task(
+                SwaggerFile(id=i, swagger_file=current_version,
+                            swagger_file_fingerprints={},
+                            swagger_file_etag=f'"{i}"'),
+                SwaggerProject(swagger_file_url=url),
+                None
+            ))
+        event = threading.Event()
+        event.set()
+        results_queue = Queue()
+        
+        consumers = [
+            workers.ProcessSwaggerFileDiffsWorker(
+                task_queue=task_queue,
+                event=event,
+                results_queue=results_queue,
+                shared_swagger_files=shared_swagger_files
+            )
+            for _ in range(3)
+        ]
+        for consumer in consumers:
+            consumer.start()
+        for consumer in consumers:
+            consumer.join()
+        
+        assert sorted(downloads) == [('https://example.com/own.json', '"2"'),
+                                     (shared_url, None)]
+        assert len(indexed) == 2
+        assert len(results_queue.queue) == 4
+        assert not shared_swagger_files.is_shared(shared_url)
+    
+    def test_stored_swagger_file_is_sent_to_executor_only_if_changed(
+            self, monkeypatch, swagger_files, precalculated_results):
+        current_version, new_version = swagger_files
+        monkeypatch.setattr(
+            workers, 'fetch_swagger_file',
+            lambda swagger_file_url, **kwargs: SwaggerFileResponse(
+                orjson.dumps(new_version if 'new' in swagger_file_url
+                             else current_version), None, None, False)
+        )
+        monkeypatch.setattr(
+            SwaggerFile, 'refresh_from_db',
+            lambda swagger_file_instance, fields: swagger_file_instance.__dict__
+            .update(swagger_file=current_version, swagger_file_fingerprints={})
+        )
+        submitted = []
+        
+        class RecordingExecutor(ThreadPoolExecutor):
+            def submit(self, fn, current_swagger_file_version, *args):
+                submitted.append(current_swagger_file_version)
+                return super().submit(fn, current_swagger_file_version, *args)
+        
+        task_queue = Queue()
+        for i, url in enumerate(('https://example.com/same.json',
+                                 'https://example.com/new.json')):
+            # swagger file instance with deferred fields,
+            # as queried by the producer
+            task_queue.put(Task(
+                SwaggerFile.from_db(
+                    None,
+                    ['id', 'swagger_file_digest', 'swagger_file_etag',
+                     'swagger_file_last_modified', 'swagger_project_id'],
+                    [i, canonical_json_digest(current_version), None, None, i]
+                ),
+                SwaggerProject(swagger_file_url=url, check_interval=3600),
+                None
+            ))
+        event = threading.Event()
+        event.set()
+        results_queue = Queue()
+        
+        with RecordingExecutor(max_workers=1) as executor:
+            workers.ProcessSwaggerFileDiffsWorker(
+                task_queue=task_queue,
+                event=event,
+                results_queue=results_queue,
+                executor=executor
+            ).run()
+        
+        unchanged_results, changed_results = results_queue.queue
+        assert submitted == [None, None, current_version]
+        assert unchanged_results[workers.SWAGGER_FILES_SHORT_CIRCUITED] == [0]
+        swagger_file_change, = \
+            changed_results[workers.SWAGGER_FILE_CHANGES_TO_CREATE]
+        assert (swagger_file_change.swagger_file_changes ==
+                precalculated_results['pipeline_results'])
+    
+    def test_shared_swagger_file_diffs_are_calculated_once_per_stored_version(
+            self, monkeypatch, swagger_files, precalculated_results):
+        current_version, new_version = swagger_files
+        monkeypatch.setattr(
+            workers, 'fetch_swagger_file',
+            lambda swagger_file_url, **kwargs: SwaggerFileResponse(
+                orjson.dumps(new_version), None, None, False)
+        )
+        parsed = []
+        
+        def fake_parse_swagger_file(raw_swagger_file):
+            parsed.append(raw_swagger_file)
+            return orjson.loads(raw_swagger_file)
+        
+        monkeypatch.setattr(workers, 'parse_swagger_file',
+                            fake_parse_swagger_file)
+        submitted = []
+        
+        class RecordingExecutor(ThreadPoolExecutor):
+            def submit(self, fn, current_swagger_file_version, *args):
+                submitted.append(current_swagger_file_version)
+                return super().submit(fn, current_swagger_file_version, *args)
+        
+        shared_url = 'https://example.com/shared.json'
+        shared_swagger_files = SharedSwaggerFiles()
+        shared_swagger_files.register(shared_url, 3)
+        task_queue = Queue()
+        for i, (stored_version, digest) in enumerate((
+                (current_version, canonical_json_digest(current_version)),
+                (current_version, canonical_json_digest(current_version)),
+                (new_version, 'other'))):
+            task_queue.put(Task(
+                SwaggerFile(id=i, swagger_file=stored_version,
+                            swagger_file_digest=digest,
+                            swagger_file_fingerprints={}),
+                SwaggerProject(swagger_file_url=shared_url, check_interval=3600),
+                None
+            ))
+        event = threading.Event()
+        event.set()
+        results_queue = Queue()
+        
+        with RecordingExecutor(max_workers=1) as executor:
+            workers.ProcessSwaggerFileDiffsWorker(
+                task_queue=task_queue,
+                event=event,
+                results_queue=results_queue,
+                executor=executor,
+                shared_swagger_files=shared_swagger_files
+            ).run()
+        
+        assert submitted == [None, current_version, new_version]
+        assert len(parsed) == 1
+        first_results, second_results, _ = results_queue.queue
+        for results in (first_results, second_results):
+            swagger_file_change, = \
+                results[workers.SWAGGER_FILE_CHANGES_TO_CREATE]
+            assert (swagger_file_change.swagger_file_changes ==
+                    precalculated_results['pipeline_results'])
+        assert not shared_swagger_files.is_shared(shared_url)
+    
+    def test_executor_failure_fails_only_current_task(self, monkeypatch,
+                                                      swagger_files):
+        current_version, new_version = swagger_files
+        monkeypatch.setattr(
+            workers, 'fetch_swagger_file',
+            lambda *args, **kwargs: SwaggerFileResponse(
+                orjson.dumps(new_version), None, None, False)
+        )
+        
+        class BrokenExecutor:
+            def submit(self, *args):
+                future = Future()
+                future.set_exception(BrokenProcessPool())
+                return future
+        
+        task_queue = Queue()
+        for i in range(2):
+            task_queue.put(Task(
+                SwaggerFile(id=i, swagger_file=current_version,
+                            swagger_file_digest='digest',
+                            swagger_file_fingerprints={}),
+                SwaggerProject(swagger_file_url='https://example.com/swagger.json'),
+                None
+            ))
+        event = threading.Event()
+        event.set()
+        results_queue = Queue()
+        
+        workers.ProcessSwaggerFileDiffsWorker(
+            task_queue=task_queue,
+            event=event,
+            results_queue=results_queue,
+            executor=BrokenExecutor()
+        ).run()
+        
+        assert task_queue.unfinished_tasks == 0
+        assert results_queue.empty()
+    
+    def test_task_data_is_released_when_task_is_done(self, run_worker):
+        worker, _ = run_worker()
+        
+        assert worker.swagger_file_instance is None
+        assert worker.current_swagger_file_version is None
+        assert worker.new_swagger_file_version is None
+        assert worker.swagger_file_changes is None
+        assert worker.endpoint_contract_mapping is None
+        assert worker.new_swagger_file_fingerprints is None
+    
+    def test_idle_worker_exits_when_no_more_tasks_will_be_produced(self):
+        event = threading.Event()
+        worker = workers.ProcessSwaggerFileDiffsWorker(
+            task_queue=Queue(),
+            event=event,
+            results_queue=Queue()
+        )
+        # waits for a task that is never produced
+        # (or that was taken by another worker)
+        worker.daemon = True
+        worker.start()
+        
+        event.set()
+        worker.join(timeout=5)
+        
+        assert not worker.is_alive()
+
+
+class TestPersistSwaggerFileResultsWorker:
+    
+    def test_results_are_persisted_in_batches(self, monkeypatch):
+        batches = []
+        monkeypatch.setattr(
+            workers.PersistSwaggerFileResultsWorker,
+            'save_results_to_db',
+            staticmethod(lambda results_mapping: batches.append(results_mapping))
+        )
+        
+        results_queue = Queue()
+        writer = workers.PersistSwaggerFileResultsWorker(
+            results_queue=results_queue,
+            batch_size=2
+        )
+        for i in range(5):
+            results_queue.put({
+                workers.SWAGGER_FILE_CHANGES_TO_CREATE: [f'change{i}'],
+                workers.SWAGGER_FILES_TO_UPDATE: [f'file{i}'],
+            })
+        results_queue.put(None)
+        writer.run()
+        
+        assert [batch[workers.SWAGGER_FILES_TO_UPDATE] for batch in batches] == [
+            ['file0', 'file1'], ['file2', 'file3'], ['file4']]
+        assert [batch[workers.SWAGGER_FILE_CHANGES_TO_CREATE]
+                for batch in batches] == [
+            ['change0', 'change1'], ['change2', 'change3'], ['change4']]
+        assert writer.summary[workers.SWAGGER_FILES_TO_UPDATE] == 5
+        assert writer.summary[workers.SWAGGER_FILE_CHANGES_TO_DELETE] == 0
+    
+    def test_failed_batch_is_persisted_file_by_file(self, monkeypatch):
+        persisted = []
+        
+        def save_results_to_db(results_mapping):
+            # e.g. ETag of the swagger file is too long
+            if 'file1' in results_mapping[workers.SWAGGER_FILES_TO_UPDATE]:
+                raise DataError('value too long for type character varying')
+            persisted.append(results_mapping)
+        
+        monkeypatch.setattr(workers.PersistSwaggerFileResultsWorker,
+                            'save_results_to_db',
+                            staticmethod(save_results_to_db))
+        
+        results_queue = Queue()
+        writer = workers.PersistSwaggerFileResultsWorker(
+            results_queue=results_queue,
+            batch_size=3
+        )
+        for i in range(3):
+            results_queue.put({
+                workers.SWAGGER_FILE_CHANGES_TO_CREATE: [f'change{i}'],
+                workers.SWAGGER_FILES_TO_UPDATE: [f'file{i}'],
+            })
+        results_queue.put(None)
+        writer.run()
+        
+        assert [batch[workers.SWAGGER_FILES_TO_UPDATE] for batch in persisted] \
+            == [['file0'], ['file2']]
+        assert [batch[workers.SWAGGER_FILE_CHANGES_TO_CREATE]
+                for batch in persisted] == [['change0'], ['change2']]
+        assert writer.summary[workers.SWAGGER_FILES_TO_UPDATE] == 2
+        assert writer.summary[workers.SWAGGER_FILE_CHANGES_TO_CREATE] == 2
+    
+    def test_writer_keeps_draining_results_after_non_db_errors(self,
+                                                                monkeypatch):
+        persisted = []
+        
+        def save_results_to_db(results_mapping):
+            if 'file0' in results_mapping[workers.SWAGGER_FILES_TO_UPDATE]:
+                raise TypeError('unexpected result')
+            persisted.append(results_mapping)
+        
+        monkeypatch.setattr(workers.PersistSwaggerFileResultsWorker,
+                            'save_results_to_db',
+                            staticmethod(save_results_to_db))
+        
+        # bounded, as in the shard - a dead writer blocks producers
+        results_queue = Queue(maxsize=1)
+        writer = workers.PersistSwaggerFileResultsWorker(
+            results_queue=results_queue,
+            batch_size=1
+        )
+        writer.daemon = True
+        writer.start()
+        
+        results = [
+            {workers.SWAGGER_FILES_TO_UPDATE: ['file0']},
+            # malformed task results
+            [workers.SWAGGER_FILES_TO_UPDATE],
+            {workers.SWAGGER_FILES_TO_UPDATE: ['file2']},
+            None
+        ]
+        for task_results in results:
+            results_queue.put(task_results, timeout=5)
+        writer.join(timeout=5)
+        
+        assert not writer.is_alive()
+        assert [batch[workers.SWAGGER_FILES_TO_UPDATE] for batch in persisted] \
+            == [['file2']]
+        assert writer.summary[workers.SWAGGER_FILES_TO_UPDATE] == 1
+
+
+class TestFetchSwaggerFilesWorker:
+    
+    def test_swagger_files_are_fetched_within_concurrency_limits(self,
+                                                                 monkeypatch):
+        lock = threading.Lock()
+        in_flight = defaultdict(int)
+        max_in_flight = defaultdict(int)
+        
+        def fake_fetch_swagger_file(swagger_file_url, etag=None,
+                                    last_modified=None, parse=True):
+            host = swagger_file_url.split('/')[2]
+            with lock:
+                in_flight[host] += 1
+                in_flight['total'] += 1
+                for key in (host, 'total'):
+                    max_in_flight[key] = max(max_in_flight[key], in_flight[key])
+            
+            time.sleep(0.01)
+            
+            with lock:
+                in_flight[host] -= 1
+                in_flight['total'] -= 1
+            
+            if swagger_file_url.endswith('/0.json'):
+                raise ConnectionError()
+            return SwaggerFileResponse({'url': swagger_file_url}, None, None, False)
+        
+        monkeypatch.setattr(workers, 'fetch_swagger_file', fake_fetch_swagger_file)
+        
+        input_queue = Queue(maxsize=5)
+        output_queue = Queue()
+        event = threading.Event()
+        fetcher = workers.FetchSwaggerFilesWorker(
+            input_queue=input_queue,
+            output_queue=output_queue,
+            output_event=event,
+            concurrency=8,
+            per_host_concurrency=3
+        )
+        fetcher.start()
+        
+        urls = [f'https://host{i % 4}.example.com/{i}.json' for i in range(40)]
+        for url in urls:
+            input_queue.put(Task(
+                SimpleNamespace(swagger_file_etag=None,
+                                swagger_file_last_modified=None),
+                SimpleNamespace(swagger_file_url=url),
+                None
+            ))
+        input_queue.put(None)
+        fetcher.join()
+        
+        tasks = list(output_queue.queue)
+        responses = {task.swagger_file_response.swagger_file['url']
+                     for task in tasks if task.fetch_error is None}
+        errors = [task for task in tasks if task.fetch_error is not None]
+        
+        assert event.is_set()
+        assert len(tasks) == 40
+        assert responses == set(urls[1:])
+        assert isinstance(errors[0].fetch_error, ConnectionError)
+        assert max_in_flight.pop('total') <= 8
+        assert max(max_in_flight.values()) <= 3
+    
+    def test_busy_host_does_not_block_other_hosts(self, monkeypatch):
+        started_urls = []
+        
+        def fake_fetch_swagger_file(swagger_file_url, etag=None,
+                                    last_modified=None, parse=True):
+            started_urls.append(swagger_file_url)
+            if 'slow.example.com' in swagger_file_url:
+                time.sleep(0.05)
+            return SwaggerFileResponse({'url': swagger_file_url}, None, None, False)
+        
+        monkeypatch.setattr(workers, 'fetch_swagger_file', fake_fetch_swagger_file)
+        
+        input_queue = Queue()
+        output_queue = Queue()
+        fetcher = workers.FetchSwaggerFilesWorker(
+            input_queue=input_queue,
+            output_queue=output_queue,
+            output_event=threading.Event(),
+            concurrency=2,
+            per_host_concurrency=1
+        )
+        
+        urls = [f'https://slow.example.com/{i}.json' for i in range(3)] + \
+            ['https://fast.example.com/0.json']
+        for url in urls:
+            input_queue.put(Task(
+                SimpleNamespace(swagger_file_etag=None,
+                                swagger_file_last_modified=None),
+                SimpleNamespace(swagger_file_url=url),
+                None
+            ))
+        input_queue.put(None)
+        fetcher.run()
+        
+        # tasks waiting for the slow host don't hold the second download slot
+        assert started_urls[:2] == [urls[0], 'https://fast.example.com/0.json']
+        assert len(output_queue.queue) == 4
+    
+    def test_downloads_from_failing_hosts_are_skipped(self, monkeypatch):
+        fetched_urls = []
+        
+        def fake_fetch_swagger_file(swagger_file_url, etag=None,
+                                    last_modified=None, parse=True):
+            fetched_urls.append(swagger_file_url)
+            if 'down.example.com' in swagger_file_url:
+                raise ConnectionError()
+            return SwaggerFileResponse({'url': swagger_file_url}, None, None, False)
+        
+        monkeypatch.setattr(workers, 'fetch_swagger_file', fake_fetch_swagger_file)
+        
+        input_queue = Queue()
+        output_queue = Queue()
+        circuit_breaker = HostCircuitBreaker(failure_threshold=2, cool_down=60)
+        fetcher = workers.FetchSwaggerFilesWorker(
+            input_queue=input_queue,
+            output_queue=output_queue,
+            output_event=threading.Event(),
+            concurrency=1,
+            per_host_concurrency=1,
+            circuit_breaker=circuit_breaker
+        )
+        
+        for i in range(5):
+            for host in ('down.example.com', 'up.example.com'):
+                input_queue.put(Task(
+                    SimpleNamespace(swagger_file_etag=None,
+                                    swagger_file_last_modified=None),
+                    SimpleNamespace(swagger_file_url=f'https://{host}/{i}.json'),
+                    None
+                ))
+        input_queue.put(None)
+        fetcher.run()
+        
+        errors = [task.fetch_error for task in output_queue.queue
+                  if task.fetch_error is not None]
+        
+        assert len(output_queue.queue) == 10
+        assert sum('down.example.com' in url for url in fetched_urls) == 2
+        assert sum('up.example.com' in url for url in fetched_urls) == 5
+        assert [type(e) for e in errors] == [ConnectionError] * 2 + \
+            [HostCircuitOpenError] * 3
+        assert circuit_breaker.summary() == dict(failures=2, opened=1, skipped=3)
+
+
+class TestSwaggerProjectCheckScheduling:
+    
+    def test_unchanged_swagger_project_check_interval_backs_off(self, settings):
+        settings.SWAGGER_PROJECT_MIN_CHECK_INTERVAL_IN_SECONDS = 900
+        settings.SWAGGER_PROJECT_MAX_CHECK_INTERVAL_IN_SECONDS = 3000
+        settings.SWAGGER_PROJECT_CHECK_INTERVAL_BACKOFF_FACTOR = 2
+        swagger_project = SwaggerProject()
+        
+        check_intervals = []
+        for _ in range(4):
+            swagger_project.schedule_next_check(changed=False)
+            check_intervals.append(swagger_project.check_interval)
+        swagger_project.schedule_next_check(changed=True)
+        
+        assert check_intervals == [900, 1800, 3000, 3000]
+        assert swagger_project.check_interval == 900
+
+
+
+class TestRefreshRemoteVCSAccountAccessTokenWorker:
+    
+    def test_crashed_worker_is_replaced(self):
+        def crash():
+            raise RuntimeError()
+        
+        remote_vcs_accounts = [
+            SimpleNamespace(refresh_access_token=crash),
+            SimpleNamespace(refresh_access_token=lambda: None),
+        ]
+        task_queue = Queue()
+        for remote_vcs_account in remote_vcs_accounts:
+            task_queue.put(remote_vcs_account)
+        event = threading.Event()
+        event.set()
+        vcs_accounts_to_update = []
+        spawned = []
+        
+        def spawn_worker():
+            spawned.append(workers.RefreshRemoteVCSAccountAccessTokenWorker(
+                task_queue=task_queue,
+                event=event,
+                vcs_accounts_to_update_lock=threading.Lock(),
+                vcs_accounts_to_update=vcs_accounts_to_update,
+                concurrency_controller=concurrency_controller
+            ))
+        
+        concurrency_controller = AdaptiveConcurrencyController(
+            spawn_worker=spawn_worker,
+            initial_workers=1,
+            min_workers=1,
+            max_workers=1
+        )
+        concurrency_controller.start()
+        
+        with pytest.raises(RuntimeError):
+            spawned[0].run()
+        spawned[1].run()
+        
+        assert vcs_accounts_to_update == remote_vcs_accounts[1:]
+        assert task_queue.unfinished_tasks == 0
+        assert concurrency_controller.active_workers == 0
+    
+    def test_failed_refreshes_are_postponed(self, settings):
+        settings.VCS_ACCESS_TOKEN_REFRESH_RETRY_DELAY_IN_SECONDS = 600
+        
+        def fail_with(error):
+            def refresh_access_token(refresh_token):
+                raise error
+            return SimpleNamespace(refresh_access_token=refresh_access_token)
+        
+        task_queue = Queue()
+        remote_vcs_accounts = []
+        for error in (RetryError(), AccessTokenRefreshError()):
+            remote_vcs_account = RemoteVCSAccount(remote_vcs_service='BB')
+            remote_vcs_account._set_refresh_token('refresh-1')
+            remote_vcs_account._vcs_auth_util = fail_with(error)
+            remote_vcs_accounts.append(remote_vcs_account)
+            task_queue.put(remote_vcs_account)
+        event = threading.Event()
+        event.set()
+        vcs_accounts_to_update = []
+        
+        started_at = timezone.now()
+        workers.RefreshRemoteVCSAccountAccessTokenWorker(
+            task_queue=task_queue,
+            event=event,
+            vcs_accounts_to_update_lock=threading.Lock(),
+            vcs_accounts_to_update=vcs_accounts_to_update
+        ).run()
+        
+        assert vcs_accounts_to_update == remote_vcs_accounts
+        for remote_vcs_account in remote_vcs_accounts:
+            assert remote_vcs_account.access_token_refresh_failures == 1
+            assert started_at + timedelta(seconds=300) <= \
+                remote_vcs_account.access_token_refresh_at <= \
+                timezone.now() + timedelta(seconds=600)
+    
+    def test_idle_worker_exits_when_no_more_tasks_will_be_produced(self):
+        event = threading.Event()
+        worker = workers.RefreshRemoteVCSAccountAccessTokenWorker(
+            task_queue=Queue(),
+            event=event,
+            vcs_accounts_to_update_lock=threading.Lock(),
+            vcs_accounts_to_update=[]
+        )
+        worker.daemon = True
+        worker.start()
+        
+        event.set()
+        worker.join(timeout=5)
+        
+        assert not worker.is_alive()
+    
+    def test_rejected_refresh_token_raises_refresh_error(self, monkeypatch):
+        response = Response()
+        response.status_code = 400
+        response._content = b'{"error": "invalid_grant"}'
+        monkeypatch.setattr(vcs_utils, 'http', SimpleNamespace(
+            post=lambda *args, **kwargs: response))
+        
+        with pytest.raises(AccessTokenRefreshError):
+            vcs_utils.VCSAuthUtility('BB').refresh_access_token('revoked')
+
+
+class TestAccessTokenRefreshScheduling:
+    
+    @pytest.fixture(autouse=True)
+    def token_refresh_settings(self, settings):
+        settings.VCS_ACCESS_TOKEN_EXPIRY_WINDOW_IN_SECONDS = 1200
+        settings.VCS_ACCESS_TOKEN_REFRESH_SPREAD_IN_SECONDS = 1200
+    
+    def test_refresh_is_scheduled_within_expiry_window(self):
+        remote_vcs_account = RemoteVCSAccount()
+        
+        started_at = timezone.now()
+        refresh_at = set()
+        for _ in range(20):
+            remote_vcs_account.schedule_access_token_refresh(7200)
+            refresh_at.add(remote_vcs_account.access_token_refresh_at)
+            assert started_at + timedelta(seconds=4800) <= \
+                remote_vcs_account.access_token_refresh_at <= \
+                timezone.now() + timedelta(seconds=6000)
+        
+        assert started_at + timedelta(seconds=7200) <= \
+            remote_vcs_account.access_token_expires_at <= \
+            timezone.now() + timedelta(seconds=7200)
+        # refreshes of access tokens issued at the same time are spread
+        assert len(refresh_at) > 1
+    
+    def test_refresh_records_expiry_reported_by_provider(self):
+        remote_vcs_account = RemoteVCSAccount(remote_vcs_service='BB')
+        remote_vcs_account._set_refresh_token('refresh-1')
+        refreshed_with = []
+        
+        def refresh_access_token(refresh_token):
+            refreshed_with.append(refresh_token)
+            return 'access-2', 'refresh-2', 600
+        
+        remote_vcs_account._vcs_auth_util = SimpleNamespace(
+            refresh_access_token=refresh_access_token)
+        remote_vcs_account.refresh_access_token()
+        
+        assert refreshed_with == ['refresh-1']
+        assert remote_vcs_account.unencrypted_access_token == 'access-2'
+        assert remote_vcs_account.unencrypted_refresh_token == 'refresh-2'
+        # expires within the window - refreshed by the next run
+        assert remote_vcs_account.access_token_refresh_at <= timezone.now()
+    
+    def test_postponed_refresh_backs_off_exponentially(self, settings):
+        settings.VCS_ACCESS_TOKEN_REFRESH_RETRY_DELAY_IN_SECONDS = 600
+        settings.VCS_ACCESS_TOKEN_REFRESH_MAX_RETRY_DELAY_IN_SECONDS = 3000
+        remote_vcs_account = RemoteVCSAccount()
+        
+        for max_delay in (600, 1200, 2400, 3000, 3000):
+            started_at = timezone.now()
+            remote_vcs_account.postpone_access_token_refresh()
+            assert started_at + timedelta(seconds=max_delay / 2) <= \
+                remote_vcs_account.access_token_refresh_at <= \
+                timezone.now() + timedelta(seconds=max_delay)
+        
+        assert remote_vcs_account.access_token_refresh_failures == 5
+        
+        # a successful refresh resets the backoff
+        remote_vcs_account.schedule_access_token_refresh(7200)
+        assert remote_vcs_account.access_token_refresh_failures == 0
+    
+    def test_non_expiring_access_token_is_never_refreshed(self):
+        remote_vcs_account = RemoteVCSAccount(
+            access_token_expires_at=timezone.now(),
+            access_token_refresh_at=timezone.now()
+        )
+        
+        remote_vcs_account.schedule_access_token_refresh(None)
+        
+        assert remote_vcs_account.access_token_expires_at is None
+        assert remote_vcs_account.access_token_refresh_at == \
+            RemoteVCSAccount.NEVER_REFRESH_AT
+    
+    @pytest.mark.django_db
+    def test_only_due_and_unknown_expiry_refreshes_are_due(self):
+        company = Company.objects.create(company_name='Company')
+        now = timezone.now()
+        
+        def create_account(account_name, access_token_refresh_at,
+                           refresh_token='refresh'):
+            return RemoteVCSAccount.objects.create(
+                account_name=account_name,
+                access_token='access',
+                refresh_token=refresh_token,
+                access_token_refresh_at=access_token_refresh_at,
+                remote_vcs_service=RemoteVCSAccount.GITHUB,
+                account_type=RemoteVCSAccount.USER,
+                company=company
+            )
+        
+        unknown_expiry = create_account('unknown', None)
+        due = create_account('due', now - timedelta(minutes=1))
+        create_account('not_due', now + timedelta(minutes=1))
+        create_account('never', RemoteVCSAccount.NEVER_REFRESH_AT)
+        create_account('no_refresh_token', None, refresh_token=None)
+        
+        assert list(RemoteVCSAccount.objects.due_for_access_token_refresh()) \
+            == [unknown_expiry, due]
+        never = RemoteVCSAccount.objects.get(account_name='never')
+        assert never.access_token_refresh_at == RemoteVCSAccount.NEVER_REFRESH_AT
@@ -1,9 +1,13 @@
 from enum import Enum
-from typing import Union, Iterable
+from typing import Union, Iterable, List, Tuple
 
 import hashlib
 from itertools import chain, combinations
 
+import orjson
+
+from utils.generators import canonical_json_chunks_gen
+
 
 def sha256_hasher(value: Union[str, int, float]) -> str:
     hasher_instance = hashlib.sha256()
@@ -12,6 +16,44 @@ def sha256_hasher(value: Union[str, int, float]) -> str:
     return hashed_value
 
 
+def canonical_json_digest(value: Union[dict, list, str, int, float]) -> str:
+    """
+    Hash a json serializable value independently of its dict keys order
+    (keys are sorted and the value is compactly encoded before hashing).
+    
+    Values nested deeper than orjson's recursion limit (254 levels)
+    are encoded without recursion (see canonical_json_chunks_gen).
+    """
+    try:
+        canonical_value = orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+    except orjson.JSONEncodeError:
+        canonical_value = ''.join(canonical_json_chunks_gen(value)).encode()
+    return hashlib.blake2b(canonical_value, digest_size=16).hexdigest()
+
+
+def split_range(first: int, last: int, size: int) -> List[Tuple[int, int]]:
+    """
+    Split inclusive range [first, last] into consecutive inclusive ranges
+    of at most "size" integers
+    """
+    return [(start, min(start + size - 1, last))
+            for start in range(first, last + 1, size)]
+
+
+def merge_counters(total: dict, other: dict) -> dict:
+    """
+    Add numeric values of a (nested) dictionary to the corresponding values
+    of another dictionary in place, return the updated dictionary
+    """
+    for key, value in other.items():
+        if isinstance(value, dict):
+            merge_counters(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
+    
+    return total
+
+
 def powerset(iterable: Iterable) -> Iterable:
     s = list(iterable)
     return chain.from_iterable(combinations(s, r) for r in range(len(s) + 1))
@@ -1,4 +1,6 @@
-from typing import Callable, Hashable, Generator, Any
+import json
+from itertools import repeat
+from typing import Callable, Hashable, Generator, Any, Iterator, Tuple
 
 
 def extract_values_from_dict_gen(target: dict,
@@ -6,7 +8,7 @@ def extract_values_from_dict_gen(target: dict,
     """
     This function receives a dictionary, a key to search for 
     and returns a generator instance.
-    The returned generator recursevly traverses a dictionary structure
+    The returned generator traverses a dictionary structure
     in a DFS PreOrder manner.
     
     1) To get all matching key values the returned generator must be iterated over
@@ -14,16 +16,77 @@ def extract_values_from_dict_gen(target: dict,
     2) To get a single (first encountered) mathing key value just call next()
     on the returned generator (do not forget to catch StopIteration exception
     if no matching results were found)
+    
+    Traversal is iterative (uses an explicit stack of child iterators)
+    to avoid "yield from" overhead on every nesting level
+    and recursion limits on very deeply nested structures.
     """
-    if isinstance(target, dict):
-        for k, v in target.items():
+    if not isinstance(target, (dict, list)):
+        return
+    
+    stack = [_children_iter(target)]
+    while stack:
+        for k, v in stack[-1]:
             if k == key:
                 yield v
             if isinstance(v, (dict, list)):
-                yield from extract_values_from_dict_gen(v, key)
-    elif isinstance(target, list):
-        for d in target:
-            yield from extract_values_from_dict_gen(d, key)
+                # descend, continue with the remaining siblings afterwards
+                stack.append(_children_iter(v))
+                break
+        else:
+            stack.pop()
+
+
+def _children_iter(target: Any) -> Iterator[Tuple[Hashable, Any]]:
+    """
+    Iterate over (key, value) pairs of a dictionary
+    or (None, value) pairs of a list
+    """
+    if isinstance(target, dict):
+        return iter(target.items())
+    return zip(repeat(None), target)
+
+
+def canonical_json_chunks_gen(value: Any) -> Generator[str, None, None]:
+    """
+    Compactly encode a json serializable value with sorted dict keys
+    and yield the encoded chunks.
+    
+    Encoding is iterative (uses an explicit stack of values
+    and encoded chunks) so that values nested deeper than
+    the recursion limit of json encoders can be encoded as well.
+    """
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, _EncodedChunk):
+            yield item
+        elif isinstance(item, dict):
+            yield '{'
+            stack.append(_EncodedChunk('}'))
+            keys = sorted(item)
+            # pushed in reverse, so that they are popped in order
+            for i in range(len(keys) - 1, -1, -1):
+                encoded_key = json.dumps(keys[i], ensure_ascii=False)
+                stack.append(item[keys[i]])
+                stack.append(_EncodedChunk(
+                    f',{encoded_key}:' if i else f'{encoded_key}:'))
+        elif isinstance(item, list):
+            yield '['
+            stack.append(_EncodedChunk(']'))
+            for i in range(len(item) - 1, -1, -1):
+                stack.append(item[i])
+                if i:
+                    stack.append(_EncodedChunk(','))
+        else:
+            yield json.dumps(item, ensure_ascii=False)
+
+
+class _EncodedChunk(str):
+    """
+    Already encoded chunk pushed on the encoding stack
+    (to be told apart from string values)
+    """
 
 
 def transform_values_gen(gen: Generator,